@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "86400"))
+CACHE_PERSISTENT = os.getenv("ANALYSIS_CACHE_PERSISTENT", "true").lower() == "true"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize job description text so trivially different pastes share a cache entry."""
+    lines = re.split(r'[\n\r]+', text)
+    cleaned_lines = [re.sub(r'[ \t\f\v]+', ' ', line).strip() for line in lines]
+    return '\n'.join(line for line in cleaned_lines if line)
+
+
+def cache_key(text: str, version: str) -> str:
+    """Build the content-addressed key for a job description and analysis version."""
+    payload = f"{version}\0{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier analysis result cache: in-process LRU backed by a MongoDB collection."""
+
+    def __init__(
+        self,
+        version: Callable[[], str],
+        collection=None,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl_seconds: int = CACHE_TTL_SECONDS
+    ):
+        self.version = version
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "persistent_errors": 0
+        }
+
+    def key_for(self, text: str, profile: str, version: str) -> str:
+        """Return the cache key for a job description under an analysis version and a profile."""
+        return cache_key(text, f"{version}|{profile}")
+
+    def get(self, text: str, profile: str) -> Optional[Dict[str, Any]]:
+        """Return a cached analysis for the text and profile, or None on a miss."""
+        # The version is read per call; it changes when the keyword taxonomy is reloaded
+        version = self.version()
+        key = self.key_for(text, profile, version)
+
+        result = self._get_memory(key)
+        if result is not None:
+            self._count("hits", "memory_hits")
+            return copy.deepcopy(result)
+
+        result = self._get_persistent(key, version)
+        if result is not None:
+            self._count("hits", "persistent_hits")
+            self._put_memory(key, result)
+            return copy.deepcopy(result)
+
+        self._count("misses")
+        return None
+
+    def put(self, text: str, profile: str, result: Dict[str, Any]) -> None:
+        """Store an analysis result in both cache tiers."""
+        version = self.version()
+        key = self.key_for(text, profile, version)
+        stored = copy.deepcopy(result)
+        self._put_memory(key, stored)
+        self._put_persistent(key, version, stored)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss and eviction counters along with current occupancy."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.collection is not None,
+                "version": self.version()
+            }
+
+    def _count(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return result
+
+    def _put_memory(self, key: str, result: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _get_persistent(self, key: str, version: str) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return None
+
+        try:
+            document = self.collection.find_one(
+                {
+                    "_id": key,
+                    "version": version,
+                    "expires_at": {"$gt": datetime.now(timezone.utc)}
+                },
+                {"analysis": 1}
+            )
+        except Exception as e:
+            self._count("persistent_errors")
+            logger.warning(f"Analysis cache lookup failed: {e}")
+            return None
+
+        return document["analysis"] if document else None
+
+    def _put_persistent(self, key: str, version: str, result: Dict[str, Any]) -> None:
+        if self.collection is None:
+            return
+
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "version": version,
+                    "analysis": result,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            self._count("persistent_errors")
+            logger.warning(f"Analysis cache store failed: {e}")
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from telemetry import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "process", "thread" or "server" (analyses go to the model server, see model_server)
+ANALYSIS_EXECUTOR_MODE = os.getenv("ANALYSIS_EXECUTOR_MODE", "process").lower()
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "8"))
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "60"))
+ANALYSIS_RETRY_AFTER_SECONDS = int(os.getenv("ANALYSIS_RETRY_AFTER_SECONDS", "5"))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the analysis queue is full and a request must be rejected."""
+
+
+class AnalysisTimeout(Exception):
+    """Raised when an analysis does not finish within the per-request timeout."""
+
+
+def _init_worker(torch_threads: Optional[int] = None) -> None:
+    """Pin the worker's PyTorch threads and load the NLP models once when it starts."""
+    import nlp_service
+    if torch_threads is not None:
+        nlp_service.torch_threads = torch_threads
+    nlp_service.load_models()
+
+
+def _warm_up_worker() -> Dict[str, Any]:
+    """Report the model load timings of the worker that runs this task."""
+    import nlp_service
+    nlp_service.load_models()
+    return {"pid": os.getpid(), "load_seconds": dict(nlp_service.model_load_seconds)}
+
+
+def _analyze_in_worker(text: str, profile: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Run a single analysis inside a worker; also returns the metrics a worker process recorded."""
+    from nlp_service import analyze_job_description
+    from telemetry import worker_delta
+    return analyze_job_description(text, profile, embed=True), worker_delta()
+
+
+class AnalysisExecutor:
+    """Worker pool for CPU-bound analyses with a bounded submission queue.
+
+    In ``process`` mode every worker process loads its own models. In ``thread``
+    mode the models are shared in-process, which lets concurrent summary prompts
+    meet in the summary batcher.
+    """
+
+    def __init__(
+        self,
+        mode: str = ANALYSIS_EXECUTOR_MODE,
+        workers: int = ANALYSIS_WORKERS,
+        queue_size: int = ANALYSIS_QUEUE_SIZE,
+        timeout_seconds: float = ANALYSIS_TIMEOUT_SECONDS
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown analysis executor mode: {mode}")
+
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout_seconds = timeout_seconds
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.ready = False
+        self.warm_up_error: Optional[str] = None
+        self.worker_reports: List[Dict[str, Any]] = []
+        # The warm-up of a replacement pool, kept referenced while it runs
+        self._warm_up_task: Optional[asyncio.Task] = None
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "pool_restarts": 0
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of analyses running or waiting at once."""
+        return self.workers + self.queue_size
+
+    def start(self) -> None:
+        """Start the workers; each worker process loads the models once."""
+        if self._pool is not None:
+            return
+
+        from nlp_service import torch_threads_for
+
+        if self.mode == "thread":
+            # One process and one model copy: PyTorch may use every core
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="analysis",
+                initializer=_init_worker,
+                initargs=(torch_threads_for(1),)
+            )
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(torch_threads_for(self.workers),)
+            )
+        logger.info(
+            f"Analysis executor started in {self.mode} mode with {self.workers} workers, "
+            f"queue size {self.queue_size}"
+        )
+
+    def shutdown(self) -> None:
+        """Stop the workers, cancelling analyses that have not started."""
+        if self._pool is None:
+            return
+
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        logger.info("Analysis executor stopped")
+
+    async def warm_up(self) -> None:
+        """Make every worker load its models, then mark the executor ready."""
+        if self._pool is None:
+            self.start()
+        pool = self._pool
+
+        # One task per worker; busy loading workers make the pool start the others
+        futures = [
+            asyncio.wrap_future(pool.submit(_warm_up_worker))
+            for _ in range(self.workers)
+        ]
+        try:
+            reports = await asyncio.gather(*futures)
+        except Exception as e:
+            self.warm_up_error = str(e) or e.__class__.__name__
+            logger.error(f"Analysis workers failed to load models: {self.warm_up_error}")
+            raise
+
+        if self._pool is not pool:
+            # Replaced meanwhile; the replacement's own warm-up decides readiness
+            return
+        self.worker_reports = list({report["pid"]: report for report in reports}.values())
+        self.warm_up_error = None
+        self.ready = True
+        logger.info(f"Analysis workers ready: {self.worker_reports}")
+
+    async def analyze(self, text: str, profile: str) -> Dict[str, Any]:
+        """Analyze a job description in the worker pool without blocking the event loop."""
+        self._acquire_slot()
+
+        pool = None
+        try:
+            if self._pool is None:
+                self.start()
+            pool = self._pool
+            future = pool.submit(_analyze_in_worker, text, profile)
+        except BrokenProcessPool:
+            self._release_slot()
+            self._restart(pool)
+            raise
+        except Exception:
+            self._release_slot()
+            raise
+
+        # The slot is held until the worker is really done, even after a timeout
+        future.add_done_callback(lambda _: self._release_slot())
+
+        try:
+            result, metrics = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout_seconds)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._count("timeouts")
+            raise AnalysisTimeout(f"Analysis exceeded {self.timeout_seconds}s")
+        except BrokenProcessPool:
+            self._count("failed")
+            self._restart(pool)
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+
+        if metrics:
+            REGISTRY.merge(metrics)
+        self._count("completed")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue occupancy and outcome counters."""
+        with self._lock:
+            return {
+                **self._counters,
+                "in_flight": self._in_flight,
+                "ready": self.ready,
+                "mode": self.mode,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "capacity": self.capacity,
+                "timeout_seconds": self.timeout_seconds
+            }
+
+    def _acquire_slot(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._counters["rejected"] += 1
+                raise ExecutorSaturated("Analysis queue is full")
+            self._in_flight += 1
+            self._counters["submitted"] += 1
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _restart(self, pool: Optional[Executor]) -> None:
+        """Replace a broken pool once and load the models in the replacement's workers.
+
+        Every analysis pending on the broken pool fails and calls this; only
+        the first call for that pool replaces it.
+        """
+        with self._lock:
+            if pool is None or self._pool is not pool:
+                return
+            self._pool = None
+            self.ready = False
+            self._counters["pool_restarts"] += 1
+        logger.error("Analysis worker pool broke, restarting it")
+        pool.shutdown(wait=False, cancel_futures=True)
+        self.start()
+        self._warm_up_task = asyncio.get_running_loop().create_task(self.warm_up())
+        self._warm_up_task.add_done_callback(_warm_up_done)
+
+
+def _warm_up_done(task: asyncio.Task) -> None:
+    # warm_up logged and recorded a failure already; retrieve it so it is not reported again
+    if not task.cancelled():
+        task.exception()
+
+
+def create_analysis_executor(mode: str = ANALYSIS_EXECUTOR_MODE):
+    """Create the executor for the configured mode; in ``server`` mode this process loads no models."""
+    if mode == "server":
+        from model_server import ModelServerClient
+        return ModelServerClient()
+    return AnalysisExecutor(mode=mode)
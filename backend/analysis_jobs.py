@@ -0,0 +1,283 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReturnDocument
+
+from analysis_executor import ExecutorSaturated, ANALYSIS_TIMEOUT_SECONDS, ANALYSIS_RETRY_AFTER_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("ANALYSIS_JOB_QUEUE_LIMIT", "1000"))
+JOB_EVENT_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_EVENT_POLL_SECONDS", "15"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("ANALYSIS_JOB_RESULT_TTL_SECONDS", "86400"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+TERMINAL_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+# Recent samples kept for wait/run time percentiles
+TIMING_WINDOW = 1000
+
+
+class JobQueueFull(Exception):
+    """Raised when too many analysis jobs are already waiting."""
+
+
+class TimingWindow:
+    """Rolling window of durations summarized as count and percentiles."""
+
+    def __init__(self, size: int = TIMING_WINDOW):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> Dict[str, float]:
+        """Return the total count, mean and recent percentiles."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+        def percentile(fraction: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": round(ordered[-1], 4)
+        }
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored job document into its API representation."""
+    response = {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+    if job["status"] == JOB_COMPLETED:
+        response["result"] = job.get("result")
+    if job["status"] == JOB_FAILED:
+        response["error"] = job.get("error")
+    return response
+
+
+class AnalysisJobManager:
+    """Persistent queue of asynchronous analysis jobs processed by background workers."""
+
+    def __init__(
+        self,
+        collection,
+        process: Callable[[str, str, str], Awaitable[Dict[str, Any]]],
+        workers: int = JOB_WORKERS,
+        queue_limit: int = JOB_QUEUE_LIMIT
+    ):
+        self.collection = collection
+        self.process = process
+        self.workers = max(1, workers)
+        self.queue_limit = queue_limit
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._running = set()
+        self._updates: Dict[str, asyncio.Event] = {}
+        self._lock = threading.Lock()
+        self._wait_times = TimingWindow()
+        self._run_times = TimingWindow()
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "recovered": 0, "rejected": 0}
+
+    async def start(self) -> None:
+        """Requeue persisted work left over from a previous run and start the workers."""
+        self._queue = asyncio.Queue()
+        recovered = await run_in_threadpool(self._recover_jobs)
+        for job_id in recovered:
+            self._queue.put_nowait(job_id)
+        if recovered:
+            logger.info(f"Requeued {len(recovered)} analysis jobs from a previous run")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; unfinished jobs stay queued in MongoDB for the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._running:
+            await run_in_threadpool(
+                self.collection.update_many,
+                {"_id": {"$in": list(self._running)}, "status": JOB_RUNNING},
+                {"$set": {"status": JOB_QUEUED}, "$unset": {"started_at": ""}}
+            )
+            self._running.clear()
+
+    async def submit(self, username: str, job_description: str, profile: str) -> Dict[str, Any]:
+        """Persist a new job and queue it for processing."""
+        if self._queue.qsize() >= self.queue_limit:
+            self._count("rejected")
+            raise JobQueueFull("Analysis job queue is full")
+
+        job = {
+            "_id": uuid.uuid4().hex,
+            "username": username,
+            "job_description": job_description,
+            "profile": profile,
+            "status": JOB_QUEUED,
+            "created_at": datetime.now(timezone.utc)
+        }
+        await run_in_threadpool(self.collection.insert_one, job)
+        self._queue.put_nowait(job["_id"])
+        self._count("submitted")
+        return job
+
+    async def get(self, job_id: str, username: str) -> Optional[Dict[str, Any]]:
+        """Return a job owned by the user, or None."""
+        return await run_in_threadpool(
+            self.collection.find_one,
+            {"_id": job_id, "username": username},
+            {"job_description": 0}
+        )
+
+    async def events(self, job_id: str, username: str) -> AsyncIterator[str]:
+        """Yield server-sent events for each status change until the job finishes."""
+        last_status = None
+        while True:
+            # Subscribe before reading so an update between the two is not missed
+            update = self._updates.setdefault(job_id, asyncio.Event())
+            job = await self.get(job_id, username)
+            if job is None:
+                yield self._format_event("error", {"job_id": job_id, "detail": "Job not found"})
+                return
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield self._format_event(last_status, serialize_job(job))
+                if last_status in TERMINAL_STATES:
+                    self._updates.pop(job_id, None)
+                    return
+            else:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+            try:
+                await asyncio.wait_for(update.wait(), timeout=JOB_EVENT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, outcome counters and job wait/run times."""
+        with self._lock:
+            return {
+                **self._counters,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "wait_seconds": self._wait_times.summary(),
+                "run_seconds": self._run_times.summary()
+            }
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        started_at = datetime.now(timezone.utc)
+        job = await run_in_threadpool(self._claim, job_id, started_at)
+        if job is None:
+            # Already claimed by another API process
+            return
+
+        self._running.add(job_id)
+        created_at = job["created_at"]
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        self._record_time(self._wait_times, (started_at - created_at).total_seconds())
+        self._notify(job_id)
+
+        while True:
+            try:
+                result = await self.process(job["job_description"], job["username"], job["profile"])
+                update = {"status": JOB_COMPLETED, "result": result}
+                self._count("completed")
+            except ExecutorSaturated:
+                await asyncio.sleep(ANALYSIS_RETRY_AFTER_SECONDS)
+                continue
+            except Exception as e:
+                update = {"status": JOB_FAILED, "error": str(e) or e.__class__.__name__}
+                self._count("failed")
+            break
+
+        finished_at = datetime.now(timezone.utc)
+        update["finished_at"] = finished_at
+        update["expires_at"] = finished_at + timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+        await run_in_threadpool(self.collection.update_one, {"_id": job_id}, {"$set": update})
+        self._running.discard(job_id)
+        self._record_time(self._run_times, (finished_at - started_at).total_seconds())
+        self._notify(job_id)
+
+    def _claim(self, job_id: str, started_at: datetime) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one_and_update(
+            {"_id": job_id, "status": JOB_QUEUED},
+            {"$set": {"status": JOB_RUNNING, "started_at": started_at}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _recover_jobs(self):
+        # A job still "running" long after the analysis timeout lost its worker
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=2 * ANALYSIS_TIMEOUT_SECONDS)
+        result = self.collection.update_many(
+            {"status": JOB_RUNNING, "started_at": {"$lt": stale_before}},
+            {"$set": {"status": JOB_QUEUED}, "$unset": {"started_at": ""}}
+        )
+        with self._lock:
+            self._counters["recovered"] += result.modified_count
+
+        queued = self.collection.find({"status": JOB_QUEUED}, {"_id": 1}).sort("created_at", 1)
+        return [job["_id"] for job in queued]
+
+    def _notify(self, job_id: str) -> None:
+        # Wake every current listener; later listeners wait on a fresh event
+        event = self._updates.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _record_time(self, window: TimingWindow, seconds: float) -> None:
+        with self._lock:
+            window.add(seconds)
+
+    @staticmethod
+    def _format_event(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
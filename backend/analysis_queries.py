@@ -0,0 +1,202 @@
+import base64
+import binascii
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+
+ANALYSES_PAGE_SIZE = int(os.getenv("ANALYSES_PAGE_SIZE", "20"))
+ANALYSES_MAX_PAGE_SIZE = int(os.getenv("ANALYSES_MAX_PAGE_SIZE", "100"))
+
+# Keyset sort orders; every order ends in a unique field so the cursor position is exact
+SORT_OPTIONS: Dict[str, List[Tuple[str, int]]] = {
+    "newest": [("created_at", -1), ("_id", -1)],
+    "oldest": [("created_at", 1), ("_id", 1)],
+    "role": [("analysis.role_type", 1), ("created_at", -1), ("_id", -1)],
+    "experience": [("analysis.experience_level", 1), ("created_at", -1), ("_id", -1)],
+}
+
+# Types a cursor value may have per sort field; the role and experience fields may be missing
+CURSOR_VALUE_TYPES = {"created_at": (datetime,), "_id": (ObjectId,)}
+OPTIONAL_VALUE_TYPES = (str, type(None))
+
+# Cursor timestamps decode as aware UTC datetimes, matching what the API stores
+CURSOR_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+# List pages leave out the description body and the extracted sections
+LIST_PROJECTION = {
+    "created_at": 1,
+    "analysis.role_type": 1,
+    "analysis.experience_level": 1,
+    "analysis.skills": 1,
+    "analysis.summary": 1
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor is malformed or belongs to another sort order."""
+
+
+def _field_value(document: Dict[str, Any], field: str) -> Any:
+    value = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def sort_values(sort: str, document: Dict[str, Any]) -> List[Any]:
+    """Return a document's values for the fields of a sort order."""
+    return [_field_value(document, field) for field, _ in SORT_OPTIONS[sort]]
+
+
+def project_summary(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply LIST_PROJECTION to a document held in memory."""
+    projected: Dict[str, Any] = {"_id": document["_id"]}
+    for field in LIST_PROJECTION:
+        parent, _, child = field.partition(".")
+        if child:
+            if child in document.get(parent, {}):
+                projected.setdefault(parent, {})[child] = document[parent][child]
+        elif parent in document:
+            projected[parent] = document[parent]
+    return projected
+
+
+def encode_cursor(sort: str, document: Dict[str, Any]) -> str:
+    """Encode the sort key of the last document on a page as an opaque cursor."""
+    values = sort_values(sort, document)
+    payload = json_util.dumps({"sort": sort, "values": values})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """Return the sort key values stored in a cursor."""
+    try:
+        payload = json_util.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii")), json_options=CURSOR_JSON_OPTIONS
+        )
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+    if not isinstance(payload, dict) or payload.get("sort") != sort:
+        raise InvalidCursor("Pagination cursor does not match the requested sort order")
+    values = payload.get("values")
+    if not isinstance(values, list) or len(values) != len(SORT_OPTIONS[sort]):
+        raise InvalidCursor("Invalid pagination cursor")
+    for (field, _), value in zip(SORT_OPTIONS[sort], values):
+        if not isinstance(value, CURSOR_VALUE_TYPES.get(field, OPTIONAL_VALUE_TYPES)):
+            raise InvalidCursor("Invalid pagination cursor")
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """Return the condition on one field for values strictly after ``value``, or None if there are none.
+
+    Missing values sort first, as null does in MongoDB, but comparison
+    operators never match null, so null is handled explicitly.
+    """
+    if value is None:
+        return {field: {"$ne": None}} if direction > 0 else None
+    if direction > 0:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: str, values: List[Any]) -> Dict[str, Any]:
+    """Build the filter for documents strictly after the given sort key."""
+    order = SORT_OPTIONS[sort]
+    clauses = []
+    for position, (field, direction) in enumerate(order):
+        after = _after(field, direction, values[position])
+        if after is None:
+            continue
+        prefix = [{previous: value} for (previous, _), value in zip(order[:position], values)]
+        clauses.append({"$and": prefix + [after]} if prefix else after)
+    return {"$or": clauses}
+
+
+def serialize_summary(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a projected analysis document into a list item."""
+    return {
+        "analysis_id": str(document["_id"]),
+        "created_at": document.get("created_at"),
+        "analysis": document.get("analysis", {})
+    }
+
+
+def parse_analysis_id(analysis_id: str) -> Optional[ObjectId]:
+    """Return the ObjectId for an analysis id, or None when it is malformed."""
+    try:
+        return ObjectId(analysis_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def serialize_detail(document: Dict[str, Any], job_description: Optional[str] = None) -> Dict[str, Any]:
+    """Convert a full analysis document and its description body into the detail representation.
+
+    Older documents embed the body as ``job_description``.
+    """
+    return {
+        "analysis_id": str(document["_id"]),
+        "created_at": document.get("created_at"),
+        "job_description": job_description if job_description is not None else document.get("job_description"),
+        "analysis": document.get("analysis", {})
+    }
+
+
+def serialize_history(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an analysis document into a /history item, without the description body."""
+    return {
+        "analysis_id": str(document["_id"]),
+        "username": document.get("username"),
+        "analysis": document.get("analysis", {}),
+        "created_at": document.get("created_at")
+    }
+
+
+def page_filters(
+    username: str,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    role_type: Optional[str] = None,
+    experience_level: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return the filter of all matching analyses and the filter of the requested page."""
+    if sort not in SORT_OPTIONS:
+        raise ValueError(f"Unknown sort order: {sort}")
+
+    query: Dict[str, Any] = {"username": username}
+    if role_type:
+        query["analysis.role_type"] = role_type
+    if experience_level:
+        query["analysis.experience_level"] = experience_level
+
+    if not cursor:
+        return query, query
+    return query, {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+
+
+def build_page(
+    documents: List[Dict[str, Any]],
+    limit: int,
+    sort: str,
+    total_count: Optional[int]
+) -> Dict[str, Any]:
+    """Turn up to ``limit + 1`` sorted documents into a page response.
+
+    The extra document only tells whether another page follows. The total
+    count is only computed for the first page; later pages are reached
+    through ``next_cursor``.
+    """
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    return {
+        "analyses": [serialize_summary(document) for document in documents],
+        "next_cursor": encode_cursor(sort, documents[-1]) if has_more else None,
+        "total_count": total_count,
+        "limit": limit,
+        "sort": sort
+    }
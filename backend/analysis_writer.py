@@ -0,0 +1,348 @@
+"""Write-behind batching of stored analyses.
+
+Batches that cannot be written stay buffered and are retried. Whatever is
+still buffered when the process stops and MongoDB is unreachable is appended
+to a dead-letter file; store it once MongoDB is back:
+
+    python analysis_writer.py --replay
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import json_util
+
+from analysis_queries import ANALYSES_PAGE_SIZE, encode_cursor, project_summary, serialize_detail, serialize_summary
+from repositories import AnalysisRepository, ChangeMarker
+from trend_rollups import TREND_TOP_VALUES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WRITE_BEHIND = os.getenv("ANALYSIS_WRITE_BEHIND", "false").lower() == "true"
+ANALYSIS_WRITE_BATCH_SIZE = int(os.getenv("ANALYSIS_WRITE_BATCH_SIZE", "100"))
+ANALYSIS_WRITE_FLUSH_MS = float(os.getenv("ANALYSIS_WRITE_FLUSH_MS", "200"))
+ANALYSIS_WRITE_MAX_PENDING = int(os.getenv("ANALYSIS_WRITE_MAX_PENDING", "10000"))
+ANALYSIS_WRITE_RETRIES = int(os.getenv("ANALYSIS_WRITE_RETRIES", "3"))
+ANALYSIS_WRITE_RETRY_BACKOFF_MS = float(os.getenv("ANALYSIS_WRITE_RETRY_BACKOFF_MS", "250"))
+ANALYSIS_WRITE_DEAD_LETTER_PATH = os.getenv(
+    "ANALYSIS_WRITE_DEAD_LETTER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "analysis_dead_letter.jsonl")
+)
+
+# Extended JSON keeps ids, dates and embeddings intact
+DEAD_LETTER_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS.with_options(tz_aware=True, tzinfo=timezone.utc)
+
+
+def write_dead_letter(path: str, documents: List[Dict[str, Any]]) -> None:
+    """Append analysis documents to the dead-letter file, one extended JSON document per line."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for document in documents:
+            f.write(json_util.dumps(document, json_options=DEAD_LETTER_JSON_OPTIONS) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_dead_letter(path: str) -> Iterable[Dict[str, Any]]:
+    """Yield the analysis documents of a dead-letter file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json_util.loads(line, json_options=DEAD_LETTER_JSON_OPTIONS)
+
+
+def _newest_first_key(document: Dict[str, Any]):
+    # Documents read back from MongoDB carry naive UTC datetimes
+    created_at = document["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at, document["_id"]
+
+
+class WriteBehindAnalysisRepository(AnalysisRepository):
+    """Buffers new analyses in memory and writes them to another repository in batches.
+
+    A batch is flushed once it reaches ``batch_size`` documents or after
+    ``flush_ms``, whichever comes first, and on shutdown. Pending documents
+    are merged into ``recent`` and ``get`` so users read their own writes;
+    pages, statistics and trends catch up with the next flush.
+
+    A batch whose retries are exhausted goes back to the front of the buffer
+    and is retried with the next flush; once ``max_pending`` is reached new
+    analyses are written directly, so a failing database pushes back on
+    ``/analyze``. Analyses that cannot be written at shutdown go to the
+    dead-letter file.
+    """
+
+    def __init__(
+        self,
+        repository: AnalysisRepository,
+        batch_size: int = ANALYSIS_WRITE_BATCH_SIZE,
+        flush_ms: float = ANALYSIS_WRITE_FLUSH_MS,
+        max_pending: int = ANALYSIS_WRITE_MAX_PENDING,
+        retries: int = ANALYSIS_WRITE_RETRIES,
+        retry_backoff_ms: float = ANALYSIS_WRITE_RETRY_BACKOFF_MS,
+        dead_letter_path: str = ANALYSIS_WRITE_DEAD_LETTER_PATH
+    ):
+        self.repository = repository
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(0.0, flush_ms) / 1000
+        self.max_pending = max(self.batch_size, max_pending)
+        self.retries = max(0, retries)
+        self.retry_backoff_seconds = max(0.0, retry_backoff_ms) / 1000
+        self.dead_letter_path = dead_letter_path
+        self._buffer: List[Dict[str, Any]] = []
+        # Documents taken from the buffer by a flush that has not finished yet
+        self._in_flight: List[Dict[str, Any]] = []
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {
+            "buffered": 0,
+            "flushes": 0,
+            "written": 0,
+            "retries": 0,
+            "failed_flushes": 0,
+            "dead_lettered": 0,
+            "direct_writes": 0
+        }
+
+    async def start(self) -> None:
+        await self.repository.start()
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Whatever a cancelled flush was writing goes back in front of the buffer
+        self._buffer[:0] = self._in_flight
+        self._in_flight = []
+        while self._buffer:
+            if not await self._flush():
+                write_dead_letter(self.dead_letter_path, self._buffer)
+                self._counters["dead_lettered"] += len(self._buffer)
+                logger.error(
+                    f"Wrote {len(self._buffer)} unstored analyses to {self.dead_letter_path}; "
+                    f"replay them with: python analysis_writer.py --replay"
+                )
+                self._buffer = []
+        await self.repository.stop()
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        if self._task is None or len(self._buffer) + len(documents) > self.max_pending:
+            # Not started, or the database is falling behind: write through instead of growing
+            self._counters["direct_writes"] += len(documents)
+            return await self.repository.insert_many(documents)
+
+        self._buffer.extend(documents)
+        self._counters["buffered"] += len(documents)
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+        return len(documents)
+
+    async def recent(self, username: str, limit: int) -> List[Dict[str, Any]]:
+        stored = await self.repository.recent(username, limit)
+        pending = self._pending_for(username)
+        if not pending:
+            return stored
+
+        # A flush may finish between the read and now; ids identify those documents
+        pending_ids = {document["_id"] for document in pending}
+        merged = pending + [document for document in stored if document["_id"] not in pending_ids]
+        merged.sort(key=_newest_first_key, reverse=True)
+        return merged[:limit]
+
+    async def page(
+        self,
+        username: str,
+        limit: int = ANALYSES_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "newest",
+        role_type: Optional[str] = None,
+        experience_level: Optional[str] = None
+    ) -> Dict[str, Any]:
+        pending = [
+            document for document in self._pending_for(username)
+            if (not role_type or document["analysis"].get("role_type") == role_type)
+            and (not experience_level or document["analysis"].get("experience_level") == experience_level)
+        ]
+        if cursor or sort != "newest" or not pending:
+            return await self.repository.page(username, limit, cursor, sort, role_type, experience_level)
+
+        # Buffered analyses are the newest, so they lead the first page and the stored ones fill the rest
+        pending.sort(key=_newest_first_key, reverse=True)
+        shown = pending[:limit]
+        if len(shown) < limit:
+            stored = await self.repository.page(
+                username, limit - len(shown), None, sort, role_type, experience_level
+            )
+            next_cursor = stored["next_cursor"]
+        else:
+            # Buffered analyses past this page are listed once they are flushed
+            stored = await self.repository.page(username, 1, None, sort, role_type, experience_level)
+            next_cursor = encode_cursor(sort, shown[-1]) if stored["analyses"] or len(pending) > limit else None
+
+        # A flush may finish between the read and now; ids identify those documents
+        pending_ids = {str(document["_id"]) for document in pending}
+        analyses = [serialize_summary(project_summary(document)) for document in shown]
+        analyses += [item for item in stored["analyses"] if item["analysis_id"] not in pending_ids][:limit - len(shown)]
+        flushed = sum(item["analysis_id"] in pending_ids for item in stored["analyses"])
+        return {
+            **stored,
+            "analyses": analyses,
+            "next_cursor": next_cursor,
+            "total_count": stored["total_count"] + len(pending) - flushed,
+            "limit": limit
+        }
+
+    async def get(self, username: str, analysis_id: str) -> Optional[Dict[str, Any]]:
+        for document in self._pending_for(username):
+            if str(document["_id"]) == analysis_id:
+                return serialize_detail(document)
+        return await self.repository.get(username, analysis_id)
+
+    async def embedding(self, username: str, analysis_id: str) -> Optional[bytes]:
+        for document in self._pending_for(username):
+            if str(document["_id"]) == analysis_id:
+                return document.get("embedding")
+        return await self.repository.embedding(username, analysis_id)
+
+    async def summaries(self, username: str, analysis_ids: List[str]) -> List[Dict[str, Any]]:
+        pending = [document for document in self._pending_for(username) if str(document["_id"]) in analysis_ids]
+        pending_ids = {str(document["_id"]) for document in pending}
+        stored = await self.repository.summaries(
+            username, [analysis_id for analysis_id in analysis_ids if analysis_id not in pending_ids]
+        )
+        return [project_summary(document) for document in pending] + stored
+
+    async def stats(self, username: str) -> Dict[str, Any]:
+        return await self.repository.stats(username)
+
+    async def trend(
+        self, dimension: str, granularity: str, starts: List[datetime], top: int = TREND_TOP_VALUES
+    ) -> Dict[str, Any]:
+        return await self.repository.trend(dimension, granularity, starts, top)
+
+    async def latest_change(self, username: str) -> ChangeMarker:
+        stored = await self.repository.latest_change(username)
+        pending = self._pending_for(username)
+        if not pending:
+            return stored
+        # Pending documents are counted twice while their flush is finishing, which only makes the marker change early
+        newest = max(_newest_first_key(document)[0] for document in pending)
+        updated_at = max(newest, stored.updated_at) if stored.updated_at else newest
+        return ChangeMarker(stored.count + len(pending), updated_at)
+
+    def buffer_stats(self) -> Dict[str, Any]:
+        """Return the buffer depth and flush counters."""
+        flushes = self._counters["flushes"]
+        return {
+            **self._counters,
+            "pending": len(self._buffer),
+            "in_flight": len(self._in_flight),
+            "mean_batch_size": round(self._counters["written"] / flushes, 2) if flushes else 0.0,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_seconds * 1000,
+            "max_pending": self.max_pending
+        }
+
+    def _pending_for(self, username: str) -> List[Dict[str, Any]]:
+        return [document for document in self._in_flight + self._buffer if document["username"] == username]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            while self._buffer:
+                # A failed batch is back in the buffer; wait for the next round before retrying it
+                if not await self._flush() or len(self._buffer) < self.batch_size:
+                    break
+
+    async def _flush(self) -> bool:
+        """Write the oldest batch; on failure put it back at the front of the buffer and return False."""
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:len(batch)]
+        self._in_flight = batch
+
+        for attempt in range(self.retries + 1):
+            try:
+                await self.repository.insert_many(batch)
+                self._counters["flushes"] += 1
+                self._counters["written"] += len(batch)
+                self._in_flight = []
+                return True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    self._counters["failed_flushes"] += 1
+                    logger.error(
+                        f"Writing {len(batch)} analyses failed {attempt + 1} times, keeping them buffered: {e}"
+                    )
+                    break
+                self._counters["retries"] += 1
+                logger.warning(f"Writing {len(batch)} analyses failed, retrying: {e}")
+                await asyncio.sleep(self.retry_backoff_seconds * 2 ** attempt)
+        self._buffer[:0] = batch
+        self._in_flight = []
+        return False
+
+
+async def replay_dead_letter(path: str, batch_size: int = ANALYSIS_WRITE_BATCH_SIZE) -> int:
+    """Store the analyses of a dead-letter file and return how many were new.
+
+    The file is renamed before it is read, so a process stopping meanwhile
+    starts a new one; an interrupted replay resumes from the renamed file.
+    Analyses stored by an earlier attempt are skipped by their ids.
+    """
+    from repositories import create_repositories
+
+    replaying = f"{path}.replaying"
+    if os.path.exists(path) and not os.path.exists(replaying):
+        os.replace(path, replaying)
+    if not os.path.exists(replaying):
+        return 0
+
+    repositories = create_repositories("mongo")
+    # Straight to MongoDB, never through another write-behind buffer
+    target = repositories.writer.repository if repositories.writer else repositories.analyses
+    stored = 0
+    try:
+        batch: List[Dict[str, Any]] = []
+        for document in read_dead_letter(replaying):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                stored += await target.insert_many(batch)
+                batch = []
+        if batch:
+            stored += await target.insert_many(batch)
+    finally:
+        if repositories.client is not None:
+            repositories.client.close()
+    os.remove(replaying)
+    return stored
+
+
+def parse_args(argv: Iterable[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Store analyses the write-behind buffer could not write.")
+    parser.add_argument("--replay", action="store_true", help="Store the analyses of the dead-letter file")
+    parser.add_argument("--path", default=ANALYSIS_WRITE_DEAD_LETTER_PATH, help="Dead-letter file")
+    return parser.parse_args(list(argv))
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if not args.replay:
+        raise SystemExit("Nothing to do; pass --replay")
+    logger.info(f"Stored {asyncio.run(replay_dead_letter(args.path))} analyses from {args.path}")
@@ -0,0 +1,117 @@
+"""Worst-case latency of the rule-based text passes on adversarial inputs.
+
+Times the fallback summary, role phrase, experience and summary-cleaning
+rules on inputs with no sentence punctuation, which made the previous
+``[^.]*keyword[^.]*\\.`` and lazy role regexes backtrack quadratically. The
+previous regexes are timed alongside for inputs up to ``--legacy-max-bytes``:
+
+    cd backend
+    python -m benchmarks.adversarial_rules --sizes 1000,10000,100000
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+import nlp_service
+from rule_engine import find_role_phrase
+
+# The regexes the rule engine replaced, kept to show the difference
+LEGACY_PATTERNS = [
+    r'[^.]*full stack[^.]*\.', r'[^.]*fullstack[^.]*\.', r'[^.]*software developer[^.]*\.',
+    r'[^.]*engineer[^.]*\.', r'[^.]*responsible for[^.]*\.', r'[^.]*will[^.]*\.',
+    r'[^.]*develop[^.]*\.', r'[^.]*create[^.]*\.', r'[^.]*build[^.]*\.', r'[^.]*design[^.]*\.',
+    r'[^.]*collaborate[^.]*\.', r'[^.]*work with[^.]*\.', r'[^.]*assist[^.]*\.',
+    r'[^.]*support[^.]*\.', r'[^.]*\d+\+?\s*years?[^.]*\.', r'[^.]*experience[^.]*\.',
+    r'[^.]*qualifications[^.]*\.', r'[^.]*requirements[^.]*\.', r'[^.]*degree[^.]*\.',
+    r'[^.]*team[^.]*\.', r'[^.]*collaboration[^.]*\.', r'[^.]*organization[^.]*\.',
+    r'[^.]*mentor[^.]*\.',
+    r'(?:seeking|looking for|hiring)\s+(?:a|an)?\s*([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
+    r'(?:join us as|position as|role as)\s+(?:a|an)?\s*([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
+    r'([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))\s+(?:who|responsible|position|role)',
+    r'(?:we are|we\'re)\s+([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
+    r'(\d+)\+?\s*years?', r'(\d+)\+?\s*yrs?', r'(\d+)\s*to\s*(\d+)\s*years?',
+    r'(\d+)\+?\s*years?\s*of\s*experience'
+]
+
+# Input shapes that defeat backtracking regexes: no periods anywhere
+SHAPES: Dict[str, str] = {
+    "words": "we will build and support a platform team engineer role mentor ",
+    "leads": "hiring seeking we are position as ",
+    "digits": "1234567890",
+    "whitespace": "5 \t \n ",
+}
+
+
+def make_input(shape: str, size: int) -> str:
+    """Repeat a shape's unit up to the requested size in characters."""
+    unit = SHAPES[shape]
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def run_rules(text: str) -> None:
+    """Run every rule-based pass the rule engine serves."""
+    nlp_service._generate_fallback_summary(text)
+    nlp_service.detect_experience_level(text)
+    find_role_phrase(text)
+    nlp_service.clean_summary("Founded as a global leader.", text)
+
+
+def run_legacy(text: str) -> None:
+    """Run the replaced regexes over the text."""
+    for pattern in LEGACY_PATTERNS:
+        re.findall(pattern, text, flags=re.IGNORECASE)
+
+
+def best_of(runner: Callable[[str], None], text: str, repeats: int) -> float:
+    """Return the fastest of several timed runs, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        runner(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def run(args: argparse.Namespace) -> int:
+    """Print latency per shape and size and check the worst case against the budget."""
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"{'shape':<12}{'bytes':>10}{'rules ms':>12}{'us/KB':>10}{'legacy ms':>12}")
+
+    worst_ms = worst_per_kb = 0.0
+    worst_case = ""
+    for shape in SHAPES:
+        for size in sizes:
+            text = make_input(shape, size)
+            rules_ms = best_of(run_rules, text, args.repeats)
+            legacy = "-"
+            if size <= args.legacy_max_bytes:
+                legacy = f"{best_of(run_legacy, text, 1):.1f}"
+            per_kb = rules_ms * 1000 / (size / 1000)
+            worst_per_kb = max(worst_per_kb, per_kb)
+            if rules_ms > worst_ms:
+                worst_ms, worst_case = rules_ms, f"{shape} at {size} bytes"
+            print(f"{shape:<12}{size:>10}{rules_ms:>12.1f}{per_kb:>10.0f}{legacy:>12}")
+
+    # Linear scaling shows up as a flat us/KB column; the bound is its maximum
+    print(f"\nWorst case: {worst_ms:.1f} ms ({worst_case}), budget {args.budget_ms} ms")
+    print(f"Bound: {worst_per_kb:.0f} us per KB of input")
+    return 0 if worst_ms <= args.budget_ms else 1
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the rule engine on adversarial inputs.")
+    parser.add_argument("--sizes", default="1000,10000,50000,100000", help="Comma-separated input sizes in bytes")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--legacy-max-bytes", type=int, default=1000,
+                        help="Largest input to time the previous regexes on (they grow quadratically)")
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="Fail if any measurement exceeds this")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(run(parse_args(sys.argv[1:])))
@@ -0,0 +1,164 @@
+"""Concurrent end-to-end load on the HTTP API with the in-memory data backend.
+
+Runs the FastAPI app in this process (``DATA_BACKEND=memory``, so no MongoDB
+is needed) and drives it through its ASGI interface. ``--concurrency``
+clients, each logged in as one of ``--users`` accounts, repeatedly post a
+posting of the synthetic corpus to ``/analyze`` and read ``/history``,
+``/analyses`` and ``/stats``. Latency is reported per endpoint, along with
+the status codes seen. The analysis workers run as threads, so
+``--stub-summarizer`` can replace flan-t5 with a stand-in:
+
+    cd backend
+    python -m benchmarks.api_load --concurrency 16 --requests 10 --stub-summarizer
+    python -m benchmarks.api_load --stub-summarizer --save-baseline api.json
+    python -m benchmarks.api_load --stub-summarizer --baseline api.json
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.baseline import compare, load_baseline, percentile, save_baseline
+from benchmarks.corpus import generate
+from benchmarks.stubs import install_stub_summarizer
+
+ENDPOINTS = ["analyze", "history", "analyses", "stats"]
+PASSWORD = "benchmark-password"
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout_seconds: float) -> None:
+    """Poll /ready until the analysis workers have loaded their models."""
+    deadline = time.perf_counter() + timeout_seconds
+    while time.perf_counter() < deadline:
+        response = await client.get("/ready")
+        if response.status_code == 200:
+            return
+        if response.json().get("status") == "failed":
+            raise RuntimeError(f"Workers failed to start: {response.json().get('error')}")
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Workers not ready after {timeout_seconds}s")
+
+
+async def log_in(client: httpx.AsyncClient, username: str) -> Dict[str, str]:
+    """Register an account and return its authorization header."""
+    await client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD,
+        "name": username, "role": "benchmark"
+    })
+    response = await client.post("/login", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def drive(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Run every client's requests concurrently and summarize latency per endpoint."""
+    postings = [record["text"] for record in generate(args.shapes.split(","), args.concurrency * args.requests, args.seed)]
+    headers = await asyncio.gather(*(log_in(client, f"benchmark-{user}") for user in range(args.users)))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Counter = Counter()
+
+    async def call(endpoint: str, method: str, path: str, user_headers: Dict[str, str], **kwargs) -> None:
+        started = time.perf_counter()
+        response = await client.request(method, path, headers=user_headers, **kwargs)
+        latencies[endpoint].append(time.perf_counter() - started)
+        statuses[f"{endpoint} {response.status_code}"] += 1
+
+    async def user_session(number: int) -> None:
+        user_headers = headers[number % len(headers)]
+        for request in range(args.requests):
+            # Every posting is analyzed once, so the analysis cache does not serve repeats
+            posting = postings[(number * args.requests + request) % len(postings)]
+            await call("analyze", "POST", "/analyze", user_headers, json={"job_description": posting, "profile": args.profile})
+            await call("history", "GET", "/history", user_headers)
+            await call("analyses", "GET", "/analyses", user_headers, params={"limit": 20})
+            await call("stats", "GET", "/stats", user_headers)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(number) for number in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{sum(statuses.values())} requests in {elapsed:.1f}s; status codes: {dict(sorted(statuses.items()))}")
+    results = {}
+    for endpoint in ENDPOINTS:
+        timings = latencies[endpoint]
+        results[endpoint] = {
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 1),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 1),
+            "requests_per_s": round(len(timings) / elapsed, 1)
+        }
+    return results
+
+
+async def measure(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Start the app with the in-memory backend, load it and shut it down."""
+    os.environ["DATA_BACKEND"] = "memory"
+    os.environ["ANALYSIS_EXECUTOR_MODE"] = "thread"
+    os.environ["ANALYSIS_WORKERS"] = str(args.workers)
+    os.environ["ANALYSIS_QUEUE_SIZE"] = str(args.queue_size)
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    if args.stub_summarizer:
+        install_stub_summarizer(args.stub_delay_ms)
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            started = time.perf_counter()
+            await wait_until_ready(client, args.ready_timeout)
+            print(f"Ready in {time.perf_counter() - started:.1f}s ({'stub' if args.stub_summarizer else 'flan-t5'} summarizer)")
+            return await drive(client, args)
+
+
+def run(args: argparse.Namespace) -> int:
+    """Print per-endpoint latency and compare it with a baseline if one is given."""
+    settings = {
+        "concurrency": args.concurrency, "requests": args.requests, "users": args.users, "shapes": args.shapes,
+        "seed": args.seed, "profile": args.profile, "workers": args.workers,
+        "stub_summarizer": args.stub_summarizer, "stub_delay_ms": args.stub_delay_ms
+    }
+    results = asyncio.run(measure(args))
+
+    columns = ["p50_ms", "p95_ms", "p99_ms", "requests_per_s"]
+    print(f"{'endpoint':<12}" + "".join(f"{column:>16}" for column in columns))
+    for endpoint in ENDPOINTS:
+        print(f"{endpoint:<12}" + "".join(f"{results[endpoint][column]:>16}" for column in columns))
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, "api_load", settings, results)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        return 1 if compare(results, load_baseline(args.baseline, "api_load"), args.tolerance, settings) else 0
+    return 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Load test the HTTP API with the in-memory data backend.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=10, help="Analyze/read rounds per client")
+    parser.add_argument("--users", type=int, default=4, help="Accounts the clients are spread over")
+    parser.add_argument("--shapes", default="short,typical", help="Corpus shapes posted to /analyze")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--profile", default="standard", help="Analysis profile (fast, standard, full)")
+    parser.add_argument("--workers", type=int, default=2, help="Analysis worker threads")
+    parser.add_argument("--queue-size", type=int, default=64, help="Analyses allowed to wait for a worker")
+    parser.add_argument("--stub-summarizer", action="store_true", help="Replace flan-t5 with a stand-in")
+    parser.add_argument("--stub-delay-ms", type=float, default=0.0, help="Simulated latency of the stand-in per call")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for the models to load")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare with a saved baseline; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(run(parse_args(sys.argv[1:])))
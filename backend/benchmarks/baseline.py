@@ -0,0 +1,59 @@
+"""Saving benchmark results as a baseline and comparing later runs against it.
+
+A baseline is a JSON file of ``{"benchmark", "settings", "results"}``, where
+results map a case name to its metrics. Metrics ending in ``_per_s`` are
+better when higher; every other metric is a latency, better when lower.
+"""
+import json
+from typing import Any, Dict, List
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return a percentile of the values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def save_baseline(path: str, benchmark: str, settings: Dict[str, Any], results: Dict[str, Dict[str, float]]) -> None:
+    """Write results as the baseline for later runs."""
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"benchmark": benchmark, "settings": settings, "results": results}, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def load_baseline(path: str, benchmark: str) -> Dict[str, Any]:
+    """Read a baseline, checking that it was saved by the same benchmark."""
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("benchmark") != benchmark:
+        raise ValueError(f"{path} is a baseline of {baseline.get('benchmark')}, not {benchmark}")
+    return baseline
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    settings: Dict[str, Any]
+) -> int:
+    """Print every metric next to its baseline and return the number of regressions beyond tolerance."""
+    if baseline.get("settings") != settings:
+        print(f"Warning: baseline settings {baseline.get('settings')} differ from this run's {settings}")
+
+    print(f"\n{'case':<32}{'metric':>16}{'baseline':>12}{'current':>12}{'change':>10}")
+    regressions = 0
+    for case, metrics in sorted(baseline["results"].items()):
+        for metric, expected in sorted(metrics.items()):
+            current = results.get(case, {}).get(metric)
+            if current is None or not expected:
+                continue
+            change = current / expected - 1
+            worse = -change if metric.endswith("_per_s") else change
+            flag = ""
+            if worse > tolerance:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{case:<32}{metric:>16}{expected:>12}{current:>12}{change:>+10.0%}{flag}")
+
+    print(f"\n{regressions} regressions beyond {tolerance:.0%}")
+    return regressions
@@ -0,0 +1,134 @@
+"""Synthetic job description corpus for the benchmarks.
+
+Postings are generated from the keyword taxonomy with a fixed seed, so a run
+is reproducible and a taxonomy change is reflected in the corpus. Shapes:
+
+- ``short``: a few lines, just over the minimum length
+- ``typical``: a complete posting with responsibility and requirement sections
+- ``huge``: a long posting analyzed window by window
+- ``adversarial``: one long run without sentence punctuation or line breaks
+
+The corpus can also be written out, e.g. for ``bulk_analyze.py``:
+
+    cd backend
+    python -m benchmarks.corpus --per-shape 20 --out corpus.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List
+
+from keyword_index import get_keyword_index
+
+SHAPES = ["short", "typical", "huge", "adversarial"]
+
+COMPANY_LINES = [
+    "Our company was founded in {year} and serves customers in over {count} countries.",
+    "We are a fast-growing startup backed by leading investors.",
+    "Join a global leader in {domain} with offices across three continents.",
+]
+RESPONSIBILITY_LINES = [
+    "Design, build and maintain {skill} services used by millions of customers",
+    "Collaborate with product managers and designers to ship new features",
+    "Own services from design through deployment and on-call support",
+    "Review code, mentor junior engineers and improve engineering practices",
+    "Improve the reliability, observability and performance of {skill} systems",
+    "Work with {skill} and {other} to automate deployments and testing",
+]
+REQUIREMENT_LINES = [
+    "{years}+ years of professional experience with {skill}",
+    "Solid understanding of {skill} and {other}",
+    "Experience with cloud platforms, CI/CD pipelines and containers",
+    "Strong communication skills and a collaborative mindset",
+    "Bachelor's degree in computer science or equivalent experience",
+]
+BENEFIT_LINES = [
+    "Benefits include health insurance, a 401k match and flexible hours.",
+    "We offer a remote-friendly culture, learning budget and generous leave.",
+]
+DOMAINS = ["fintech", "healthcare", "logistics", "e-commerce", "education"]
+# Words that trigger the role, experience and summary rules, without any sentence breaks
+ADVERSARIAL_WORDS = [
+    "we", "are", "seeking", "hiring", "a", "senior", "engineer", "developer", "will", "build", "design",
+    "support", "team", "responsible", "for", "years", "experience", "5", "10+", "role", "as", "mentor"
+]
+
+
+def _fill(rng: random.Random, template: str, skills: List[str]) -> str:
+    skill, other = rng.sample(skills, 2)
+    return template.format(
+        skill=skill, other=other, years=rng.randint(1, 12), year=rng.randint(1950, 2020),
+        count=rng.randint(5, 90), domain=rng.choice(DOMAINS)
+    )
+
+
+def _posting(rng: random.Random, taxonomy: Dict[str, List[str]], sections: int) -> str:
+    skills = taxonomy["skills"]
+    role = rng.choice(taxonomy["role_titles"]).title()
+    lines = [f"We are seeking a {role} to join our {rng.choice(DOMAINS)} team.", _fill(rng, rng.choice(COMPANY_LINES), skills)]
+    for _ in range(sections):
+        lines.append(rng.choice(taxonomy["responsibility_headers"]).title() + ":")
+        lines.extend("- " + _fill(rng, template, skills) for template in rng.sample(RESPONSIBILITY_LINES, 4))
+        lines.append(rng.choice(taxonomy["requirement_headers"]).title() + ":")
+        lines.extend("- " + _fill(rng, template, skills) for template in rng.sample(REQUIREMENT_LINES, 3))
+    lines.append(rng.choice(BENEFIT_LINES))
+    return "\n".join(lines)
+
+
+def make_posting(shape: str, rng: random.Random, huge_chars: int = 60000, adversarial_chars: int = 20000) -> str:
+    """Generate one posting of the given shape."""
+    taxonomy = get_keyword_index().categories
+    if shape == "short":
+        skills = rng.sample(taxonomy["skills"], 3)
+        role = rng.choice(taxonomy["role_titles"]).title()
+        return f"Hiring a {role}.\nYou will work with {', '.join(skills)} in a small product team."
+    if shape == "typical":
+        return _posting(rng, taxonomy, sections=1)
+    if shape == "huge":
+        parts = []
+        while sum(len(part) for part in parts) < huge_chars:
+            parts.append(_posting(rng, taxonomy, sections=3))
+        return "\n\n".join(parts)[:huge_chars]
+    if shape == "adversarial":
+        words = []
+        length = 0
+        while length < adversarial_chars:
+            word = rng.choice(ADVERSARIAL_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)[:adversarial_chars]
+    raise ValueError(f"Unknown corpus shape: {shape}")
+
+
+def generate(shapes: List[str], per_shape: int, seed: int = 0, **sizes) -> Iterator[Dict[str, str]]:
+    """Yield ``per_shape`` postings of every shape as ``{"shape", "text"}`` records."""
+    rng = random.Random(seed)
+    for shape in shapes:
+        for _ in range(per_shape):
+            yield {"shape": shape, "text": make_posting(shape, rng, **sizes)}
+
+
+def run(args: argparse.Namespace) -> None:
+    """Write the corpus as JSON lines."""
+    output = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for record in generate(args.shapes.split(","), args.per_shape, args.seed):
+            output.write(json.dumps({"job_description": record["text"], "shape": record["shape"]}) + "\n")
+    finally:
+        if args.out:
+            output.close()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic job description corpus.")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"Comma-separated, from: {', '.join(SHAPES)}")
+    parser.add_argument("--per-shape", type=int, default=10, help="Postings per shape")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Output file (default: stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Latency and agreement of the vectorized TextRank against sumy's TextRank.
+
+Both summarizers rank the same pre-split sentences of every posting in the
+synthetic corpus (see ``benchmarks.corpus``). Overlap is the Jaccard index
+of the sentence sets they pick; 1.0 means they chose the same sentences:
+
+    cd backend
+    python -m benchmarks.extractive_summary --per-shape 10 --sentences 4
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.baseline import percentile
+from benchmarks.corpus import SHAPES, generate
+
+import nlp_service
+
+
+def timed_pick(method: str, sentences: List[str], count: int) -> Tuple[List[str], float]:
+    """Rank the sentences with one summarizer; returns the picked sentences and the seconds taken."""
+    started = time.perf_counter()
+    if method == "vectors":
+        picked = nlp_service._vector_sentences(sentences, count)
+    else:
+        picked = nlp_service._sumy_sentences(sentences, count)
+    return picked, time.perf_counter() - started
+
+
+def measure(shape: str, texts: List[str], args: argparse.Namespace) -> Dict[str, float]:
+    """Time both summarizers on the postings of one shape and compare their picks."""
+    latencies: Dict[str, List[float]] = {method: [] for method in nlp_service.EXTRACTIVE_SUMMARIZERS}
+    overlaps = []
+    sentence_counts = []
+    for text in texts:
+        sentences = nlp_service.split_sentences(text)
+        sentence_counts.append(len(sentences))
+        picks = {}
+        for method in latencies:
+            picks[method], seconds = timed_pick(method, sentences, args.sentences)
+            latencies[method].append(seconds)
+        vectors, sumy = set(picks["vectors"]), {sentence.strip() for sentence in picks["sumy"]}
+        union = vectors | sumy
+        overlaps.append(len(vectors & sumy) / len(union) if union else 1.0)
+
+    return {
+        "shape": shape,
+        "sentences": round(sum(sentence_counts) / len(sentence_counts)),
+        "sumy_p50_ms": round(percentile(latencies["sumy"], 0.5) * 1000, 2),
+        "sumy_p95_ms": round(percentile(latencies["sumy"], 0.95) * 1000, 2),
+        "vectors_p50_ms": round(percentile(latencies["vectors"], 0.5) * 1000, 2),
+        "vectors_p95_ms": round(percentile(latencies["vectors"], 0.95) * 1000, 2),
+        "overlap": round(sum(overlaps) / len(overlaps), 2)
+    }
+
+
+def run(args: argparse.Namespace) -> int:
+    """Load spaCy and the NLTK data, then print a comparison per shape."""
+    nlp_service.nlp = nlp_service._load_spacy()
+    if not nlp_service._check_nltk_data():
+        print("NLTK tokenizer data is missing; sumy cannot be compared")
+        return 1
+
+    corpus = list(generate(args.shapes.split(","), args.per_shape, args.seed))
+    columns = ["shape", "sentences", "sumy_p50_ms", "sumy_p95_ms", "vectors_p50_ms", "vectors_p95_ms", "overlap"]
+    print("".join(f"{column:>16}" for column in columns))
+    for shape in args.shapes.split(","):
+        result = measure(shape, [record["text"] for record in corpus if record["shape"] == shape], args)
+        print("".join(f"{str(result[column]):>16}" for column in columns))
+    return 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Compare the vectorized TextRank with sumy's TextRank.")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"Comma-separated, from: {', '.join(SHAPES)}")
+    parser.add_argument("--per-shape", type=int, default=10, help="Postings per shape")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--sentences", type=int, default=4, help="Sentences per summary")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(run(parse_args(sys.argv[1:])))
@@ -0,0 +1,126 @@
+"""Concurrent login throughput and event-loop stalls with bcrypt inline vs on the hashing pool.
+
+Simulates a burst of logins: ``--concurrency`` clients each verify
+``--logins`` passwords. ``inline`` calls bcrypt on the event loop, as the
+login handler used to; ``pool`` uses the bounded password hashing pool. A
+ticker coroutine measures how late the loop runs, which is the delay every
+other request (e.g. ``/analyze``) sees during the burst. Token verification is
+timed with and without the claims cache:
+
+    cd backend
+    python -m benchmarks.login_throughput --concurrency 32 --logins 4 --rounds 12
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Any, Dict, List
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+
+TICK_SECONDS = 0.005
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return a percentile of the values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: List[float]) -> None:
+    """Record how much later than scheduled each tick of the event loop runs."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        scheduled = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - scheduled))
+
+
+async def login_burst(mode: str, hashed: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every client's logins concurrently and summarize latency, throughput and loop lag."""
+    latencies: List[float] = []
+
+    async def client() -> None:
+        for _ in range(args.logins):
+            started = time.perf_counter()
+            if mode == "inline":
+                ok = auth.verify_password(args.password, hashed)
+            else:
+                ok = await auth.check_password(args.password, hashed)
+            assert ok
+            latencies.append(time.perf_counter() - started)
+
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    return {
+        "mode": mode,
+        "logins": len(latencies),
+        "logins_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000),
+        "loop_lag_p95_ms": round(percentile(lags, 0.95) * 1000, 1),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 1)
+    }
+
+
+async def token_checks(count: int) -> Dict[str, float]:
+    """Return microseconds per verify_token call with a cold and a warm claims cache."""
+    token = auth.create_access_token({"sub": "benchmark"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    started = time.perf_counter()
+    for _ in range(count):
+        auth.token_cache.discard(token)
+        await auth.verify_token(credentials)
+    uncached = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(count):
+        await auth.verify_token(credentials)
+    cached = time.perf_counter() - started
+
+    return {"uncached_us": round(uncached / count * 1e6, 1), "cached_us": round(cached / count * 1e6, 1)}
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Measure both login modes and token verification and print the results."""
+    auth.BCRYPT_ROUNDS = args.rounds
+    auth.PASSWORD_HASH_WORKERS = args.workers
+    hashed = auth.get_password_hash(args.password)
+
+    columns = ["mode", "logins", "logins_per_s", "p50_ms", "p95_ms", "loop_lag_p95_ms", "loop_lag_max_ms"]
+    print(f"bcrypt rounds {args.rounds}, hashing workers {args.workers}, {args.concurrency} concurrent clients")
+    print("".join(f"{column:>16}" for column in columns))
+    for mode in ["inline", "pool"]:
+        result = await login_burst(mode, hashed, args)
+        print("".join(f"{str(result[column]):>16}" for column in columns))
+
+    tokens = await token_checks(args.tokens)
+    print(f"\nverify_token: {tokens['uncached_us']} us uncached, {tokens['cached_us']} us with the claims cache")
+    auth.shutdown_hash_executor()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark concurrent login throughput.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients logging in")
+    parser.add_argument("--logins", type=int, default=4, help="Logins per client")
+    parser.add_argument("--rounds", type=int, default=auth.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=auth.PASSWORD_HASH_WORKERS, help="Password hashing threads")
+    parser.add_argument("--password", default="correct horse battery staple")
+    parser.add_argument("--tokens", type=int, default=2000, help="verify_token calls per measurement")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    asyncio.run(run(parse_args(sys.argv[1:])))
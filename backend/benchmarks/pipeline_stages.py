@@ -0,0 +1,149 @@
+"""Latency of every analysis stage on the synthetic corpus.
+
+Each posting of the corpus (see ``benchmarks.corpus``) is parsed with the
+profile's spaCy components and run through ``extract_skills``,
+``detect_job_role``, ``extract_sections``, ``extractive_summary`` and
+``generate_summary`` one stage at a time, followed by the complete
+``analyze_job_description``. Postings longer than one analysis window are
+parsed and analyzed window by window, and summarized from their condensed
+text, as the service does. ``--stub-summarizer`` replaces flan-t5 with a
+stand-in, so the measurement covers everything around the model:
+
+    cd backend
+    python -m benchmarks.pipeline_stages --per-shape 5 --stub-summarizer
+    python -m benchmarks.pipeline_stages --stub-summarizer --save-baseline stages.json
+    python -m benchmarks.pipeline_stages --stub-summarizer --baseline stages.json
+"""
+import argparse
+import logging
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from benchmarks.baseline import compare, load_baseline, percentile, save_baseline
+from benchmarks.corpus import SHAPES, generate
+from benchmarks.stubs import install_stub_summarizer
+
+STAGES = [
+    "parse", "extract_skills", "detect_job_role", "extract_sections",
+    "extractive_summary", "generate_summary", "analyze"
+]
+
+
+def timed(timings: Dict[str, List[float]], stage: str, function: Callable, *args) -> Any:
+    """Call a stage and record its latency."""
+    started = time.perf_counter()
+    result = function(*args)
+    timings[stage].append(time.perf_counter() - started)
+    return result
+
+
+def run_stages(text: str, profile: str, timings: Dict[str, List[float]]) -> None:
+    """Run every stage on one posting, timing each."""
+    import nlp_service
+
+    if len(text) > nlp_service.ANALYSIS_CHUNK_CHARS:
+        docs = timed(timings, "parse", lambda: list(nlp_service.parse_chunks(nlp_service.chunk_text(text), profile)))
+    else:
+        docs = [timed(timings, "parse", nlp_service.parse_text, text, profile)]
+
+    skills: List[str] = []
+    sections = defaultdict(list)
+    started = time.perf_counter()
+    for doc in docs:
+        skills.extend(nlp_service.extract_skills(doc))
+    timings["extract_skills"].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    roles = [nlp_service.detect_job_role(doc, skills) for doc in docs]
+    timings["detect_job_role"].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for doc in docs:
+        for name, lines in nlp_service.extract_sections(doc.text).items():
+            sections[name].extend(lines)
+    timings["extract_sections"].append(time.perf_counter() - started)
+
+    if len(docs) > 1:
+        # Long postings are condensed to the extractive summaries of their windows before summarizing
+        summary_text = timed(timings, "extractive_summary", nlp_service.condense_text, text)
+    else:
+        timed(timings, "extractive_summary", nlp_service.extractive_summary, text)
+        summary_text = text
+
+    level = nlp_service.detect_experience_level(text)
+    timed(timings, "generate_summary", nlp_service.generate_summary, summary_text, roles[0], skills, level, sections)
+    timed(timings, "analyze", nlp_service.analyze_job_description, text, profile)
+
+
+def measure(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Run the stages over the corpus and return latency percentiles per shape and stage."""
+    import nlp_service
+
+    if args.stub_summarizer:
+        install_stub_summarizer(args.stub_delay_ms)
+    started = time.perf_counter()
+    nlp_service.load_models()
+    print(f"Models loaded in {time.perf_counter() - started:.1f}s ({'stub' if args.stub_summarizer else 'flan-t5'} summarizer)")
+
+    corpus = list(generate(args.shapes.split(","), args.per_shape, args.seed))
+    # One untimed pass so lazy initialization is not attributed to the first posting
+    run_stages(corpus[0]["text"], args.profile, defaultdict(list))
+
+    results = {}
+    for shape in args.shapes.split(","):
+        timings: Dict[str, List[float]] = defaultdict(list)
+        for record in corpus:
+            if record["shape"] == shape:
+                for _ in range(args.repeats):
+                    run_stages(record["text"], args.profile, timings)
+        for stage in STAGES:
+            results[f"{shape}/{stage}"] = {
+                "p50_ms": round(percentile(timings[stage], 0.5) * 1000, 2),
+                "p95_ms": round(percentile(timings[stage], 0.95) * 1000, 2)
+            }
+    return results
+
+
+def run(args: argparse.Namespace) -> int:
+    """Print stage latencies and compare them with a baseline if one is given."""
+    settings = {
+        "shapes": args.shapes, "per_shape": args.per_shape, "seed": args.seed, "profile": args.profile,
+        "stub_summarizer": args.stub_summarizer, "stub_delay_ms": args.stub_delay_ms
+    }
+    results = measure(args)
+
+    shapes = args.shapes.split(",")
+    print(f"\n{'stage':<20}" + "".join(f"{shape + ' p50/p95 ms':>28}" for shape in shapes))
+    for stage in STAGES:
+        cells = [f"{results[f'{shape}/{stage}']['p50_ms']}/{results[f'{shape}/{stage}']['p95_ms']}" for shape in shapes]
+        print(f"{stage:<20}" + "".join(f"{cell:>28}" for cell in cells))
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, "pipeline_stages", settings, results)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        return 1 if compare(results, load_baseline(args.baseline, "pipeline_stages"), args.tolerance, settings) else 0
+    return 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark every analysis stage on a synthetic corpus.")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"Comma-separated, from: {', '.join(SHAPES)}")
+    parser.add_argument("--per-shape", type=int, default=5, help="Postings per shape")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per posting")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--profile", default="standard", help="Analysis profile (fast, standard, full)")
+    parser.add_argument("--stub-summarizer", action="store_true", help="Replace flan-t5 with a stand-in")
+    parser.add_argument("--stub-delay-ms", type=float, default=0.0, help="Simulated latency of the stand-in per call")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare with a saved baseline; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(run(parse_args(sys.argv[1:])))
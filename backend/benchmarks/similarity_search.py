@@ -0,0 +1,123 @@
+"""Latency and recall of the similar analyses search at a million vectors.
+
+Builds an embedding index (see ``embedding_index``) of ``--vectors``
+synthetic, clustered document vectors in a temporary directory, spread
+evenly over ``--users`` users; the default of one user is the worst case for
+the per-user search. Queries are stored vectors, searched among their
+owner's rows exactly and, after training the IVF clustering, within the
+``--probes`` closest clusters. Recall is the share of the exact
+top-k the IVF search finds. Exits 1 when the IVF p99 exceeds the budget:
+
+    cd backend
+    python -m benchmarks.similarity_search --vectors 1000000 --lists 1024
+    python -m benchmarks.similarity_search --users 10000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.baseline import percentile
+from embedding_index import EmbeddingIndex
+
+
+def owner(row: int, users: int) -> str:
+    return f"user{row % users}"
+
+
+def build(index: EmbeddingIndex, args: argparse.Namespace) -> List[str]:
+    """Append clustered random unit vectors in batches; returns the analysis ids."""
+    rng = np.random.default_rng(args.seed)
+    topics = rng.normal(size=(args.topics, args.dim)).astype(np.float32)
+    ids = [f"{row:024x}" for row in range(args.vectors)]
+    for start in range(0, args.vectors, 100000):
+        count = min(100000, args.vectors - start)
+        vectors = topics[rng.integers(0, args.topics, count)] + rng.normal(scale=0.8, size=(count, args.dim))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        owners = [owner(row, args.users) for row in range(start, start + count)]
+        index.add_many(ids[start:start + count], owners, vectors.astype(np.float16))
+    return ids
+
+
+def timed_searches(
+    index: EmbeddingIndex, queries: List[bytes], ids: List[str], users: List[str], k: int
+) -> Dict[str, object]:
+    """Search every query among its owner's rows; returns the results and latency percentiles."""
+    latencies = []
+    results = []
+    for vector, analysis_id, username in zip(queries, ids, users):
+        started = time.perf_counter()
+        results.append({match.analysis_id for match in index.search(vector, username, k, analysis_id)})
+        latencies.append(time.perf_counter() - started)
+    return {
+        "results": results,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+    }
+
+
+def run(args: argparse.Namespace) -> int:
+    """Build the index, compare exact and IVF search and check the IVF p99 against the budget."""
+    with tempfile.TemporaryDirectory() as directory:
+        index = EmbeddingIndex(os.path.join(directory, "embeddings"), probes=args.probes)
+        started = time.perf_counter()
+        ids = build(index, args)
+        print(f"Appended {args.vectors} vectors of {args.dim} dimensions in {time.perf_counter() - started:.1f}s")
+
+        rng = np.random.default_rng(args.seed + 1)
+        rows = rng.choice(args.vectors, size=args.queries, replace=False)
+        vectors = index._view()["vectors"]
+        queries = [vectors[row].tobytes() for row in rows]
+        query_ids = [ids[row] for row in rows]
+        query_users = [owner(row, args.users) for row in rows]
+
+        index.exact_max_rows = args.vectors
+        exact = timed_searches(
+            index, queries[:args.exact_queries], query_ids[:args.exact_queries], query_users[:args.exact_queries], args.k
+        )
+
+        started = time.perf_counter()
+        index.train_ivf(args.lists, args.sample, args.iterations, args.seed)
+        print(f"Trained {args.lists} clusters in {time.perf_counter() - started:.1f}s")
+        index.exact_max_rows = 0
+        ivf = timed_searches(index, queries, query_ids, query_users, args.k)
+        index.close()
+
+    found = [len(approximate & expected) / len(expected)
+             for approximate, expected in zip(ivf["results"], exact["results"]) if expected]
+    print(f"\n{'search':<8}" + "".join(f"{column:>12}" for column in ["p50_ms", "p95_ms", "p99_ms"]))
+    for name, result in [("exact", exact), ("ivf", ivf)]:
+        print(f"{name:<8}" + "".join(f"{result[column]:>12}" for column in ["p50_ms", "p95_ms", "p99_ms"]))
+    print(f"\nIVF recall@{args.k}: {sum(found) / len(found):.3f} ({args.probes} of {args.lists} clusters probed)")
+    print(f"IVF p99 {ivf['p99_ms']} ms, budget {args.budget_p99_ms} ms")
+    return 0 if ivf["p99_ms"] <= args.budget_p99_ms else 1
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the similar analyses search on synthetic vectors.")
+    parser.add_argument("--vectors", type=int, default=1000000, help="Vectors in the index")
+    parser.add_argument("--users", type=int, default=1, help="Users the vectors are spread over")
+    parser.add_argument("--dim", type=int, default=300, help="Vector dimensions (en_core_web_md has 300)")
+    parser.add_argument("--topics", type=int, default=500, help="Clusters the synthetic vectors are drawn around")
+    parser.add_argument("--queries", type=int, default=500, help="IVF searches")
+    parser.add_argument("--exact-queries", type=int, default=50, help="Exact searches, also the recall reference")
+    parser.add_argument("--k", type=int, default=10, help="Results per search")
+    parser.add_argument("--lists", type=int, default=1024, help="IVF clusters")
+    parser.add_argument("--probes", type=int, default=16, help="Clusters searched per query")
+    parser.add_argument("--sample", type=int, default=100000, help="Vectors the clusters are fit on")
+    parser.add_argument("--iterations", type=int, default=10, help="k-means iterations")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--budget-p99-ms", type=float, default=50.0, help="Fail if the IVF p99 exceeds this")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    sys.exit(run(parse_args(sys.argv[1:])))
@@ -0,0 +1,42 @@
+"""A stand-in for the flan-t5 summarizer, so benchmarks can measure everything around it."""
+import re
+import time
+from typing import Any, Dict, List
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with the calls ``nlp_service`` makes on the real one."""
+
+    def __call__(self, text: str, add_special_tokens: bool = False) -> Dict[str, List[str]]:
+        return {"input_ids": text.split()}
+
+    def decode(self, token_ids: List[str], skip_special_tokens: bool = True) -> str:
+        return " ".join(token_ids)
+
+
+class StubSummarizer:
+    """Answers summary prompts with the start of the prompt's description, after a fixed delay."""
+
+    def __init__(self, delay_ms: float = 0.0, words: int = 40):
+        self.tokenizer = StubTokenizer()
+        self.delay_seconds = delay_ms / 1000
+        self.words = words
+
+    def __call__(self, prompts: List[str], batch_size: int = 1, **kwargs) -> List[Dict[str, Any]]:
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        results = []
+        for prompt in prompts:
+            description = prompt.split("Job Description:", 1)[-1].split("\nRole:", 1)[0]
+            words = re.sub(r"\s+", " ", description).split()[:self.words]
+            results.append({"generated_text": " ".join(words)})
+        return results
+
+
+def install_stub_summarizer(delay_ms: float = 0.0) -> None:
+    """Make ``nlp_service.load_models`` load the stub instead of flan-t5 in this process."""
+    import nlp_service
+
+    nlp_service._load_summarizer = lambda: StubSummarizer(delay_ms)
+    if nlp_service.summarizer is not None:
+        nlp_service.summarizer = StubSummarizer(delay_ms)
@@ -0,0 +1,141 @@
+"""Latency, throughput and memory of the flan-t5 summarizer under CPU inference settings.
+
+Each configuration runs in its own process, since the settings are read at
+import time and peak RSS is per process. ``baseline`` is the previous setup
+(fp32 weights, beam search, PyTorch's default threads, raw-text prompt);
+``optimized`` uses int8 weights, greedy decoding, pinned threads and the
+section-based prompt:
+
+    cd backend
+    python -m benchmarks.summarizer_inference --prompts 16 --batch-size 4
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+CONFIGS: Dict[str, Dict[str, str]] = {
+    "baseline": {"SUMMARIZER_QUANTIZE": "false", "SUMMARIZER_DECODING": "beam"},
+    "quantized": {"SUMMARIZER_QUANTIZE": "true", "SUMMARIZER_DECODING": "beam"},
+    "greedy": {"SUMMARIZER_QUANTIZE": "false", "SUMMARIZER_DECODING": "greedy"},
+    "optimized": {"SUMMARIZER_QUANTIZE": "true", "SUMMARIZER_DECODING": "greedy"},
+}
+
+SAMPLE_POSTING = """We are seeking a Backend Developer to join our platform team.
+Our company was founded in 2001 and serves customers in over 40 countries.
+Key Responsibilities:
+- Design and build scalable REST APIs with Python and Django
+- Own services from design through deployment and on-call support
+- Collaborate with product managers and frontend engineers on new features
+- Improve observability, reliability and performance of distributed systems
+Requirements:
+- {years}+ years of professional software development experience
+- Experience with PostgreSQL, Redis and message queues
+- Familiarity with Docker, Kubernetes and CI/CD pipelines
+Benefits include health insurance, a 401k match and flexible hours.
+"""
+
+
+def sample_prompts(count: int, use_sections: bool) -> List[str]:
+    """Build summary prompts for synthetic postings, with or without section extraction."""
+    import nlp_service
+
+    prompts = []
+    for index in range(count):
+        text = SAMPLE_POSTING.format(years=2 + index % 8)
+        sections = nlp_service.extract_sections(text) if use_sections else None
+        prompts.append(nlp_service.build_summary_prompt(text, "Backend Developer", sections=sections))
+    return prompts
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return a percentile of the values."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(config: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Load the summarizer with the current settings and time it; runs in the child process."""
+    import nlp_service
+
+    if config != "baseline":
+        nlp_service.torch_threads = args.threads or nlp_service.torch_threads_for(args.workers)
+
+    started = time.perf_counter()
+    nlp_service.summarizer = nlp_service._load_summarizer()
+    load_seconds = time.perf_counter() - started
+
+    prompts = sample_prompts(args.prompts, use_sections=config != "baseline")
+    nlp_service.run_summarizer(prompts[:1])
+
+    latencies = []
+    for prompt in prompts:
+        started = time.perf_counter()
+        nlp_service.run_summarizer([prompt])
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for offset in range(0, len(prompts), args.batch_size):
+        nlp_service.run_summarizer(prompts[offset:offset + args.batch_size])
+    batched_seconds = time.perf_counter() - started
+
+    import torch
+    return {
+        "config": config,
+        "variant": nlp_service.summarizer_variant(),
+        "threads": torch.get_num_threads(),
+        "load_s": round(load_seconds, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000),
+        "seq_per_s": round(len(prompts) / sum(latencies), 2),
+        "batch_per_s": round(len(prompts) / batched_seconds, 2),
+        # ru_maxrss is reported in kilobytes on Linux
+        "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    }
+
+
+def run_child(config: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Measure one configuration in a fresh interpreter."""
+    env = {**os.environ, **CONFIGS[config]}
+    command = [
+        sys.executable, "-m", "benchmarks.summarizer_inference", "--child", config,
+        "--prompts", str(args.prompts), "--batch-size", str(args.batch_size),
+        "--threads", str(args.threads), "--workers", str(args.workers)
+    ]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(args: argparse.Namespace) -> None:
+    """Measure every requested configuration and print a comparison table."""
+    if args.child:
+        print(json.dumps(measure(args.child, args)))
+        return
+
+    columns = ["config", "variant", "threads", "load_s", "p50_ms", "p95_ms", "seq_per_s", "batch_per_s", "rss_mb"]
+    print("".join(f"{column:>12}" for column in columns))
+    for config in args.configs.split(","):
+        result = run_child(config, args)
+        print("".join(f"{str(result[column]):>12}" for column in columns))
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark summarizer CPU inference settings.")
+    parser.add_argument("--configs", default="baseline,optimized", help=f"Comma-separated, from: {', '.join(CONFIGS)}")
+    parser.add_argument("--prompts", type=int, default=16, help="Prompts per measurement")
+    parser.add_argument("--batch-size", type=int, default=4, help="Prompts per call in the throughput run")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (default: cores split across --workers)")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes the cores are shared between")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,269 @@
+"""Offline bulk analysis of job description corpora.
+
+Reads JSONL or CSV records, parses them with ``nlp.pipe`` and streams one JSON
+result per line to the output file. Progress is checkpointed after every
+chunk so an interrupted run resumes where it stopped:
+
+    python bulk_analyze.py postings.jsonl results.jsonl --n-process 4
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import nlp_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STAGES = ["parse", "analyze", "summarize", "write"]
+
+
+def parse_record(row: Any, index: int, text_field: str, id_field: str) -> Tuple[Any, str, Optional[str]]:
+    """Return (record id, description text, error) for one CSV row or JSONL line."""
+    try:
+        record = json.loads(row) if isinstance(row, str) else row
+    except ValueError as e:
+        return index, "", f"Record {index} is not valid JSON: {e}"
+    if not isinstance(record, dict):
+        return index, "", f"Record {index} is a JSON {type(record).__name__}, not an object"
+
+    record_id = record.get(id_field, index)
+    text = record.get(text_field)
+    if text is None:
+        return record_id, "", None
+    if not isinstance(text, str):
+        return record_id, "", f"Record {index} has a {type(text).__name__} {text_field}, not a string"
+    return record_id, text, None
+
+
+def read_records(path: str, text_field: str, id_field: str) -> Iterator[Tuple[Any, str, Optional[str]]]:
+    """Yield (record id, description text, error) triples from a JSONL or CSV file.
+
+    A malformed record yields an error instead of raising, so it is written as
+    an error row and counted like any other record; a resumed run never stops
+    at the same record again.
+    """
+    is_csv = path.lower().endswith(".csv")
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(f) if is_csv else (line for line in f if line.strip())
+        index = 0
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # The reader has consumed the offending line and can go on
+                yield index, "", f"Record {index} is not valid CSV: {e}"
+            else:
+                yield parse_record(row, index, text_field, id_field)
+            index += 1
+
+
+class Checkpoint:
+    """Tracks how many input records have been durably written to the output."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.processed = 0
+        self.output_bytes = 0
+
+    def open_output(self, path: str) -> BinaryIO:
+        """Open the output for appending, dropping anything written after the last checkpoint.
+
+        Records of a chunk interrupted before its checkpoint are redone, so
+        their partial output must go.
+        """
+        out = open(path, "ab")
+        out.truncate(self.output_bytes)
+        return out
+
+    def load(self) -> None:
+        """Restore progress from the checkpoint file, if present."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.processed = state["processed"]
+        self.output_bytes = state["output_bytes"]
+
+    def save(self, processed: int, output_bytes: int) -> None:
+        """Atomically record progress after a chunk has been flushed to disk."""
+        self.processed = processed
+        self.output_bytes = output_bytes
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"processed": processed, "output_bytes": output_bytes}, f)
+        os.replace(tmp_path, self.path)
+
+
+class StageTimer:
+    """Accumulates wall time and document counts per pipeline stage."""
+
+    def __init__(self):
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.docs = {stage: 0 for stage in STAGES}
+
+    def add(self, stage: str, seconds: float, docs: int) -> None:
+        """Charge a stage with elapsed time for a number of documents."""
+        self.seconds[stage] += seconds
+        self.docs[stage] += docs
+
+    def report(self) -> Dict[str, float]:
+        """Return throughput in docs/sec for each stage."""
+        return {
+            stage: round(self.docs[stage] / self.seconds[stage], 2) if self.seconds[stage] else 0.0
+            for stage in STAGES
+        }
+
+
+def _timed_chunks(docs: Iterator, size: int, timer: StageTimer) -> Iterator[List]:
+    """Group the parsed-doc stream into chunks, charging generator time to the parse stage."""
+    while True:
+        started = time.perf_counter()
+        chunk = list(islice(docs, size))
+        timer.add("parse", time.perf_counter() - started, len(chunk))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_chunk(chunk: List, profile: str, summary_batch_size: int, timer: StageTimer) -> List[Dict[str, Any]]:
+    """Analyze a chunk of parsed docs, batching the summarizer calls."""
+    use_model = nlp_service.ANALYSIS_PROFILES[profile]["summary"] == "model"
+    metadata = nlp_service.profile_metadata(profile)
+    started = time.perf_counter()
+    rows = []
+    for doc, (record_id, text, error) in chunk:
+        if error:
+            rows.append({"id": record_id, "error": error})
+            continue
+        try:
+            nlp_service.validate_job_description(text)
+            if len(text) > nlp_service.ANALYSIS_CHUNK_CHARS:
+                # Long records skipped nlp.pipe and are analyzed window by window
+                rows.append({"id": record_id, "analysis": nlp_service.analyze_job_description(text, profile)})
+                continue
+            insights = nlp_service.analyze_doc(doc)
+            rows.append({"id": record_id, "text": text, "insights": insights})
+        except Exception as e:
+            rows.append({"id": record_id, "error": str(e)})
+    timer.add("analyze", time.perf_counter() - started, len(chunk))
+
+    started = time.perf_counter()
+    pending = [row for row in rows if "insights" in row]
+    if use_model:
+        for offset in range(0, len(pending), summary_batch_size):
+            batch = pending[offset:offset + summary_batch_size]
+            prompts = [
+                nlp_service.build_summary_prompt(
+                    row["text"],
+                    row["insights"]['role_type'],
+                    row["insights"]['experience_level'],
+                    row["insights"]['sections']
+                )
+                for row in batch
+            ]
+            try:
+                generated = nlp_service.run_summarizer(prompts)
+            except Exception as e:
+                logger.warning(f"Summary batch failed, falling back to extractive summaries: {e}")
+                generated = [""] * len(batch)
+            for row, summary in zip(batch, generated):
+                row["summary"] = nlp_service.finalize_summary(summary, row["text"])
+    else:
+        for row in pending:
+            row["summary"] = nlp_service.summarize_for_profile(row["text"], row["insights"], profile)
+    timer.add("summarize", time.perf_counter() - started, len(pending))
+
+    results = []
+    for row in rows:
+        if "error" in row:
+            results.append({"id": row["id"], "error": row["error"]})
+        elif "analysis" in row:
+            results.append({"id": row["id"], "analysis": row["analysis"]})
+        else:
+            analysis = nlp_service.build_result(row["insights"], row["summary"], metadata)
+            results.append({"id": row["id"], "analysis": analysis})
+    return results
+
+
+def run(args: argparse.Namespace) -> None:
+    """Analyze the input corpus, resuming from the checkpoint if one exists."""
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    if args.restart:
+        for path in (checkpoint.path, args.output):
+            if os.path.exists(path):
+                os.remove(path)
+    checkpoint.load()
+
+    if checkpoint.processed:
+        logger.info(f"Resuming after {checkpoint.processed} records")
+
+    profile = nlp_service.resolve_profile(args.profile)
+    nlp_service.load_models()
+    records = islice(read_records(args.input, args.text_field, args.id_field), checkpoint.processed, None)
+    # Records too long for one doc are parsed later in bounded windows instead
+    docs = nlp_service.nlp.pipe(
+        (
+            (text if len(text) <= nlp_service.ANALYSIS_CHUNK_CHARS else "", (record_id, text, error))
+            for record_id, text, error in records
+        ),
+        as_tuples=True,
+        disable=nlp_service.profile_disabled_components(profile),
+        batch_size=args.batch_size,
+        n_process=args.n_process
+    )
+
+    timer = StageTimer()
+    processed = resumed_at = checkpoint.processed
+    run_started = time.perf_counter()
+
+    with checkpoint.open_output(args.output) as out:
+        for chunk in _timed_chunks(docs, args.chunk_size, timer):
+            results = analyze_chunk(chunk, profile, args.summary_batch_size, timer)
+
+            started = time.perf_counter()
+            for result in results:
+                out.write((json.dumps(result, default=str) + "\n").encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            processed += len(results)
+            checkpoint.save(processed, out.tell())
+            timer.add("write", time.perf_counter() - started, len(results))
+
+            elapsed = time.perf_counter() - run_started
+            logger.info(
+                f"Processed {processed} records ({(processed - resumed_at) / elapsed:.1f} docs/sec overall); "
+                f"docs/sec by stage: {timer.report()}"
+            )
+
+    logger.info(f"Finished: {processed} records written to {args.output}")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Analyze a corpus of job descriptions offline.")
+    parser.add_argument("input", help="JSONL or CSV file of job descriptions")
+    parser.add_argument("output", help="JSONL file to stream results to")
+    parser.add_argument("--text-field", default="job_description", help="Field holding the description text")
+    parser.add_argument("--id-field", default="id", help="Field holding the record id (defaults to the row number)")
+    parser.add_argument("--profile", help="Analysis profile (fast, standard, full; default: ANALYSIS_PROFILE)")
+    parser.add_argument("--batch-size", type=int, default=64, help="nlp.pipe batch size")
+    parser.add_argument("--n-process", type=int, default=1, help="nlp.pipe worker processes")
+    parser.add_argument("--summary-batch-size", type=int, default=8, help="Prompts per summarizer call")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Records per checkpoint")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
@@ -1,43 +1,80 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 import os
 from dotenv import load_dotenv
 import logging
-from typing import Optional
+from typing import Any, Dict
+
+from telemetry import MONGO_COMMAND_SECONDS
 
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "job_analyzer")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "5000"))
+
+
+def mongodb_uri() -> str:
+    """Return the configured MongoDB URI, defaulting to a local server."""
+    return MONGODB_URI or "mongodb://localhost:27017/"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records the duration of every MongoDB command, by command name and outcome."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="error")
+
+
+def client_options() -> Dict[str, Any]:
+    """Return the connection pool and timeout options shared by the sync and async clients."""
+    return {
+        "event_listeners": [CommandMetrics()],
+        "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS
+    }
+
 
 def get_mongodb_client() -> MongoClient:
-    """Initialize and return MongoDB client with proper configuration."""
-    mongodb_uri = os.getenv("MONGODB_URI")
-    
-    if not mongodb_uri:
+    """Create the synchronous MongoDB client; it connects lazily on first use."""
+    if not MONGODB_URI:
         logger.warning("MONGODB_URI not found, using local MongoDB")
-        return MongoClient("mongodb://localhost:27017/")
-    
-    try:
-        client = MongoClient(
-            mongodb_uri,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=5000,
-            socketTimeoutMS=5000
-        )
-        
-        client.admin.command('ping')
-        logger.info("Successfully connected to MongoDB")
-        return client
-        
-    except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {e}")
-        logger.info("Falling back to local MongoDB")
-        return MongoClient("mongodb://localhost:27017/")
+    return MongoClient(mongodb_uri(), **client_options())
+
+
+def get_async_mongodb_client():
+    """Create the asyncio MongoDB client used by the API repositories."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(mongodb_uri(), **client_options())
 
 
+# The synchronous client serves the thread-pool callers: the analysis cache,
+# analysis jobs and command-line tools
 client = get_mongodb_client()
-db = client.job_analyzer
+db = client[MONGODB_DATABASE]
 
 users_collection = db.users
-analyses_collection = db.analyses
\ No newline at end of file
+analyses_collection = db.analyses
+analysis_cache_collection = db.analysis_cache
+analysis_jobs_collection = db.analysis_jobs
+user_stats_collection = db.user_stats
+job_descriptions_collection = db.job_descriptions
+trend_rollups_collection = db.trend_rollups
@@ -0,0 +1,532 @@
+"""Nearest-neighbour search over the document vectors of stored analyses.
+
+Every analysis stores the normalized mean word vector of its text (see
+``nlp_service.AnalysisContext.document_vector``). The index keeps those
+vectors as float16 rows in an append-only file that is memory-mapped for
+search, next to files of the analysis ids and of a key of the owning user,
+so cosine similarity is one dot product per row. Rows are grouped by owner
+in memory, so a search only touches the rows of the user it is for. A user's
+rows are searched exactly, ``EMBEDDING_SEARCH_BATCH_ROWS`` at a time; once a
+coarse clustering (IVF) has been trained, users with more than
+``EMBEDDING_EXACT_MAX_ROWS`` rows are searched within the
+``EMBEDDING_IVF_PROBES`` clusters closest to the query instead.
+
+API processes append to the index under a file lock, so any number of
+them can share one index path. Rebuild the index from the vectors stored with the analyses, first
+computing the missing ones with ``--backfill``, or train the clustering,
+while the API is stopped:
+
+    cd backend
+    python embedding_index.py rebuild --backfill
+    python embedding_index.py train-ivf --lists 1024
+"""
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_INDEX_PATH = os.getenv(
+    "EMBEDDING_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "embeddings")
+)
+EMBEDDING_SEARCH_BATCH_ROWS = int(os.getenv("EMBEDDING_SEARCH_BATCH_ROWS", "65536"))
+EMBEDDING_EXACT_MAX_ROWS = int(os.getenv("EMBEDDING_EXACT_MAX_ROWS", "50000"))
+EMBEDDING_IVF_PROBES = int(os.getenv("EMBEDDING_IVF_PROBES", "16"))
+
+SIMILAR_ANALYSES_LIMIT = 10
+SIMILAR_ANALYSES_MAX_LIMIT = 50
+
+ID_BYTES = 12
+# Rows assigned to clusters per matrix product; bounds the score matrix to rows x lists
+ASSIGN_BATCH_ROWS = 8192
+# Rows are grouped by owner again once this share of them was appended after the last grouping
+OWNER_REGROUP_FRACTION = 0.1
+
+FILE_SUFFIXES = [".vectors", ".ids", ".owners", ".lists", ".centroids.npy", ".json", ".lock"]
+
+
+class SimilarAnalysis(NamedTuple):
+    analysis_id: str
+    similarity: float
+
+
+def encode_vector(vector: np.ndarray) -> Optional[bytes]:
+    """L2-normalize a vector and return it as float16 bytes; None for a zero vector."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if not norm or not np.isfinite(norm):
+        return None
+    return (vector / norm).astype(np.float16).tobytes()
+
+
+def decode_vector(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+
+
+def owner_key(username: str) -> int:
+    """Return the 64-bit key stored per row instead of the username."""
+    return int.from_bytes(hashlib.blake2b(username.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def remove_index_files(path: str) -> None:
+    """Delete the files of the index at ``path``."""
+    for suffix in FILE_SUFFIXES:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _nearest_clusters(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Return the closest centroid of every row, in batches of ASSIGN_BATCH_ROWS."""
+    assignment = np.empty(len(vectors), dtype=np.uint32)
+    for start in range(0, len(vectors), ASSIGN_BATCH_ROWS):
+        block = np.asarray(vectors[start:start + ASSIGN_BATCH_ROWS], dtype=np.float32)
+        assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignment
+
+
+def _cluster_means(data: np.ndarray, assignment: np.ndarray, lists: int, rng: np.random.Generator) -> np.ndarray:
+    """Return the normalized mean of every cluster; empty clusters are reseeded from random rows."""
+    centroids = data[rng.integers(0, len(data), lists)].copy()
+    order = np.argsort(assignment, kind="stable")
+    counts = np.bincount(assignment, minlength=lists)
+    filled = np.flatnonzero(counts)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+    centroids[filled] = np.add.reduceat(data[order], starts, axis=0)
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    return centroids / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIndex:
+    """Append-only store of analysis vectors with exact and IVF top-k search.
+
+    With ``path`` None the rows are kept in memory only, for the in-memory
+    data backend.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = EMBEDDING_INDEX_PATH,
+        batch_rows: int = EMBEDDING_SEARCH_BATCH_ROWS,
+        exact_max_rows: int = EMBEDDING_EXACT_MAX_ROWS,
+        probes: int = EMBEDDING_IVF_PROBES
+    ):
+        self.path = path
+        self.batch_rows = max(1, batch_rows)
+        self.exact_max_rows = exact_max_rows
+        self.probes = max(1, probes)
+        self.dim: Optional[int] = None
+        self.count = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        # Column name -> rows, memory-mapped from the files or in-memory buffers
+        self._columns: Dict[str, np.ndarray] = {}
+        self._mapped = 0
+        self._files: Dict[str, Any] = {}
+        self._lock_file = None
+        # Row numbers ordered by owner key, the distinct keys and each key's offset, as of ``_grouped`` rows
+        self._owner_order = np.zeros(0, dtype=np.int64)
+        self._owner_keys = np.zeros(0, dtype=np.uint64)
+        self._owner_offsets = np.zeros(1, dtype=np.int64)
+        self._grouped = 0
+        self._counters = {"added": 0, "exact_searches": 0, "ivf_searches": 0, "errors": 0}
+        if path:
+            self._open()
+
+    def add(self, analysis_id: str, username: str, vector: bytes) -> bool:
+        """Append the vector of a stored analysis; returns False when it could not be stored."""
+        values = np.frombuffer(vector, dtype=np.float16)
+        try:
+            self.add_many([analysis_id], [username], values[None, :])
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._counters["errors"] += 1
+            logger.warning(f"Adding analysis {analysis_id} to the embedding index failed: {e}")
+            return False
+        return True
+
+    def add_many(self, analysis_ids: Sequence[str], usernames: Sequence[str], vectors: np.ndarray) -> None:
+        """Append rows of normalized float16 vectors."""
+        if not len(analysis_ids):
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float16)
+        ids = b"".join(bytes.fromhex(analysis_id) for analysis_id in analysis_ids)
+        rows = {
+            "vectors": vectors,
+            "ids": np.frombuffer(ids, dtype=np.uint8).reshape(-1, ID_BYTES),
+            "owners": np.array([owner_key(username) for username in usernames], dtype=np.uint64)
+        }
+        with self._lock, self._exclusive():
+            if self.dim is None:
+                self._initialize(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of {self.dim} dimensions, got {vectors.shape[1]}")
+            if self.centroids is not None:
+                rows["lists"] = _nearest_clusters(vectors, self.centroids)
+            if self.path:
+                # Other processes may have appended since
+                self.count = self._stored_rows()
+            self._append(rows)
+            self.count += len(analysis_ids)
+            self._counters["added"] += len(analysis_ids)
+
+    def search(self, vector: bytes, username: str, k: int, exclude: Optional[str] = None) -> List[SimilarAnalysis]:
+        """Return the user's ``k`` analyses most similar to a vector, most similar first."""
+        query = decode_vector(vector)
+        with self._lock:
+            if self.path:
+                if self.dim is None:
+                    with self._exclusive():
+                        self._load()
+                self.count = self._stored_rows() if self.dim else 0
+            if not self.count or len(query) != self.dim:
+                return []
+            columns = self._view()
+            rows = self._owner_rows(columns["owners"], np.uint64(owner_key(username)))
+            ivf = self.centroids is not None and len(rows) > self.exact_max_rows
+            self._counters["ivf_searches" if ivf else "exact_searches"] += 1
+            centroids = self.centroids
+        if ivf:
+            nearest = np.argsort(-(centroids @ query))[:self.probes]
+            rows = rows[np.isin(columns["lists"][rows], nearest)]
+
+        # One extra in case the query's own analysis is among the best
+        best_rows, best_scores = self._top_k(query, columns["vectors"], rows, k + 1)
+        exclude_id = bytes.fromhex(exclude) if exclude else None
+        results = []
+        for row, score in zip(best_rows, best_scores):
+            analysis_id = columns["ids"][row].tobytes()
+            if analysis_id != exclude_id:
+                results.append(SimilarAnalysis(analysis_id.hex(), float(score)))
+        return results[:k]
+
+    def train_ivf(self, lists: int, sample: int = 100000, iterations: int = 10, seed: int = 0) -> None:
+        """Cluster the vectors with spherical k-means and assign every row to its closest cluster."""
+        with self._lock:
+            columns = self._view()
+            count = self.count
+        if count < lists:
+            raise ValueError(f"Cannot train {lists} clusters on {count} vectors")
+
+        rng = np.random.default_rng(seed)
+        sampled = np.sort(rng.choice(count, size=min(sample, count), replace=False))
+        data = columns["vectors"][sampled].astype(np.float32)
+        centroids = data[rng.choice(len(data), size=lists, replace=False)]
+        for iteration in range(iterations):
+            centroids = _cluster_means(data, _nearest_clusters(data, centroids), lists, rng)
+            logger.info(f"k-means iteration {iteration + 1}/{iterations}")
+        assignment = _nearest_clusters(columns["vectors"], centroids)
+
+        with self._lock:
+            # Rows appended while assigning are assigned now
+            if self.count > count:
+                assignment = np.concatenate([assignment, _nearest_clusters(self._view()["vectors"][count:], centroids)])
+            self.centroids = centroids.astype(np.float32)
+            if self.path:
+                if "lists" in self._files:
+                    self._files.pop("lists").close()
+                assignment.tofile(self.path + ".lists")
+                np.save(self.path + ".centroids.npy", self.centroids)
+                self._write_meta()
+                self._files["lists"] = open(self.path + ".lists", "ab")
+                self._mapped = 0
+            else:
+                self._columns["lists"] = assignment
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the index size, search settings and counters."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "vectors": self.count,
+            "dim": self.dim,
+            "persistent": self.path is not None,
+            "ivf_lists": 0 if self.centroids is None else len(self.centroids),
+            "ivf_probes": self.probes,
+            "exact_max_rows": self.exact_max_rows
+        }
+
+    def close(self) -> None:
+        """Close the files appended to."""
+        with self._lock:
+            for handle in self._files.values():
+                handle.close()
+            self._files = {}
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _column_shapes(self) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+        shapes = {
+            "vectors": (np.dtype(np.float16), (self.dim,)),
+            "ids": (np.dtype(np.uint8), (ID_BYTES,)),
+            "owners": (np.dtype(np.uint64), ())
+        }
+        if self.centroids is not None:
+            shapes["lists"] = (np.dtype(np.uint32), ())
+        return shapes
+
+    def _row_bytes(self, name: str) -> int:
+        dtype, shape = self._column_shapes()[name]
+        return dtype.itemsize * int(np.prod(shape))
+
+    def _write_meta(self) -> None:
+        meta = {"dim": self.dim, "ivf_lists": 0 if self.centroids is None else len(self.centroids)}
+        with open(self.path + ".json.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(self.path + ".json.tmp", self.path + ".json")
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the lock file shared by every process appending to the index."""
+        if not self.path:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _stored_rows(self) -> int:
+        """Rows every file holds completely; a row being appended by another process is not yet counted."""
+        return min(os.path.getsize(self.path + "." + name) // self._row_bytes(name) for name in self._column_shapes())
+
+    def _initialize(self, dim: int) -> None:
+        if self.path:
+            # Another process may have created the index meanwhile
+            self._load()
+            if self.dim is not None:
+                return
+            self.dim = dim
+            self._write_meta()
+            for name in self._column_shapes():
+                self._files[name] = open(self.path + "." + name, "ab")
+        else:
+            self.dim = dim
+            self._columns = {
+                name: np.zeros((0, *shape), dtype=dtype) for name, (dtype, shape) in self._column_shapes().items()
+            }
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock_file = open(self.path + ".lock", "a")
+        with self._exclusive():
+            self._load()
+        if self.dim is not None:
+            logger.info(f"Embedding index at {self.path}: {self.count} vectors of {self.dim} dimensions")
+
+    def _load(self) -> None:
+        """Read an existing index's layout and open its files; called holding the lock file."""
+        if not os.path.exists(self.path + ".json"):
+            return
+        with open(self.path + ".json") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        if meta.get("ivf_lists"):
+            self.centroids = np.load(self.path + ".centroids.npy")
+
+        # The rest of an interrupted append is dropped
+        names = [name for name in self._column_shapes() if name != "lists"]
+        self.count = min(os.path.getsize(self.path + "." + name) // self._row_bytes(name) for name in names)
+        for name in names:
+            with open(self.path + "." + name, "r+b") as f:
+                f.truncate(self.count * self._row_bytes(name))
+        for name in self._column_shapes():
+            self._files[name] = open(self.path + "." + name, "ab")
+
+        if self.centroids is not None:
+            listed = os.path.getsize(self.path + ".lists") // self._row_bytes("lists")
+            self._files["lists"].truncate(min(listed, self.count) * self._row_bytes("lists"))
+            if listed < self.count:
+                vectors = self._map("vectors", self.count)
+                self._files["lists"].write(_nearest_clusters(vectors[listed:], self.centroids).tobytes())
+                self._files["lists"].flush()
+
+    def _map(self, name: str, rows: int) -> np.ndarray:
+        dtype, shape = self._column_shapes()[name]
+        if not rows:
+            return np.zeros((0, *shape), dtype=dtype)
+        return np.memmap(self.path + "." + name, dtype=dtype, mode="r", shape=(rows, *shape))
+
+    def _view(self) -> Dict[str, np.ndarray]:
+        """Return every column cut to the current row count; called with the lock held."""
+        if self.path and self._mapped != self.count:
+            self._columns = {name: self._map(name, self.count) for name in self._column_shapes()}
+            self._mapped = self.count
+        return {name: column[:self.count] for name, column in self._columns.items()}
+
+    def _append(self, rows: Dict[str, np.ndarray]) -> None:
+        if not self.path:
+            for name, values in rows.items():
+                column = self._columns[name]
+                if self.count + len(values) > len(column):
+                    grown = np.zeros((max(1024, 2 * (self.count + len(values))), *column.shape[1:]), dtype=column.dtype)
+                    grown[:self.count] = column[:self.count]
+                    self._columns[name] = column = grown
+                column[self.count:self.count + len(values)] = values
+            return
+
+        try:
+            for name, values in rows.items():
+                self._files[name].write(values.tobytes())
+            for handle in self._files.values():
+                handle.flush()
+        except OSError:
+            # Keep the files aligned row for row
+            for name, handle in self._files.items():
+                try:
+                    handle.truncate(self.count * self._row_bytes(name))
+                except OSError:
+                    pass
+            raise
+
+    def _owner_rows(self, owners: np.ndarray, key: np.uint64) -> np.ndarray:
+        """Return the rows of one owner in row order; called with the lock held.
+
+        The grouping is a binary search away; rows appended since it was
+        made are scanned until they are OWNER_REGROUP_FRACTION of the grouped
+        ones, when the rows are grouped again.
+        """
+        appended = len(owners) - self._grouped
+        # Fewer rows than grouped: the index was rebuilt meanwhile
+        if appended < 0 or appended > OWNER_REGROUP_FRACTION * self._grouped:
+            order = np.argsort(owners, kind="stable")
+            keys = np.asarray(owners[order])
+            starts = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1])
+            self._owner_order = order
+            self._owner_keys = keys[starts]
+            self._owner_offsets = np.append(starts, len(keys))
+            self._grouped = len(owners)
+
+        position = int(np.searchsorted(self._owner_keys, key))
+        if position < len(self._owner_keys) and self._owner_keys[position] == key:
+            grouped = self._owner_order[self._owner_offsets[position]:self._owner_offsets[position + 1]]
+        else:
+            grouped = np.zeros(0, dtype=np.int64)
+        return np.concatenate([grouped, np.flatnonzero(owners[self._grouped:] == key) + self._grouped])
+
+    def _top_k(self, query: np.ndarray, vectors: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Score the rows in batches, keeping the ``k`` best; returns them best first."""
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, len(rows), self.batch_rows):
+            batch = rows[start:start + self.batch_rows]
+            scores = vectors[batch].astype(np.float32) @ query
+            best_rows = np.concatenate([best_rows, batch])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores, kind="stable")
+        return best_rows[order], best_scores[order]
+
+
+def backfill_vectors(batch_size: int) -> int:
+    """Compute and store the document vector of every analysis stored without one."""
+    from pymongo import UpdateOne
+
+    import nlp_service
+    from database import analyses_collection, job_descriptions_collection
+    from job_descriptions import decompress_description
+
+    nlp_service.nlp = nlp_service._load_spacy()
+    updates = []
+    stored = 0
+    cursor = analyses_collection.find(
+        {"embedding": {"$exists": False}}, {"description_hash": 1, "job_description": 1}
+    ).batch_size(batch_size)
+    for document in cursor:
+        text = document.get("job_description")
+        if text is None:
+            description = job_descriptions_collection.find_one({"_id": document.get("description_hash")})
+            text = decompress_description(description) if description else None
+        if not text:
+            continue
+        # Long descriptions are represented by their condensed text, as in the analysis
+        if len(text) > nlp_service.ANALYSIS_CHUNK_CHARS:
+            text = nlp_service.condense_text(text)
+        vector = nlp_service.AnalysisContext(text).document_vector
+        if vector is not None:
+            updates.append(UpdateOne({"_id": document["_id"]}, {"$set": {"embedding": vector}}))
+        if len(updates) >= batch_size:
+            stored += analyses_collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        stored += analyses_collection.bulk_write(updates, ordered=False).modified_count
+    return stored
+
+
+def rebuild(path: str, batch_size: int) -> int:
+    """Write a new index from the vectors stored with the analyses and swap it in; returns its size."""
+    from database import analyses_collection
+
+    staging = path + ".rebuild"
+    remove_index_files(staging)
+    index = EmbeddingIndex(staging)
+    ids, usernames, vectors = [], [], []
+    cursor = analyses_collection.find(
+        {"embedding": {"$exists": True}}, {"username": 1, "embedding": 1}
+    ).sort("_id", 1).batch_size(batch_size)
+    for document in cursor:
+        ids.append(str(document["_id"]))
+        usernames.append(document["username"])
+        vectors.append(np.frombuffer(document["embedding"], dtype=np.float16))
+        if len(ids) >= batch_size:
+            index.add_many(ids, usernames, np.stack(vectors))
+            ids, usernames, vectors = [], [], []
+    if ids:
+        index.add_many(ids, usernames, np.stack(vectors))
+    index.close()
+
+    # The clustering no longer matches the rows; train it again if it is wanted
+    remove_index_files(path)
+    for suffix in FILE_SUFFIXES:
+        if os.path.exists(staging + suffix):
+            os.replace(staging + suffix, path + suffix)
+    return index.count
+
+
+def run(args: argparse.Namespace) -> None:
+    """Run one maintenance command on the index."""
+    if args.command == "rebuild":
+        if args.backfill:
+            logger.info(f"Stored {backfill_vectors(args.batch_size)} missing document vectors")
+        logger.info(f"Rebuilt the embedding index with {rebuild(args.path, args.batch_size)} vectors")
+    elif args.command == "train-ivf":
+        index = EmbeddingIndex(args.path)
+        index.train_ivf(args.lists, args.sample, args.iterations, args.seed)
+        index.close()
+        logger.info(f"Trained {args.lists} clusters over {index.count} vectors")
+    else:
+        index = EmbeddingIndex(args.path)
+        print(json.dumps(index.stats(), indent=2))
+        index.close()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Maintain the embedding index of the similar analyses search.")
+    parser.add_argument("command", choices=["rebuild", "train-ivf", "stats"])
+    parser.add_argument("--path", default=EMBEDDING_INDEX_PATH, help="Index path prefix")
+    parser.add_argument("--backfill", action="store_true", help="rebuild: first compute vectors missing from analyses")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Analyses read or updated per batch")
+    parser.add_argument("--lists", type=int, default=1024, help="train-ivf: number of clusters")
+    parser.add_argument("--sample", type=int, default=100000, help="train-ivf: vectors the clusters are fit on")
+    parser.add_argument("--iterations", type=int, default=10, help="train-ivf: k-means iterations")
+    parser.add_argument("--seed", type=int, default=0, help="train-ivf: random seed")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
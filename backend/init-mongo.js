@@ -47,20 +47,33 @@ db.createCollection('analyses', {
   validator: {
     $jsonSchema: {
       bsonType: "object",
-      required: ["username", "job_description", "analysis", "created_at"],
+      required: ["username", "analysis", "created_at"],
       properties: {
         username: {
           bsonType: "string",
           description: "Username must be a string and is required"
         },
+        description_hash: {
+          bsonType: "string",
+          description: "SHA-256 of the job description, the _id of its body in job_descriptions"
+        },
         job_description: {
           bsonType: "string",
-          description: "Job description text must be a string and is required"
+          description: "Embedded job description text of analyses stored before the description store"
         },
         analysis: {
           bsonType: "object",
           description: "Analysis results must be an object and is required"
         },
+        pending_counts: {
+          bsonType: "array",
+          items: { enum: ["user_stats", "hour", "day"] },
+          description: "Counters the analysis has not been counted in yet, cleared once their writes succeed"
+        },
+        embedding: {
+          bsonType: "binData",
+          description: "Normalized float16 document vector of the similar analyses search"
+        },
         created_at: {
           bsonType: "date",
           description: "Creation timestamp must be a date and is required"
@@ -70,12 +83,46 @@ db.createCollection('analyses', {
   }
 });
 
+// Job description bodies, stored once per distinct text and zlib-compressed;
+// the _id is the SHA-256 of the text, referenced by analyses.description_hash
+db.createCollection('job_descriptions', {
+  validator: {
+    $jsonSchema: {
+      bsonType: "object",
+      required: ["_id", "encoding", "body"],
+      properties: {
+        _id: { bsonType: "string" },
+        encoding: { enum: ["zlib"] },
+        body: { bsonType: "binData" }
+      }
+    }
+  }
+});
+
 // Create indexes for better performance
 db.users.createIndex({ "username": 1 }, { unique: true });
 db.users.createIndex({ "email": 1 }, { unique: true });
-db.analyses.createIndex({ "username": 1 });
 db.analyses.createIndex({ "created_at": -1 });
 
+// Keyset pagination of a user's analyses; each index matches one sort order of GET /analyses
+// and also serves per-user lookups through its username prefix
+db.analyses.createIndex({ "username": 1, "created_at": -1, "_id": -1 });
+db.analyses.createIndex({ "username": 1, "analysis.role_type": 1, "created_at": -1, "_id": -1 });
+db.analyses.createIndex({ "username": 1, "analysis.experience_level": 1, "created_at": -1, "_id": -1 });
+
+// Analyses a failed counter write left uncounted, found at startup
+db.analyses.createIndex({ "pending_counts": 1 }, { sparse: true });
+
+// Persistent tier of the analysis result cache; entries expire on their own
+db.analysis_cache.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 0 });
+
+// Asynchronous analysis jobs; finished jobs expire after their result TTL
+db.analysis_jobs.createIndex({ "status": 1, "created_at": 1 });
+db.analysis_jobs.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 0 });
+
+// Hourly trend buckets expire after the retention; daily buckets are kept
+db.trend_rollups.createIndex({ "expires_at": 1 }, { expireAfterSeconds: 0 });
+
 // Create default admin user
 // Note: In production, change these credentials or remove this section
 db.users.insertOne({
@@ -89,6 +136,6 @@ db.users.insertOne({
 
 print("MongoDB initialization completed successfully");
 print("Database: job_analyzer");
-print("Collections: users, analyses");
+print("Collections: users, analyses, analysis_cache, analysis_jobs, user_stats, job_descriptions, trend_rollups");
 print("Default admin user: admin / admin123");
 print("Remember to change default credentials in production"); 
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Content-addressed, compressed storage of job description bodies.
+
+Analyses reference their description by ``description_hash``; each distinct
+body is stored once in the ``job_descriptions`` collection, zlib-compressed,
+and only decompressed for the analysis detail view. Analyses stored before
+this embed the body as ``job_description``; convert them in batches with:
+
+    python job_descriptions.py --migrate --batch-size 500
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+from bson import Binary
+from pymongo import UpdateOne
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_COMPRESSION_LEVEL = int(os.getenv("DESCRIPTION_COMPRESSION_LEVEL", "6"))
+DESCRIPTION_ENCODING = "zlib"
+
+# Validator of the analyses collection once bodies live in job_descriptions
+ANALYSES_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["username", "analysis", "created_at"],
+        "properties": {
+            "username": {"bsonType": "string"},
+            "description_hash": {"bsonType": "string"},
+            "job_description": {"bsonType": "string"},
+            "analysis": {"bsonType": "object"},
+            "created_at": {"bsonType": "date"}
+        }
+    }
+}
+
+
+def description_hash(text: str) -> str:
+    """Return the content address of a description body."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_description(text: str, level: int = DESCRIPTION_COMPRESSION_LEVEL) -> bytes:
+    """Compress a description body for storage."""
+    return zlib.compress(text.encode("utf-8"), level)
+
+
+def decompress_description(document: Dict[str, Any]) -> str:
+    """Return the body of a stored description document."""
+    if document.get("encoding", DESCRIPTION_ENCODING) != DESCRIPTION_ENCODING:
+        raise ValueError(f"Unsupported description encoding: {document.get('encoding')}")
+    return zlib.decompress(document["body"]).decode("utf-8")
+
+
+def description_document(text: str) -> Dict[str, Any]:
+    """Build the stored document for a description body."""
+    body = compress_description(text)
+    return {
+        "_id": description_hash(text),
+        "encoding": DESCRIPTION_ENCODING,
+        "body": Binary(body),
+        "chars": len(text),
+        "compressed_bytes": len(body),
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+def description_upserts(texts: Iterable[str]) -> List[UpdateOne]:
+    """Return bulk operations that store each distinct body once; existing bodies are left untouched."""
+    documents = {}
+    for text in texts:
+        document = description_document(text)
+        documents.setdefault(document["_id"], document)
+    return [
+        UpdateOne({"_id": key}, {"$setOnInsert": document}, upsert=True)
+        for key, document in documents.items()
+    ]
+
+
+def migrate(analyses_collection, descriptions_collection, batch_size: int = 500) -> Dict[str, int]:
+    """Move embedded bodies of stored analyses into the description store, batch by batch.
+
+    Progress follows ``_id`` order, so an interrupted run can simply be
+    started again.
+    """
+    db = analyses_collection.database
+    db.command("collMod", analyses_collection.name, validator=ANALYSES_VALIDATOR)
+
+    totals = {"analyses": 0, "chars": 0, "descriptions_added": 0}
+    last_id = None
+    while True:
+        query: Dict[str, Any] = {"job_description": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(analyses_collection.find(query, {"job_description": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        result = descriptions_collection.bulk_write(
+            description_upserts(document["job_description"] for document in batch), ordered=False
+        )
+        # The body is only removed from documents that still hold the text the hash was taken from
+        analyses_collection.bulk_write([
+            UpdateOne(
+                {"_id": document["_id"], "job_description": document["job_description"]},
+                {
+                    "$set": {"description_hash": description_hash(document["job_description"])},
+                    "$unset": {"job_description": ""}
+                }
+            )
+            for document in batch
+        ], ordered=False)
+
+        totals["analyses"] += len(batch)
+        totals["chars"] += sum(len(document["job_description"]) for document in batch)
+        totals["descriptions_added"] += result.upserted_count
+        last_id = batch[-1]["_id"]
+        logger.info(f"Migrated {totals['analyses']} analyses, {totals['descriptions_added']} new descriptions")
+    return totals
+
+
+def run(args: argparse.Namespace) -> None:
+    """Migrate embedded job descriptions into the description store."""
+    from database import analyses_collection, job_descriptions_collection
+
+    if not args.migrate:
+        raise SystemExit("Nothing to do; pass --migrate")
+    totals = migrate(analyses_collection, job_descriptions_collection, args.batch_size)
+    logger.info(
+        f"Done: {totals['analyses']} analyses ({totals['chars']} characters) now reference "
+        f"{totals['descriptions_added']} newly stored descriptions"
+    )
+
+
+def parse_args(argv: Iterable[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Manage stored job description bodies.")
+    parser.add_argument("--migrate", action="store_true", help="Move embedded descriptions into the description store")
+    parser.add_argument("--batch-size", type=int, default=500, help="Analyses converted per batch")
+    return parser.parse_args(list(argv))
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TAXONOMY_PATH = os.getenv("TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomy.json"))
+TAXONOMY_RELOAD_SECONDS = float(os.getenv("TAXONOMY_RELOAD_SECONDS", "5"))
+
+_WORD_CHAR = re.compile(r'\w')
+
+
+class KeywordHit(NamedTuple):
+    start: int
+    end: int
+    keyword: str
+
+
+class KeywordScan:
+    """Every taxonomy keyword found in one text, with positions, grouped by category."""
+
+    def __init__(self, index: "KeywordIndex", hits: List[KeywordHit]):
+        self.index = index
+        self.hits = hits
+
+    def in_category(self, category: str) -> List[KeywordHit]:
+        """Return the hits whose keyword belongs to a category, in text order."""
+        members = self.index.category_members(category)
+        return [hit for hit in self.hits if hit.keyword in members]
+
+    def keywords(self, category: str) -> Set[str]:
+        """Return the distinct keywords of a category found in the text."""
+        return {hit.keyword for hit in self.in_category(category)}
+
+    def counts(self, category: str) -> Counter:
+        """Return how often each keyword of a category occurs."""
+        return Counter(hit.keyword for hit in self.in_category(category))
+
+    def spans_with(self, category: str, spans: List[Tuple[int, int]]) -> Set[int]:
+        """Return the indexes of the (start, end) spans that contain a hit of the category.
+
+        ``spans`` must be sorted and non-overlapping, e.g. the lines or
+        sentences of the scanned text.
+        """
+        starts = [start for start, _ in spans]
+        found = set()
+        for hit in self.in_category(category):
+            position = bisect_right(starts, hit.start) - 1
+            if position >= 0 and hit.end <= spans[position][1]:
+                found.add(position)
+        return found
+
+
+def _is_word_char(char: str) -> bool:
+    return bool(_WORD_CHAR.match(char))
+
+
+def _build_trie(keywords: Iterable[str]) -> Dict:
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = keyword
+    return trie
+
+
+def _trie_pattern(node: Dict, whole_words: bool) -> str:
+    """Turn a trie node into a regex that prefers the longest keyword below it."""
+    branches = [
+        re.escape(char) + _trie_pattern(child, whole_words)
+        for char, child in sorted(node.items()) if char
+    ]
+    if "" in node:
+        keyword = node[""]
+        # A keyword ending in a word character must not run into the next word
+        branches.append(r'(?!\w)' if whole_words and _is_word_char(keyword[-1]) else '')
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+def keyword_pattern(keywords: Iterable[str], whole_words: bool = True) -> str:
+    """Return a trie-shaped regex source matching the longest keyword at a position.
+
+    With ``whole_words`` keywords only match on word boundaries; otherwise
+    they match anywhere, like a substring test.
+    """
+    keywords = set(keywords)
+    if not whole_words:
+        return _trie_pattern(_build_trie(keywords), whole_words) if keywords else r'(?!)'
+
+    word_start = _build_trie(k for k in keywords if _is_word_char(k[0]))
+    other_start = _build_trie(k for k in keywords if not _is_word_char(k[0]))
+
+    alternatives = []
+    if word_start:
+        alternatives.append(r'(?<!\w)' + _trie_pattern(word_start, whole_words))
+    if other_start:
+        alternatives.append(_trie_pattern(other_start, whole_words))
+    if not alternatives:
+        return r'(?!)'
+    return '|'.join(alternatives)
+
+
+def compile_keywords(keywords: Iterable[str], whole_words: bool = True) -> "re.Pattern":
+    """Compile keywords into one trie-shaped, case-insensitive regex.
+
+    The regex is a lookahead, so ``finditer`` reports the longest keyword
+    starting at every position in a single left-to-right scan, including
+    overlapping ones.
+    """
+    return re.compile('(?=(' + keyword_pattern(keywords, whole_words) + '))', re.IGNORECASE)
+
+
+def implied_prefixes(keywords: Iterable[str], whole_words: bool = True) -> Dict[str, List[str]]:
+    """Map each keyword to the shorter keywords that also match where it starts.
+
+    'react native' also contains a valid 'react', but the regex only reports
+    the longer one.
+    """
+    keywords = set(keywords)
+    implied = {}
+    for keyword in keywords:
+        prefixes = [
+            other for other in keywords
+            if other != keyword and keyword.startswith(other)
+            and (not whole_words or not _is_word_char(other[-1]) or not _is_word_char(keyword[len(other)]))
+        ]
+        if prefixes:
+            implied[keyword] = prefixes
+    return implied
+
+
+def _flatten(entries) -> List[str]:
+    if isinstance(entries, dict):
+        return [keyword for group in entries.values() for keyword in _flatten(group)]
+    return [entry.strip().lower() for entry in entries if entry.strip()]
+
+
+class KeywordIndex:
+    """Compiled keyword taxonomy that finds every category's keywords in one scan."""
+
+    def __init__(self, taxonomy: Dict):
+        self.categories: Dict[str, List[str]] = {
+            category: list(dict.fromkeys(_flatten(entries)))
+            for category, entries in taxonomy.items()
+        }
+        self._members = {category: set(keywords) for category, keywords in self.categories.items()}
+        all_keywords = {keyword for keywords in self.categories.values() for keyword in keywords}
+        self._pattern = compile_keywords(all_keywords)
+        self._implied = implied_prefixes(all_keywords)
+        payload = json.dumps(self.categories, sort_keys=True).encode('utf-8')
+        self.fingerprint = hashlib.sha256(payload).hexdigest()[:12]
+
+    def category_members(self, category: str) -> Set[str]:
+        """Return the keyword set of a category."""
+        return self._members.get(category, set())
+
+    def scan(self, text: str) -> KeywordScan:
+        """Find every keyword occurrence in the text with a single regex pass."""
+        hits = []
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1).lower()
+            start = match.start()
+            hits.append(KeywordHit(start, start + len(keyword), keyword))
+            for prefix in self._implied.get(keyword, ()):
+                hits.append(KeywordHit(start, start + len(prefix), prefix))
+        return KeywordScan(self, hits)
+
+
+def load_taxonomy(path: str = TAXONOMY_PATH) -> KeywordIndex:
+    """Build a keyword index from a taxonomy JSON file."""
+    with open(path, encoding="utf-8") as f:
+        return KeywordIndex(json.load(f))
+
+
+_index: Optional[KeywordIndex] = None
+_index_mtime: Optional[float] = None
+_last_check = 0.0
+_index_lock = threading.Lock()
+
+
+def get_keyword_index() -> KeywordIndex:
+    """Return the current keyword index, reloading it when the taxonomy file changes."""
+    global _index, _index_mtime, _last_check
+
+    now = time.monotonic()
+    if _index is not None and now - _last_check < TAXONOMY_RELOAD_SECONDS:
+        return _index
+
+    with _index_lock:
+        if _index is not None and now - _last_check < TAXONOMY_RELOAD_SECONDS:
+            return _index
+        _last_check = now
+
+        try:
+            mtime = os.path.getmtime(TAXONOMY_PATH)
+            if _index is None or mtime != _index_mtime:
+                index = load_taxonomy(TAXONOMY_PATH)
+                if _index is not None:
+                    logger.info(f"Reloaded keyword taxonomy from {TAXONOMY_PATH} ({index.fingerprint})")
+                _index, _index_mtime = index, mtime
+        except Exception as e:
+            if _index is None:
+                raise
+            logger.error(f"Keeping previous keyword taxonomy, reload failed: {e}")
+
+        return _index
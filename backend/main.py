@@ -1,17 +1,116 @@
-from fastapi import FastAPI, HTTPException, Depends
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from database import analysis_cache_collection, analysis_jobs_collection
+from auth import (
+    hash_password, check_password, create_access_token, verify_token, shutdown_hash_executor,
+    token_cache, user_cache
+)
+import nlp_service
+from nlp_service import analysis_version, resolve_profile, validate_job_description
+from analysis_cache import AnalysisCache, CACHE_PERSISTENT
+from analysis_queries import (
+    ANALYSES_PAGE_SIZE, ANALYSES_MAX_PAGE_SIZE, SORT_OPTIONS, InvalidCursor, serialize_history, serialize_summary
+)
+from analysis_executor import (
+    ExecutorSaturated, AnalysisTimeout, ANALYSIS_RETRY_AFTER_SECONDS, create_analysis_executor
+)
+from analysis_jobs import AnalysisJobManager, JobQueueFull, serialize_job
+from embedding_index import EMBEDDING_INDEX_PATH, SIMILAR_ANALYSES_LIMIT, SIMILAR_ANALYSES_MAX_LIMIT, EmbeddingIndex
+from repositories import create_repositories
+from responses import entity_tag, json_response, not_modified
+from startup_report import StartupReport
+from trend_rollups import (
+    DEFAULT_PERIODS, DIMENSIONS, GRANULARITIES, TREND_MAX_TOP_VALUES, TREND_TOP_VALUES, max_periods, window
+)
+from telemetry import REGISTRY
+
+startup_report = StartupReport()
+startup_report.imports_finished(_IMPORT_STARTED)
+
+repositories = create_repositories()
+analysis_executor = create_analysis_executor()
+# Without MongoDB (the in-memory data backend) the cache keeps only its in-process tier
+analysis_cache = AnalysisCache(
+    version=analysis_version,
+    collection=analysis_cache_collection if CACHE_PERSISTENT and repositories.persistent else None
+)
+# The index must not outlive the analyses it points to, so the in-memory data backend keeps it in memory too
+similarity_index = EmbeddingIndex(EMBEDDING_INDEX_PATH if repositories.persistent else None)
+
+
+async def perform_analysis(job_description: str, username: str, profile: str) -> Dict[str, Any]:
+    """Analyze a job description through the cache and worker pool and record it for the user."""
+    analysis = await run_in_threadpool(analysis_cache.get, job_description, profile)
+    if analysis is None:
+        analysis = await analysis_executor.analyze(job_description, profile)
+        await run_in_threadpool(analysis_cache.put, job_description, profile, analysis)
+    
+    # The document vector is stored with the analysis and indexed, not returned
+    embedding = analysis.pop("embedding", None)
+    analysis_id = await repositories.analyses.add(username, job_description, analysis, embedding)
+    if embedding is not None:
+        await run_in_threadpool(similarity_index.add, analysis_id, username, embedding)
+    
+    return analysis
+
+
+analysis_jobs = AnalysisJobManager(analysis_jobs_collection, perform_analysis)
+
+
+async def warm_up_models() -> None:
+    """Load the models in every analysis worker in the background and record readiness."""
+    warm_up = asyncio.ensure_future(analysis_executor.warm_up())
+    try:
+        try:
+            await asyncio.wait_for(asyncio.shield(warm_up), timeout=startup_report.budget_seconds)
+        except asyncio.TimeoutError:
+            startup_report.budget_exceeded()
+            await warm_up
+    except Exception:
+        # Already logged by the executor; /ready reports the failure
+        return
+    startup_report.mark_ready()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the analysis worker pool and job workers with the app and stop them on shutdown."""
+    startup_report.app_started()
+    analysis_executor.start()
+    warm_up_task = asyncio.create_task(warm_up_models())
+    await repositories.warm_up()
+    await repositories.start()
+    # Jobs are persisted in MongoDB, so the in-memory data backend runs without them
+    if repositories.persistent:
+        await analysis_jobs.start()
+    yield
+    warm_up_task.cancel()
+    if repositories.persistent:
+        await analysis_jobs.stop()
+    analysis_executor.shutdown()
+    await repositories.close()
+    similarity_index.close()
+    shutdown_hash_executor()
 
-from database import users_collection, analyses_collection
-from auth import get_password_hash, verify_password, create_access_token, verify_token
-from nlp_service import analyze_job_description
 
 app = FastAPI(
     title="Job Analyzer API",
     description="API for analyzing job descriptions using NLP",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -38,15 +137,16 @@ class UserLogin(BaseModel):
 
 class JobAnalysis(BaseModel):
     job_description: str
+    profile: Optional[str] = None
 
 
 @app.post("/register")
 async def register(user: UserRegister):
     """Register a new user account."""
-    if users_collection.find_one({"username": user.username}):
+    if await repositories.users.get(user.username):
         raise HTTPException(status_code=400, detail="Username already exists")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = {
         "username": user.username,
         "password": hashed_password,
@@ -55,7 +155,8 @@ async def register(user: UserRegister):
         "role": user.role,
         "created_at": datetime.now(timezone.utc)
     }
-    users_collection.insert_one(user_data)
+    if not await repositories.users.create(user_data):
+        raise HTTPException(status_code=400, detail="Username already exists")
     
     return {"message": "User created successfully"}
 
@@ -63,8 +164,8 @@ async def register(user: UserRegister):
 @app.post("/login")
 async def login(user: UserLogin):
     """Authenticate user and return access token."""
-    db_user = users_collection.find_one({"username": user.username})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+    db_user = await repositories.users.get(user.username)
+    if not db_user or not await check_password(user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": user.username})
@@ -72,93 +173,252 @@ async def login(user: UserLogin):
 
 
 @app.get("/user")
-def get_current_user(current_user: str = Depends(verify_token)):
+async def get_current_user(request: Request, current_user: str = Depends(verify_token)):
     """Get current authenticated user details."""
-    user_data = users_collection.find_one(
-        {"username": current_user},
-        {"_id": 0, "password": 0}
-    )
+    profile = user_cache.get(current_user)
+    if profile is None:
+        user_data = await repositories.users.get(current_user)
+        if not user_data:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        profile = {
+            "username": user_data.get("username"),
+            "name": user_data.get("name"),
+            "email": user_data.get("email"),
+            "role": user_data.get("role")
+        }
+        user_cache.put(current_user, profile)
     
-    if not user_data:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    return {
-        "username": user_data.get("username"),
-        "name": user_data.get("name"),
-        "email": user_data.get("email"),
-        "role": user_data.get("role")
-    }
+    etag = entity_tag("user", *profile.values())
+    return not_modified(request, etag) or json_response(request, profile, etag)
 
 
 @app.post("/analyze")
-async def analyze_job(job_data: JobAnalysis, current_user: str = Depends(verify_token)):
-    """Analyze job description and return insights."""
-    analysis = analyze_job_description(job_data.job_description)
-    
-    analysis_data = {
-        "username": current_user,
-        "job_description": job_data.job_description,
-        "analysis": analysis,
-        "created_at": datetime.now(timezone.utc)
-    }
-    analyses_collection.insert_one(analysis_data)
+async def analyze_job(
+    job_data: JobAnalysis,
+    run_async: bool = Query(False, alias="async"),
+    current_user: str = Depends(verify_token)
+):
+    """Analyze job description and return insights, or queue it as a job with ?async=true."""
+    try:
+        profile = resolve_profile(job_data.profile)
+        validate_job_description(job_data.job_description)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    if run_async:
+        if not repositories.persistent:
+            raise HTTPException(status_code=503, detail="Analysis jobs are not available with the in-memory data backend")
+        try:
+            job = await analysis_jobs.submit(current_user, job_data.job_description, profile)
+        except JobQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis job queue is full, please retry shortly",
+                headers={"Retry-After": str(ANALYSIS_RETRY_AFTER_SECONDS)}
+            )
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job["_id"],
+                "status": job["status"],
+                "status_url": f"/jobs/{job['_id']}",
+                "events_url": f"/jobs/{job['_id']}/events"
+            }
+        )
+
+    started = time.perf_counter()
+    try:
+        analysis = await perform_analysis(job_data.job_description, current_user, profile)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis service is busy, please retry shortly",
+            headers={"Retry-After": str(ANALYSIS_RETRY_AFTER_SECONDS)}
+        )
+    except AnalysisTimeout:
+        raise HTTPException(status_code=504, detail="Analysis timed out")
+    
+    startup_report.record_request(time.perf_counter() - started)
     return analysis
 
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: str = Depends(verify_token)):
+    """Get the status of an analysis job, including its result once completed."""
+    job = await analysis_jobs.get(job_id, current_user) if repositories.persistent else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return serialize_job(job)
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: str = Depends(verify_token)):
+    """Stream analysis job status changes as server-sent events."""
+    if not repositories.persistent or not await analysis_jobs.get(job_id, current_user):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return StreamingResponse(
+        analysis_jobs.events(job_id, current_user),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/history")
-async def get_history(current_user: str = Depends(verify_token)):
+async def get_history(request: Request, current_user: str = Depends(verify_token)):
     """Get user's recent analysis history (last 10)."""
-    history = list(analyses_collection.find(
-        {"username": current_user},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(10))
+    change = await repositories.analyses.latest_change(current_user)
+    etag = entity_tag("history", current_user, *change)
+    cached = not_modified(request, etag, change.updated_at)
+    if cached:
+        return cached
     
-    return history
+    history = await repositories.analyses.recent(current_user, 10)
+    return json_response(request, [serialize_history(document) for document in history], etag, change.updated_at)
 
 
 @app.get("/analyses")
-async def get_all_analyses(current_user: str = Depends(verify_token)):
-    """Get all analyses for the authenticated user."""
-    all_analyses = list(analyses_collection.find(
-        {"username": current_user},
-        {"_id": 0}
-    ).sort("created_at", -1))
-    
-    return {
-        "analyses": all_analyses, 
-        "total_count": len(all_analyses),
-        "username": current_user
-    }
+async def get_all_analyses(
+    request: Request,
+    limit: int = Query(ANALYSES_PAGE_SIZE, ge=1, le=ANALYSES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = Query("newest", pattern="^(" + "|".join(SORT_OPTIONS) + ")$"),
+    role_type: Optional[str] = None,
+    experience_level: Optional[str] = None,
+    current_user: str = Depends(verify_token)
+):
+    """Get a page of the user's analyses; pass next_cursor back as ?cursor= for the next page."""
+    change = await repositories.analyses.latest_change(current_user)
+    etag = entity_tag("analyses", current_user, request.url.query, *change)
+    cached = not_modified(request, etag, change.updated_at)
+    if cached:
+        return cached
+    
+    try:
+        page = await repositories.analyses.page(current_user, limit, cursor, sort, role_type, experience_level)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page["username"] = current_user
+    return json_response(request, page, etag, change.updated_at)
 
 
-@app.get("/stats")
-async def get_user_stats(current_user: str = Depends(verify_token)):
-    """Get user analysis statistics and distributions."""
-    total_analyses = analyses_collection.count_documents({"username": current_user})
+@app.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str, current_user: str = Depends(verify_token)):
+    """Get one analysis including its job description."""
+    analysis = await repositories.analyses.get(current_user, analysis_id)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
     
-    role_pipeline = [
-        {"$match": {"username": current_user}},
-        {"$group": {"_id": "$analysis.role_type", "count": {"$sum": 1}}}
-    ]
-    role_stats = list(analyses_collection.aggregate(role_pipeline))
+    return analysis
+
+
+@app.get("/analyses/{analysis_id}/similar")
+async def get_similar_analyses(
+    request: Request,
+    analysis_id: str,
+    limit: int = Query(SIMILAR_ANALYSES_LIMIT, ge=1, le=SIMILAR_ANALYSES_MAX_LIMIT),
+    current_user: str = Depends(verify_token)
+):
+    """Get the user's analyses whose job descriptions are most similar to this one."""
+    embedding = await repositories.analyses.embedding(current_user, analysis_id)
+    if embedding is None:
+        raise HTTPException(status_code=404, detail="Analysis not found or stored without a document vector")
+    
+    change = await repositories.analyses.latest_change(current_user)
+    etag = entity_tag("similar", current_user, analysis_id, limit, similarity_index.count, *change)
+    cached = not_modified(request, etag, change.updated_at)
+    if cached:
+        return cached
     
-    experience_pipeline = [
-        {"$match": {"username": current_user}},
-        {"$group": {"_id": "$analysis.experience_level", "count": {"$sum": 1}}}
+    matches = await run_in_threadpool(similarity_index.search, embedding, current_user, limit, analysis_id)
+    documents = await repositories.analyses.summaries(current_user, [match.analysis_id for match in matches])
+    by_id = {str(document["_id"]): document for document in documents}
+    similar = [
+        {**serialize_summary(by_id[match.analysis_id]), "similarity": round(match.similarity, 4)}
+        for match in matches if match.analysis_id in by_id
     ]
-    experience_stats = list(analyses_collection.aggregate(experience_pipeline))
+    return json_response(request, {"analysis_id": analysis_id, "similar": similar}, etag, change.updated_at)
+
+
+@app.get("/stats")
+async def get_user_stats(request: Request, current_user: str = Depends(verify_token)):
+    """Get user analysis statistics and distributions."""
+    change = await repositories.analyses.latest_change(current_user)
+    etag = entity_tag("stats", current_user, *change)
+    cached = not_modified(request, etag, change.updated_at)
+    if cached:
+        return cached
     
-    return {
-        "total_analyses": total_analyses,
-        "role_distribution": {item["_id"]: item["count"] for item in role_stats},
-        "experience_distribution": {item["_id"]: item["count"] for item in experience_stats}
+    return json_response(request, await repositories.analyses.stats(current_user), etag, change.updated_at)
+
+
+@app.get("/trends/{dimension}")
+async def get_trend(
+    request: Request,
+    dimension: str,
+    granularity: str = Query("day", pattern="^(" + "|".join(GRANULARITIES) + ")$"),
+    periods: Optional[int] = Query(None, ge=1),
+    limit: int = Query(TREND_TOP_VALUES, ge=1, le=TREND_MAX_TOP_VALUES),
+    current_user: str = Depends(verify_token)
+):
+    """Get the most frequent skills, role types or experience levels across all users over the last periods."""
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown trend; choose one of {', '.join(DIMENSIONS)}")
+    periods = periods or DEFAULT_PERIODS[granularity]
+    if periods > max_periods(granularity):
+        raise HTTPException(status_code=400, detail=f"At most {max_periods(granularity)} {granularity} periods")
+    
+    trend = await repositories.analyses.trend(dimension, granularity, window(granularity, periods), limit)
+    return json_response(request, trend)
+
+
+@app.get("/system/stats")
+async def get_system_stats():
+    """Get runtime counters for the analysis pipeline."""
+    stats = {
+        "analysis_cache": analysis_cache.stats(),
+        "analysis_executor": analysis_executor.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "startup": startup_report.as_dict(),
+        "similarity_index": similarity_index.stats(),
+        "auth": {"token_cache": token_cache.stats(), "user_cache": user_cache.stats()}
     }
+    if repositories.writer is not None:
+        stats["analysis_writer"] = repositories.writer.buffer_stats()
+    # Worker processes keep their own batchers; only the in-process one is visible here
+    if nlp_service.summary_batcher is not None and analysis_executor.mode == "thread":
+        stats["summary_batcher"] = nlp_service.summary_batcher.stats()
+    return stats
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Stage, input size, summary fallback and MongoDB metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: succeeds once every analysis worker has loaded its models."""
+    status = "ready" if analysis_executor.ready else "loading"
+    body = {
+        "status": status,
+        "startup": startup_report.as_dict(),
+        "workers": analysis_executor.worker_reports
+    }
+    if analysis_executor.warm_up_error:
+        body["status"] = "failed"
+        body["error"] = analysis_executor.warm_up_error
+    
+    return JSONResponse(status_code=200 if analysis_executor.ready else 503, content=body)
 
 
 @app.get("/")
 async def root():
-    """Health check endpoint."""
+    """Liveness check endpoint."""
     return {"message": "Job Analyzer API is running"}
 
 
@@ -0,0 +1,364 @@
+"""Local model server: one process holds the NLP models for every API worker.
+
+The server runs an ``AnalysisExecutor`` (in ``MODEL_SERVER_EXECUTOR_MODE``,
+with ``ANALYSIS_WORKERS`` workers) and accepts analysis and health requests
+on the Unix socket ``MODEL_SERVER_SOCKET``. API processes started with
+``ANALYSIS_EXECUTOR_MODE=server`` load no models; their executor is a
+``ModelServerClient``, so HTTP workers and model memory scale independently:
+
+    cd backend
+    python model_server.py
+    ANALYSIS_EXECUTOR_MODE=server uvicorn main:app --workers 4
+
+Messages are pickled and length-prefixed. The socket is created readable
+and writable by its owner only, since both ends trust what they unpickle.
+Requests are pipelined: every request carries an id, the server handles
+them concurrently and answers each as soon as it is done, in any order.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import pickle
+import resource
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis_executor import (
+    ANALYSIS_TIMEOUT_SECONDS, AnalysisExecutor, AnalysisTimeout, ExecutorSaturated
+)
+from telemetry import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET", "/tmp/job-analyzer-model-server.sock")
+MODEL_SERVER_EXECUTOR_MODE = os.getenv("MODEL_SERVER_EXECUTOR_MODE", "thread").lower()
+MODEL_SERVER_CONNECTIONS = int(os.getenv("MODEL_SERVER_CONNECTIONS", "2"))
+MODEL_SERVER_HEALTH_SECONDS = float(os.getenv("MODEL_SERVER_HEALTH_SECONDS", "5"))
+
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+# Added to the analysis timeout before a client gives up on the server's answer
+RESPONSE_GRACE_SECONDS = 5.0
+
+
+class ModelServerUnavailable(ExecutorSaturated):
+    """Raised when the model server cannot be reached; answered with 503 like a full queue."""
+
+
+class ModelServerError(Exception):
+    """Raised when the model server reports that an analysis failed."""
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    """Read one length-prefixed message."""
+    (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    return pickle.loads(await reader.readexactly(length))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Any) -> None:
+    """Queue one length-prefixed message; frames are written whole, so concurrent senders do not interleave."""
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(FRAME_HEADER.pack(len(data)) + data)
+
+
+class ModelServer:
+    """Serves analyses from one executor to any number of API processes."""
+
+    def __init__(self, executor: AnalysisExecutor, path: str = MODEL_SERVER_SOCKET):
+        self.executor = executor
+        self.path = path
+        self._writers = set()
+        self._counters = {"requests": 0, "connections_accepted": 0}
+
+    async def serve(self) -> None:
+        """Load the models in the background and answer requests until cancelled."""
+        self.executor.start()
+        warm_up = asyncio.create_task(self.executor.warm_up())
+        if os.path.exists(self.path):
+            # Left behind by a server that did not shut down cleanly
+            os.remove(self.path)
+        previous_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle_connection, path=self.path)
+        finally:
+            os.umask(previous_umask)
+        logger.info(f"Model server listening on {self.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            warm_up.cancel()
+            # Open connections outlive the listening socket; closing them tells clients at once
+            for writer in list(self._writers):
+                writer.close()
+            self.executor.shutdown()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def health(self) -> Dict[str, Any]:
+        """Readiness, worker model load reports and load of the server."""
+        return {
+            "ready": self.executor.ready,
+            "warm_up_error": self.executor.warm_up_error,
+            "workers": self.executor.worker_reports,
+            "pid": os.getpid(),
+            # ru_maxrss is reported in kilobytes on Linux; worker processes are not included
+            "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+            "connections": len(self._writers),
+            **self._counters,
+            "executor": self.executor.stats()
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        self._counters["connections_accepted"] += 1
+        tasks = set()
+        try:
+            while True:
+                try:
+                    request_id, operation, args = await read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                self._counters["requests"] += 1
+                # Each request runs on its own, so answers go out in completion order
+                task = asyncio.create_task(self._answer(writer, request_id, operation, args))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ValueError, pickle.UnpicklingError) as e:
+            logger.warning(f"Closing a model server connection after a malformed request: {e}")
+        finally:
+            self._writers.discard(writer)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, writer: asyncio.StreamWriter, request_id: int, operation: str, args: Tuple) -> None:
+        if operation == "analyze":
+            try:
+                result = await self.executor.analyze(*args)
+                # Worker metrics travel to the API process, which serves /metrics
+                reply = ("ok", (result, REGISTRY.drain()))
+            except ExecutorSaturated as e:
+                reply = ("saturated", str(e))
+            except AnalysisTimeout as e:
+                reply = ("timeout", str(e))
+            except Exception as e:
+                reply = ("error", str(e) or e.__class__.__name__)
+        elif operation == "health":
+            reply = ("ok", self.health())
+        else:
+            reply = ("error", f"Unknown operation: {operation}")
+
+        try:
+            write_frame(writer, (request_id, *reply))
+            await writer.drain()
+        except ConnectionError:
+            # The client went away; it no longer waits for this answer
+            pass
+
+
+class _Connection:
+    """One client connection; requests are matched to answers by id."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.task = asyncio.create_task(self._read())
+
+    @property
+    def closed(self) -> bool:
+        return self.task.done()
+
+    async def request(self, request_id: int, operation: str, args: Tuple) -> Tuple[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            write_frame(self.writer, (request_id, operation, args))
+            await self.writer.drain()
+            return await future
+        except ConnectionError as e:
+            raise ModelServerUnavailable(f"Model server connection lost: {e}") from e
+        finally:
+            self.pending.pop(request_id, None)
+
+    def close(self) -> None:
+        self.task.cancel()
+        self.writer.close()
+
+    async def _read(self) -> None:
+        error = "closed by the model server"
+        try:
+            while True:
+                request_id, status, payload = await read_frame(self.reader)
+                future = self.pending.get(request_id)
+                # Answers to requests that timed out are dropped
+                if future is not None and not future.done():
+                    future.set_result((status, payload))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, pickle.UnpicklingError) as e:
+            error = str(e) or error
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ModelServerUnavailable(f"Model server connection lost: {error}"))
+            self.writer.close()
+
+
+class ModelServerClient:
+    """Analysis executor of an API process that forwards analyses to the model server.
+
+    Keeps ``connections`` connections open, spreads requests over them and
+    pipelines requests on each. Readiness follows the server's health, polled
+    every ``health_seconds``; an unreachable server makes the API not ready.
+    """
+
+    mode = "server"
+
+    def __init__(
+        self,
+        path: str = MODEL_SERVER_SOCKET,
+        connections: int = MODEL_SERVER_CONNECTIONS,
+        timeout_seconds: float = ANALYSIS_TIMEOUT_SECONDS,
+        health_seconds: float = MODEL_SERVER_HEALTH_SECONDS
+    ):
+        self.path = path
+        self.timeout_seconds = timeout_seconds
+        self.health_seconds = health_seconds
+        self.ready = False
+        self.warm_up_error: Optional[str] = None
+        self.worker_reports: List[Dict[str, Any]] = []
+        self.server_health: Dict[str, Any] = {}
+        self._connections: List[Optional[_Connection]] = [None] * max(1, connections)
+        self._connect_locks = [asyncio.Lock() for _ in self._connections]
+        self._request_ids = itertools.count()
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "unavailable": 0,
+            "connects": 0
+        }
+
+    def start(self) -> None:
+        """Start polling the server's health; must be called with the event loop running."""
+        if self._monitor_task is None:
+            self._monitor_task = asyncio.get_running_loop().create_task(self._monitor())
+
+    def shutdown(self) -> None:
+        """Stop polling and close the connections."""
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        for index, connection in enumerate(self._connections):
+            if connection is not None:
+                connection.close()
+                self._connections[index] = None
+
+    async def warm_up(self) -> None:
+        """Wait until the server has loaded its models."""
+        while not self.ready:
+            await self._check_health()
+            if self.warm_up_error:
+                logger.error(f"Model server failed to load models: {self.warm_up_error}")
+                raise RuntimeError(self.warm_up_error)
+            if not self.ready:
+                await asyncio.sleep(0.5)
+        logger.info(f"Model server ready: {self.worker_reports}")
+
+    async def analyze(self, text: str, profile: str) -> Dict[str, Any]:
+        """Analyze a job description on the model server."""
+        self._counters["submitted"] += 1
+        try:
+            status, payload = await asyncio.wait_for(
+                self._request("analyze", (text, profile)), timeout=self.timeout_seconds + RESPONSE_GRACE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            self._counters["timeouts"] += 1
+            raise AnalysisTimeout(f"No answer from the model server within {self.timeout_seconds}s")
+        except ModelServerUnavailable:
+            self._counters["unavailable"] += 1
+            raise
+
+        if status == "saturated":
+            self._counters["rejected"] += 1
+            raise ExecutorSaturated(payload)
+        if status == "timeout":
+            self._counters["timeouts"] += 1
+            raise AnalysisTimeout(payload)
+        if status != "ok":
+            self._counters["failed"] += 1
+            raise ModelServerError(payload)
+
+        result, metrics = payload
+        if metrics:
+            REGISTRY.merge(metrics)
+        self._counters["completed"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counters and the last health report of the server."""
+        return {
+            **self._counters,
+            "ready": self.ready,
+            "mode": self.mode,
+            "socket": self.path,
+            "connections": sum(1 for connection in self._connections if connection and not connection.closed),
+            "timeout_seconds": self.timeout_seconds,
+            "server": self.server_health
+        }
+
+    async def _request(self, operation: str, args: Tuple) -> Tuple[str, Any]:
+        request_id = next(self._request_ids)
+        connection = await self._connection(request_id % len(self._connections))
+        return await connection.request(request_id, operation, args)
+
+    async def _connection(self, index: int) -> _Connection:
+        async with self._connect_locks[index]:
+            connection = self._connections[index]
+            if connection is None or connection.closed:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                except OSError as e:
+                    raise ModelServerUnavailable(f"Model server at {self.path} unavailable: {e}") from e
+                connection = self._connections[index] = _Connection(reader, writer)
+                self._counters["connects"] += 1
+            return connection
+
+    async def _check_health(self) -> None:
+        try:
+            status, health = await asyncio.wait_for(self._request("health", ()), timeout=RESPONSE_GRACE_SECONDS)
+        except (ModelServerUnavailable, asyncio.TimeoutError) as e:
+            if self.ready:
+                logger.warning(f"Model server unreachable, reporting not ready: {e or 'no answer'}")
+            self.ready = False
+            self.server_health = {"reachable": False, "error": str(e) or "no answer"}
+            return
+        self.server_health = {"reachable": True, **health}
+        self.worker_reports = health["workers"]
+        self.warm_up_error = health["warm_up_error"]
+        self.ready = health["ready"]
+
+    async def _monitor(self) -> None:
+        while True:
+            await self._check_health()
+            await asyncio.sleep(self.health_seconds)
+
+
+def run() -> None:
+    """Run the model server until interrupted."""
+    server = ModelServer(AnalysisExecutor(mode=MODEL_SERVER_EXECUTOR_MODE))
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        logger.info("Model server stopped")
+
+
+if __name__ == "__main__":
+    run()
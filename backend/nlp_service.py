@@ -1,111 +1,283 @@
 import re
 from collections import Counter, defaultdict
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Iterable, Iterator, Set, Optional, Tuple
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 
-import spacy
-from spacy.matcher import PhraseMatcher
-from transformers import pipeline
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.text_rank import TextRankSummarizer
-import nltk
+from keyword_index import KeywordScan, get_keyword_index
+from rule_engine import KeywordRules, SentenceRules, YEARS_RULE, find_role_phrase, years_mentioned
+from summary_batcher import SummaryBatcher, SUMMARY_BATCHING
+from telemetry import (
+    ANALYSIS_CHUNKS, ANALYSIS_INPUT_CHARS, ANALYSIS_STAGE_SECONDS, SUMMARY_FALLBACKS, StageTimer, sampled_debug, span
+)
+
+# spaCy, transformers, sumy and NLTK are imported when models load, so importing
+# this module stays cheap for processes that never run an analysis themselves
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize NLTK resources
-for resource in ["punkt", "punkt_tab"]:
-    try:
-        nltk.data.find(f"tokenizers/{resource}")
-    except LookupError:
-        nltk.download(resource)
-
-# Load NLP models
-try:
-    nlp = spacy.load("en_core_web_md")
-    summarizer = pipeline("text2text-generation", model="google/flan-t5-base", device=-1)
-    logger.info("NLP models loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading NLP models: {e}")
-    raise
-
-# Technical skills database
-TECH_SKILLS = [
-    # Programming Languages
-    'python', 'java', 'javascript', 'typescript', 'c++', 'c#', 'php', 'ruby', 'go', 'rust',
-    'swift', 'kotlin', 'scala', 'r', 'matlab', 'perl', 'shell', 'bash', 'sql', 'html', 'css',
-
-    # Frontend Technologies
-    'react', 'angular', 'vue', 'sass', 'less', 'bootstrap', 'tailwind', 'jquery', 'webpack', 
-    'babel', 'npm', 'yarn', 'next.js', 'nuxt.js', 'gatsby',
-
-    # Backend Technologies
-    'node.js', 'express', 'django', 'flask', 'fastapi', 'spring', 'laravel', 'rails',
-    'asp.net', '.net', 'graphql', 'rest api', 'microservices', 'serverless',
-
-    # Databases
-    'mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch', 'oracle', 'sqlite', 
-    'cassandra', 'dynamodb', 'firebase', 'supabase',
-
-    # Cloud & DevOps
-    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'jenkins', 'git', 'github', 'gitlab',
-    'terraform', 'ansible', 'linux', 'unix', 'ci/cd', 'devops', 'helm',
-
-    # Data Science & ML
-    'machine learning', 'deep learning', 'ai', 'data science', 'pandas', 'numpy',
-    'tensorflow', 'pytorch', 'scikit-learn', 'jupyter', 'tableau', 'power bi', 'spark',
-    'hadoop', 'kafka', 'airflow',
-
-    # Mobile Development
-    'ios', 'android', 'react native', 'flutter', 'xamarin',
-
-    # Other Tools
-    'agile', 'scrum', 'jira', 'confluence', 'slack', 'figma', 'sketch', 'adobe xd'
-]
+NLTK_RESOURCES = ["punkt", "punkt_tab"]
 
-ROLE_TITLES = [
-    'frontend developer', 'backend developer', 'fullstack developer', 'data scientist',
-    'devops engineer', 'mobile developer', 'qa engineer', 'product manager',
-    'ui/ux designer', 'software engineer', 'java developer', 'python developer',
-    'web developer', 'cloud engineer', 'data engineer', 'machine learning engineer',
-    'site reliability engineer', 'security engineer', 'database administrator'
-]
+SPACY_MODEL = "en_core_web_md"
+SUMMARIZER_MODEL = "google/flan-t5-base"
 
-RESPONSIBILITY_HEADERS = [
-    "responsibilities", "responsibility", "key responsibilities", "duties",
-    "tasks", "accountabilities", "what you will do", "your impact", "role"
-]
+# CPU inference settings for the summarizer
+SUMMARIZER_QUANTIZE = os.getenv("SUMMARIZER_QUANTIZE", "false").lower() == "true"
+SUMMARIZER_DECODING = os.getenv("SUMMARIZER_DECODING", "beam").lower()
+SUMMARIZER_THREADS = os.getenv("SUMMARIZER_THREADS", "auto").lower()
+SUMMARY_INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "320"))
 
-REQUIREMENT_HEADERS = [
-    "requirements", "qualifications", "skills required", "must have",
-    "needed", "what we're looking for", "you bring", "preferred", "nice to have"
-]
+# Extractive summarizer: "vectors" ranks sentences by spaCy word vectors with NumPy,
+# "sumy" uses sumy's TextRank, which needs the NLTK tokenizer data
+EXTRACTIVE_SUMMARIZERS = ["vectors", "sumy"]
+EXTRACTIVE_SUMMARIZER = os.getenv("EXTRACTIVE_SUMMARIZER", "vectors").lower()
+if EXTRACTIVE_SUMMARIZER not in EXTRACTIVE_SUMMARIZERS:
+    raise ValueError(f"Unknown extractive summarizer: {EXTRACTIVE_SUMMARIZER}")
+
+# Bump whenever a change to the analysis logic alters its output
+ANALYSIS_REVISION = 7
+
+# Analysis profiles: which spaCy components run and which summarization tier is used
+ANALYSIS_PROFILES = {
+    # Tokenizer and keyword index only, TextRank summary
+    "fast": {
+        "components": [],
+        "summary": "extractive"
+    },
+    # Adds POS and lemmas for the keyword fallback, flan-t5 summary
+    "standard": {
+        "components": ["tok2vec", "tagger", "attribute_ruler", "lemmatizer"],
+        "summary": "model"
+    },
+    # The complete pipeline, including the parser and NER
+    "full": {
+        "components": ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"],
+        "summary": "model"
+    }
+}
+DEFAULT_ANALYSIS_PROFILE = os.getenv("ANALYSIS_PROFILE", "standard")
+
+# Longer descriptions are analyzed window by window; anything over the hard limit is rejected
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "12000"))
+ANALYSIS_MAX_INPUT_CHARS = int(os.getenv("ANALYSIS_MAX_INPUT_CHARS", "200000"))
+
+# NLP models are loaded once per process by load_models()
+nlp = None
+summarizer = None
+nltk_available = False
+# Intra-op thread count for PyTorch in this process; None keeps PyTorch's default
+torch_threads: Optional[int] = None
+model_load_seconds: Dict[str, float] = {}
+_models_lock = threading.Lock()
+
+def analysis_version() -> str:
+    """Return the version of the analysis output; part of every analysis cache key.
+
+    Includes the keyword taxonomy fingerprint, so a hot-reloaded taxonomy
+    invalidates cached analyses.
+    """
+    return (
+        f"{ANALYSIS_REVISION}|{SPACY_MODEL}|{SUMMARIZER_MODEL}|{summarizer_variant()}"
+        f"|{EXTRACTIVE_SUMMARIZER}|{get_keyword_index().fingerprint}"
+    )
+
+
+def summarizer_variant() -> str:
+    """Describe the summarizer weights and decoding, which both change its output."""
+    return f"{'int8' if SUMMARIZER_QUANTIZE else 'fp32'}-{SUMMARIZER_DECODING}"
+
+
+def torch_threads_for(workers: int) -> Optional[int]:
+    """Return the PyTorch intra-op thread count for each of `workers` processes on this machine.
+
+    With SUMMARIZER_THREADS=auto the cores are split evenly between the
+    workers, so several model copies do not oversubscribe the CPU.
+    """
+    if SUMMARIZER_THREADS == "auto":
+        return max(1, (os.cpu_count() or 1) // max(1, workers))
+    return int(SUMMARIZER_THREADS) or None
+
+
+def _check_nltk_data() -> bool:
+    """Check offline for the NLTK tokenizer data used by sumy's TextRank; never downloads."""
+    import nltk
+
+    missing = []
+    for resource in NLTK_RESOURCES:
+        try:
+            nltk.data.find(f"tokenizers/{resource}")
+        except LookupError:
+            missing.append(resource)
+
+    if missing:
+        logger.warning(f"NLTK data missing ({', '.join(missing)}), extractive summaries use the rule-based fallback")
+    return not missing
+
+
+def _load_spacy():
+    """Load the spaCy model."""
+    import spacy
+
+    return spacy.load(SPACY_MODEL)
+
+
+def _load_summarizer():
+    """Load the flan-t5 summarization pipeline, applying the CPU inference settings."""
+    import torch
+    from transformers import pipeline
+
+    if torch_threads is not None:
+        torch.set_num_threads(torch_threads)
+
+    text2text = pipeline("text2text-generation", model=SUMMARIZER_MODEL, device=-1)
+    if SUMMARIZER_QUANTIZE:
+        # int8 weights for the linear layers; activations are quantized on the fly
+        text2text.model = torch.ao.quantization.quantize_dynamic(
+            text2text.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    logger.info(f"Summarizer loaded ({summarizer_variant()}, {torch.get_num_threads()} threads)")
+    return text2text
+
+
+def _timed(name: str, loader):
+    """Run a loader and record how long it took."""
+    started = time.perf_counter()
+    result = loader()
+    model_load_seconds[name] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def models_ready() -> bool:
+    """Return True once the models have been loaded in this process."""
+    return nlp is not None and summarizer is not None
+
+
+def load_models() -> None:
+    """Load the spaCy and summarization models once for the current process.
+
+    The two models, the keyword taxonomy and, for the sumy extractive
+    summarizer, the NLTK data check are loaded concurrently, so startup costs
+    roughly the slowest of them rather than their sum.
+    """
+    global nlp, summarizer, nltk_available
+
+    if models_ready():
+        return
+
+    with _models_lock:
+        if models_ready():
+            return
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=4, thread_name_prefix="model-loader") as loader:
+                spacy_future = loader.submit(_timed, "spacy", _load_spacy)
+                summarizer_future = loader.submit(_timed, "summarizer", _load_summarizer)
+                nltk_future = None
+                if EXTRACTIVE_SUMMARIZER == "sumy":
+                    nltk_future = loader.submit(_timed, "nltk", _check_nltk_data)
+                taxonomy_future = loader.submit(_timed, "taxonomy", get_keyword_index)
+
+                taxonomy_future.result()
+                nltk_available = nltk_future.result() if nltk_future else False
+                spacy_model = spacy_future.result()
+                summarizer = summarizer_future.result()
+                nlp = spacy_model
+
+            model_load_seconds["total"] = round(time.perf_counter() - started, 3)
+            logger.info(f"NLP models loaded successfully in {model_load_seconds['total']}s")
+        except Exception as e:
+            logger.error(f"Error loading NLP models: {e}")
+            raise
+
+
+def chunk_text(text: str, max_chars: int = ANALYSIS_CHUNK_CHARS) -> Iterator[str]:
+    """Split text into windows of at most max_chars, breaking at line ends where possible."""
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        # Prefer the last line break in the window, then the last space
+        cut = text.rfind('\n', start + 1, end)
+        if cut == -1:
+            cut = text.rfind(' ', start + 1, end)
+        if cut == -1:
+            cut = end
+        yield text[start:cut]
+        start = cut
+    if start < len(text):
+        yield text[start:]
+
+
+def condense_text(text: str, max_chars: int = ANALYSIS_CHUNK_CHARS) -> str:
+    """Reduce text to the extractive summaries of its windows, repeatedly, until it fits one window."""
+    while len(text) > max_chars:
+        condensed = '\n'.join(extractive_summary(chunk) for chunk in chunk_text(text, max_chars))
+        if len(condensed) >= len(text):
+            # Nothing left to summarize away, e.g. text without sentence breaks
+            return condensed[:max_chars]
+        text = condensed
+    return text
+
+
+# Sentence ends, or line breaks, where a description is split when the doc has no sentence boundaries
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|[\r\n]+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into whitespace-normalized sentences at sentence punctuation and line breaks."""
+    sentences = (re.sub(r'\s+', ' ', part).strip() for part in SENTENCE_BREAK.split(text))
+    return [sentence for sentence in sentences if sentence]
 
-# Initialize phrase matcher for skills extraction
-matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-patterns = [nlp.make_doc(skill) for skill in TECH_SKILLS]
-matcher.add("TECH_SKILLS", patterns)
 
+def _sumy_sentences(sentences: List[str], sentence_count: int) -> List[str]:
+    """Rank sentences with sumy's TextRank."""
+    from sumy.models.dom import ObjectDocumentModel, Paragraph, Sentence
+    from sumy.nlp.tokenizers import Tokenizer
+    from sumy.summarizers.text_rank import TextRankSummarizer
 
-def chunk_text(text: str, max_words: int = 400) -> List[str]:
-    """Split text into chunks for processing."""
-    words = text.split()
-    return [' '.join(words[i:i+max_words]) for i in range(0, len(words), max_words)]
+    tokenizer = Tokenizer("english")
+    document = ObjectDocumentModel([Paragraph([Sentence(sentence, tokenizer) for sentence in sentences])])
+    return [str(sentence) for sentence in TextRankSummarizer()(document, sentence_count)]
 
 
-def extractive_summary(text: str, sentence_count: int = 4) -> str:
-    """Generate extractive summary using TextRank algorithm."""
+def _vector_sentences(sentences: List[str], sentence_count: int) -> List[str]:
+    """Rank sentences with TextRank over spaCy word vectors."""
+    from textrank import top_sentences
+
+    return top_sentences(nlp, sentences, sentence_count)
+
+
+def extractive_summary(
+    text: str,
+    sentence_count: int = 4,
+    sentences: Optional[List[str]] = None,
+    method: Optional[str] = None
+) -> str:
+    """Generate extractive summary using TextRank algorithm.
+
+    Pass the text's sentences when they are already known, so they are
+    not split again. ``method`` overrides EXTRACTIVE_SUMMARIZER.
+    """
+    method = method or EXTRACTIVE_SUMMARIZER
+    if (method == "sumy" and not nltk_available) or (method == "vectors" and nlp is None):
+        return _generate_fallback_summary(text)
+
     try:
-        cleaned_text = re.sub(r'\s+', ' ', text.strip())
-        
-        parser = PlaintextParser.from_string(cleaned_text, Tokenizer("english"))
-        summarizer_obj = TextRankSummarizer()
-        summary_sentences = summarizer_obj(parser.document, sentence_count)
+        if sentences is None:
+            sentences = split_sentences(text)
+        if method == "vectors":
+            summary_sentences = _vector_sentences(sentences, sentence_count)
+        else:
+            summary_sentences = _sumy_sentences(sentences, sentence_count)
         
         summary_lines = []
         for sentence in summary_sentences:
-            line = str(sentence).strip()
+            line = sentence.strip()
             if line:
                 summary_lines.append(line)
         
@@ -122,68 +294,32 @@ def extractive_summary(text: str, sentence_count: int = 4) -> str:
         return _generate_fallback_summary(text)
 
 
+FALLBACK_SUMMARY_GROUPS = [
+    (['full stack', 'fullstack', 'software developer', 'engineer'], 1),
+    (['responsible for', 'will', 'develop', 'create', 'build', 'design',
+      'collaborate', 'work with', 'assist', 'support'], 2),
+    (['years', 'experience', 'qualifications', 'requirements', 'degree'], 3),
+    (['team', 'collaboration', 'organization', 'mentor'], 4)
+]
+# "years" is matched as a "<number> years" mention rather than the bare word
+FALLBACK_SUMMARY_RULES = SentenceRules(
+    keywords=[rule for rules, _ in FALLBACK_SUMMARY_GROUPS for rule in rules if rule != 'years'],
+    patterns={'years': YEARS_RULE}
+)
+
+
 def _generate_fallback_summary(text: str) -> str:
     """Generate fallback summary when extractive summarization fails."""
     summary_parts = []
-    
-    # Extract role and main responsibility
-    role_patterns = [
-        r'[^.]*full stack[^.]*\.',
-        r'[^.]*fullstack[^.]*\.',
-        r'[^.]*software developer[^.]*\.',
-        r'[^.]*engineer[^.]*\.'
-    ]
-    
-    for pattern in role_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        if matches and len(summary_parts) < 1:
-            summary_parts.append(matches[0].strip())
-    
-    # Extract responsibility sentences
-    responsibility_patterns = [
-        r'[^.]*responsible for[^.]*\.',
-        r'[^.]*will[^.]*\.',
-        r'[^.]*develop[^.]*\.',
-        r'[^.]*create[^.]*\.',
-        r'[^.]*build[^.]*\.',
-        r'[^.]*design[^.]*\.',
-        r'[^.]*collaborate[^.]*\.',
-        r'[^.]*work with[^.]*\.',
-        r'[^.]*assist[^.]*\.',
-        r'[^.]*support[^.]*\.'
-    ]
-    
-    for pattern in responsibility_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        if matches and len(summary_parts) < 2:
-            summary_parts.append(matches[0].strip())
-    
-    # Extract experience requirements
-    experience_patterns = [
-        r'[^.]*\d+\+?\s*years?[^.]*\.',
-        r'[^.]*experience[^.]*\.',
-        r'[^.]*qualifications[^.]*\.',
-        r'[^.]*requirements[^.]*\.',
-        r'[^.]*degree[^.]*\.'
-    ]
-    
-    for pattern in experience_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        if matches and len(summary_parts) < 3:
-            summary_parts.append(matches[0].strip())
-    
-    # Extract work environment
-    environment_patterns = [
-        r'[^.]*team[^.]*\.',
-        r'[^.]*collaboration[^.]*\.',
-        r'[^.]*organization[^.]*\.',
-        r'[^.]*mentor[^.]*\.'
-    ]
-    
-    for pattern in environment_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        if matches and len(summary_parts) < 4:
-            summary_parts.append(matches[0].strip())
+    matches = FALLBACK_SUMMARY_RULES.match(text)
+
+    # Rule groups in priority order, each filling the summary up to a number of lines:
+    # role and main responsibility, responsibilities, experience, work environment
+    for rules, max_parts in FALLBACK_SUMMARY_GROUPS:
+        for rule in rules:
+            sentence = matches.sentence(rule)
+            if sentence and len(summary_parts) < max_parts:
+                summary_parts.append(sentence.strip())
     
     if summary_parts:
         if len(summary_parts) < 3:
@@ -216,77 +352,76 @@ def _generate_fallback_summary(text: str) -> str:
     return "Software Developer\nResponsible for developing and maintaining software applications\nRequires experience in software development and programming\nCollaborates with cross-functional teams to deliver high-quality solutions"
 
 
-def extract_skills(doc) -> List[str]:
-    """Extract technical skills from job description using multiple methods."""
-    found_skills = set()
+def match_skills(doc, scan: KeywordScan) -> Set[str]:
+    """Return the taxonomy skills found by the keyword index and NER."""
+    skill_keywords = scan.index.category_members('skills')
 
-    # Method 1: PhraseMatcher for exact matches
-    matches = matcher(doc)
-    for _, start, end in matches:
-        found_skills.add(doc[start:end].text.lower())
+    # Method 1: Keyword index matches, bounded by words so 'java' is not found in 'javascript'
+    found_skills = scan.keywords('skills')
 
     # Method 2: Named Entity Recognition
     for ent in doc.ents:
         if ent.label_ in ["ORG", "PRODUCT", "LANGUAGE", "WORK_OF_ART"]:
-            if ent.text.lower() in TECH_SKILLS:
+            if ent.text.lower() in skill_keywords:
                 found_skills.add(ent.text.lower())
 
-    # Method 3: Keyword extraction
-    text_lower = doc.text.lower()
-    for skill in TECH_SKILLS:
-        if skill in text_lower:
-            found_skills.add(skill)
+    return found_skills
+
 
-    # Method 4: Fallback to keyword extraction
+def fallback_keywords(doc) -> Counter:
+    """Count candidate keywords for when no known skill is found (plain tokens when POS tagging is disabled)."""
+    has_pos = doc.has_annotation("POS")
+    tokens = [(token.lemma_ if has_pos else token.text).lower() for token in doc 
+             if not token.is_stop and token.is_alpha and 
+             (not has_pos or token.pos_ in ["NOUN", "PROPN"]) and len(token.text) > 2]
+    return Counter(tokens)
+
+
+def extract_skills(doc, context: Optional["AnalysisContext"] = None) -> List[str]:
+    """Extract technical skills from job description using multiple methods."""
+    context = context or AnalysisContext(doc.text, doc)
+    found_skills = match_skills(doc, context.scan)
+
+    # Method 3: Fallback to keyword extraction
     if not found_skills:
-        tokens = [token.lemma_.lower() for token in doc 
-                 if not token.is_stop and token.is_alpha and 
-                 token.pos_ in ["NOUN", "PROPN"] and len(token.text) > 2]
-        top_keywords = [word for word, _ in Counter(tokens).most_common(5)]
+        top_keywords = [word for word, _ in context.keyword_candidates.most_common(5)]
         found_skills.update(top_keywords)
 
-    logger.info(f"Extracted skills: {found_skills}")
+    sampled_debug(logger, "Extracted skills: %s", found_skills)
     return sorted(list(found_skills))
 
 
-def detect_job_role(doc, skills: List[str]) -> str:
+def detect_job_role(doc, skills: List[str], context: Optional["AnalysisContext"] = None) -> str:
     """Detect job role using multiple strategies."""
-    text = doc.text.lower()
+    context = context or AnalysisContext(doc.text, doc)
+    return choose_job_role(context.role_phrase, context.scan.counts('role_titles'), skills)
+
+
+def choose_job_role(candidate: Optional[str], role_counts: Counter, skills: List[str]) -> str:
+    """Pick the role from a direct role phrase, role title counts or, failing both, the skills."""
+    role_titles = get_keyword_index().categories.get('role_titles', [])
 
     # Strategy 1: Direct role mentions
-    direct_role_patterns = [
-        r'(?:seeking|looking for|hiring)\s+(?:a|an)?\s*([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
-        r'(?:join us as|position as|role as)\s+(?:a|an)?\s*([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
-        r'([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))\s+(?:who|responsible|position|role)',
-        r'(?:we are|we\'re)\s+([\w\s/-]+?(?:developer|engineer|scientist|manager|designer|analyst))',
-    ]
-    
-    for pattern in direct_role_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        if matches:
-            candidate = matches[0].strip().lower()
-            logger.info(f"Direct role pattern matched: '{candidate}'")
-            
-            candidate = re.sub(r'\s+', ' ', candidate).strip()
-            
-            for role in ROLE_TITLES:
-                if role in candidate or candidate in role:
-                    logger.info(f"Matched predefined role: '{role}'")
-                    return role.title()
-            
-            if any(word in candidate for word in ['developer', 'engineer', 'scientist', 'manager', 'designer', 'analyst']):
-                return candidate.title()
+    if candidate:
+        candidate = candidate.strip().lower()
+        sampled_debug(logger, "Direct role pattern matched: '%s'", candidate)
+        
+        candidate = re.sub(r'\s+', ' ', candidate).strip()
+        
+        for role in role_titles:
+            if role in candidate or candidate in role:
+                sampled_debug(logger, "Matched predefined role: '%s'", role)
+                return role.title()
+        
+        return candidate.title()
 
     # Strategy 2: Keyword frequency analysis
-    role_counts = Counter()
-    for role in ROLE_TITLES:
-        count = text.count(role)
-        if count >= 1:
-            role_counts[role] = count
-    
     if role_counts:
-        selected_role = max(role_counts, key=role_counts.get)
-        logger.info(f"Role detected by keyword frequency: '{selected_role}' ({role_counts[selected_role]} occurrences)")
+        # Ties go to the role listed first in the taxonomy
+        selected_role = max(role_titles, key=lambda role: role_counts.get(role, 0))
+        sampled_debug(
+            logger, "Role detected by keyword frequency: '%s' (%d occurrences)", selected_role, role_counts[selected_role]
+        )
         return selected_role.title()
 
     # Strategy 3: Skill-based inference
@@ -300,7 +435,10 @@ def detect_job_role(doc, skills: List[str]) -> str:
     ds_count = len([s for s in skills if s in data_skills])
     devops_count = len([s for s in skills if s in devops_skills])
 
-    logger.info(f"Skill-based inference counts -> FE: {fe_count}, BE: {be_count}, DS: {ds_count}, DevOps: {devops_count}")
+    sampled_debug(
+        logger, "Skill-based inference counts -> FE: %d, BE: %d, DS: %d, DevOps: %d",
+        fe_count, be_count, ds_count, devops_count
+    )
 
     if fe_count >= 3 and be_count >= 3:
         return "Fullstack Developer"
@@ -324,89 +462,79 @@ def detect_job_role(doc, skills: List[str]) -> str:
     return "Software Developer"
 
 
-def extract_sections(text: str) -> Dict[str, List[str]]:
+def extract_sections(text: str, context: Optional["AnalysisContext"] = None) -> Dict[str, List[str]]:
     """Extract responsibilities and requirements sections from job description."""
+    context = context or AnalysisContext(text)
+    sections, _ = split_sections(text, context.scan)
+    sampled_debug(logger, "Extracted sections: %s", sections)
+    return sections
+
+
+def split_sections(
+    text: str,
+    scan: Optional[KeywordScan] = None,
+    current_section: Optional[str] = None
+) -> Tuple[Dict[str, List[str]], Optional[str]]:
+    """Split text into section lines, starting in current_section; also returns the section open at the end."""
     sections = defaultdict(list)
-    lines = re.split(r'[\n\r]+', text)
-    current_section = None
+    scan = scan or get_keyword_index().scan(text)
+    lines = [(match.start(), match.end(), match.group()) for match in re.finditer(r'[^\n\r]+', text)]
+    spans = [(start, end) for start, end, _ in lines]
+    responsibility_lines = scan.spans_with('responsibility_headers', spans)
+    requirement_lines = scan.spans_with('requirement_headers', spans)
 
-    for line in lines:
+    for position, (_, _, line) in enumerate(lines):
         clean_line = line.strip().lstrip("0123456789.-•* ").strip()
         if not clean_line:
             continue
-            
-        lower = clean_line.lower()
 
-        if any(header in lower for header in RESPONSIBILITY_HEADERS):
+        if position in responsibility_lines:
             current_section = "responsibilities"
             continue
-        if any(header in lower for header in REQUIREMENT_HEADERS):
+        if position in requirement_lines:
             current_section = "requirements"
             continue
 
         if current_section and len(clean_line) > 10:
             sections[current_section].append(clean_line)
 
-    logger.info(f"Extracted sections: {dict(sections)}")
-    return sections
+    return sections, current_section
+
+
+SUMMARY_FALLBACK_CLAUSES = ['responsible for', 'will', 'develop', 'create', 'build']
+SUMMARY_FALLBACK_RULES = SentenceRules(keywords=SUMMARY_FALLBACK_CLAUSES)
 
 
 def clean_summary(summary: str, original_text: str) -> str:
     """Clean summary to remove company background and unrelated information."""
-    sentences = re.split(r'[.!?]+', summary)
+    scan = get_keyword_index().scan(summary)
+    sentences = [(match.start(), match.end(), match.group()) for match in re.finditer(r'[^.!?]+', summary)]
+    spans = [(start, end) for start, end, _ in sentences]
+    company_sentences = scan.spans_with('company_keywords', spans)
+    skill_sentences = scan.spans_with('summary_technical_skills', spans)
+    job_sentences = scan.spans_with('job_keywords', spans)
     cleaned_sentences = []
-    
-    company_keywords = [
-        'tradeweb', 'amazon', 'google', 'microsoft', 'apple', 'facebook', 'meta',
-        'global leader', 'leading', 'established', 'founded', 'headquartered',
-        'serving', 'serves', 'clientele', 'customers', 'mission', 'vision', 'values',
-        'culture', 'benefits', 'perks', 'insurance', '401k', 'equal opportunity',
-        'diversity', 'inclusive', 'eeo', 'recognized', 'awarded', 'ranked',
-        'best companies', 'trillion', 'revenue', 'growth', 'ipo', 'acquisitions',
-        'mastech', 'pittsburgh', 'nyse', 'minority-owned', 'certified'
-    ]
-    
-    job_keywords = [
-        'responsible', 'develop', 'create', 'build', 'design', 'implement',
-        'programming', 'software', 'platform', 'systems', 'features',
-        'components', 'libraries', 'deadlines', 'support', 'improvements',
-        'distributed', 'scalable', 'microservices', 'collaborate', 'work with',
-        'experience', 'requirements', 'qualifications', 'team', 'project'
-    ]
-    
-    technical_skills = [
-        'angular', 'react', 'nodejs', 'express', 'html', 'css', 'sass', 'javascript',
-        'java', 'spring', 'python', 'aws', 'azure', 'docker', 'kubernetes',
-        'jenkins', 'git', 'github', 'npm', 'graphql', 'sql', 'pl/sql'
-    ]
-    
-    for sentence in sentences:
+
+    for position, (_, _, sentence) in enumerate(sentences):
         sentence = sentence.strip()
         if not sentence:
             continue
-            
-        has_company_info = any(keyword in sentence.lower() for keyword in company_keywords)
-        has_technical_skills = any(skill in sentence.lower() for skill in technical_skills)
-        has_job_info = any(keyword in sentence.lower() for keyword in job_keywords)
-        
+
+        has_company_info = position in company_sentences
+        has_technical_skills = position in skill_sentences
+        has_job_info = position in job_sentences
+
         if has_job_info and not has_company_info and not has_technical_skills:
             cleaned_sentences.append(sentence)
         elif len(sentence.split()) <= 8 and not has_company_info and not has_technical_skills:
             cleaned_sentences.append(sentence)
     
     if not cleaned_sentences:
-        responsibility_patterns = [
-            r'responsible for[^.]*\.',
-            r'will[^.]*\.',
-            r'develop[^.]*\.',
-            r'create[^.]*\.',
-            r'build[^.]*\.'
-        ]
-        
-        for pattern in responsibility_patterns:
-            matches = re.findall(pattern, original_text, flags=re.IGNORECASE)
-            if matches:
-                cleaned_sentences.append(matches[0])
+        matches = SUMMARY_FALLBACK_RULES.match(original_text)
+        for rule in SUMMARY_FALLBACK_CLAUSES:
+            clause = matches.clause(rule)
+            if clause:
+                cleaned_sentences.append(clause)
                 break
     
     cleaned_summary = '. '.join(cleaned_sentences)
@@ -418,10 +546,77 @@ def clean_summary(summary: str, original_text: str) -> str:
     return cleaned_summary
 
 
-def generate_summary(text: str, role: str, skills: List[str]) -> str:
-    """Generate a comprehensive job description summary."""
-    try:
-        prompt = f"""Write a comprehensive 3-4 line job summary for this position.
+SUMMARY_DECODING_KWARGS = {
+    "beam": {"num_beams": 3, "early_stopping": True},
+    "greedy": {"num_beams": 1}
+}
+
+SUMMARY_GENERATION_KWARGS = {
+    "max_new_tokens": 120,
+    "min_length": 50,
+    "no_repeat_ngram_size": 2,
+    "temperature": 0.5,
+    "do_sample": False,
+    **SUMMARY_DECODING_KWARGS[SUMMARIZER_DECODING]
+}
+
+
+def _fit_tokens(text: str, budget: int) -> Tuple[str, int]:
+    """Cut text to at most budget summarizer tokens; returns the text and the tokens it uses."""
+    if summarizer is None:
+        # Roughly four characters per token until the tokenizer is loaded
+        clipped = text[:budget * 4]
+        return clipped, (len(clipped) + 3) // 4
+
+    token_ids = summarizer.tokenizer(text, add_special_tokens=False)["input_ids"]
+    if len(token_ids) <= budget:
+        return text, len(token_ids)
+    return summarizer.tokenizer.decode(token_ids[:budget], skip_special_tokens=True), budget
+
+
+def summary_input(
+    text: str,
+    sections: Optional[Dict[str, List[str]]] = None,
+    max_tokens: int = SUMMARY_INPUT_TOKENS
+) -> str:
+    """Select the description text given to the summarizer, within a token budget.
+
+    Responsibility and requirement lines are taken alternately so both
+    sections are represented; the raw text is used when neither was found.
+    """
+    groups = [(name, sections.get(name, [])) for name in ("responsibilities", "requirements")] if sections else []
+    groups = [(name, lines) for name, lines in groups if lines]
+    if not groups:
+        groups = [("", [line.strip() for line in text.splitlines() if line.strip()])]
+
+    selected = {name: [] for name, _ in groups}
+    remaining = max_tokens
+    for position in range(max(len(lines) for _, lines in groups)):
+        for name, lines in groups:
+            if position >= len(lines) or remaining <= 0:
+                continue
+            line, used = _fit_tokens(lines[position], remaining)
+            selected[name].append(line)
+            remaining -= used
+        if remaining <= 0:
+            break
+
+    parts = []
+    for name, lines in selected.items():
+        if lines:
+            header = f"{name.title()}:\n" if name else ""
+            parts.append(header + "\n".join(lines))
+    return "\n".join(parts)
+
+
+def build_summary_prompt(
+    text: str,
+    role: str,
+    experience_level: Optional[str] = None,
+    sections: Optional[Dict[str, List[str]]] = None
+) -> str:
+    """Build the flan-t5 prompt for a job description summary."""
+    return f"""Write a comprehensive 3-4 line job summary for this position.
 
 Structure the summary with 3-4 distinct lines covering:
 Line 1: Role and main responsibility
@@ -441,69 +636,106 @@ Avoid:
 - Company culture or values
 - Technical skills (these are listed separately)
 
-Job Description: {text[:1200]}
+Job Description: {summary_input(text, sections)}
 Role: {role}
-Experience Level: {detect_experience_level(text)}
+Experience Level: {experience_level or detect_experience_level(text)}
 
 Summary:"""
 
-        result = summarizer(
-            prompt,
-            max_new_tokens=120,
-            min_length=50,
-            num_beams=3,
-            no_repeat_ngram_size=2,
-            early_stopping=True,
-            temperature=0.5,
-            do_sample=False
-        )
-        
-        generated_summary = result[0]['generated_text'].strip()
-        
-        if (generated_summary.startswith("Write a") or 
-            generated_summary.startswith("Summary:") or
-            generated_summary.startswith("Line 1:") or
-            generated_summary.startswith("Focus on:") or
-            len(generated_summary.split()) < 10 or
-            "]" in generated_summary or
-            "[" in generated_summary or
-            "Line 1:" in generated_summary or
-            "Line 2:" in generated_summary):
-            logger.info("Model generated poor output, using extractive summary")
-            generated_summary = extractive_summary(text)
-        
-        if len(generated_summary.split()) < 15 or len(generated_summary) < 80:
-            logger.info("Generated summary too short, using extractive summary")
-            generated_summary = extractive_summary(text)
+
+def run_summarizer(prompts: List[str]) -> List[str]:
+    """Generate summaries for a batch of prompts with one padded generate call."""
+    load_models()
+    results = summarizer(prompts, batch_size=len(prompts), **SUMMARY_GENERATION_KWARGS)
+
+    generated = []
+    for result in results:
+        if isinstance(result, list):
+            result = result[0]
+        generated.append(result['generated_text'].strip())
+    return generated
+
+
+def finalize_summary(generated_summary: str, text: str, context: Optional["AnalysisContext"] = None) -> str:
+    """Reject unusable model output in favour of an extractive summary, then clean it."""
+    context = context or AnalysisContext(text)
+    rejected = False
+    if (generated_summary.startswith("Write a") or 
+        generated_summary.startswith("Summary:") or
+        generated_summary.startswith("Line 1:") or
+        generated_summary.startswith("Focus on:") or
+        len(generated_summary.split()) < 10 or
+        "]" in generated_summary or
+        "[" in generated_summary or
+        "Line 1:" in generated_summary or
+        "Line 2:" in generated_summary):
+        SUMMARY_FALLBACKS.inc(reason="rejected")
+        sampled_debug(logger, "Model generated poor output, using extractive summary: %r", generated_summary)
+        generated_summary = context.extractive_summary
+        rejected = True
+    
+    if len(generated_summary.split()) < 15 or len(generated_summary) < 80:
+        if not rejected:
+            SUMMARY_FALLBACKS.inc(reason="too_short")
+        sampled_debug(logger, "Generated summary too short, using extractive summary: %r", generated_summary)
+        generated_summary = context.extractive_summary
+    
+    return clean_summary(generated_summary, text)
+
+
+# Collects concurrent summary prompts into shared generate calls when enabled
+summary_batcher = SummaryBatcher(run_summarizer) if SUMMARY_BATCHING else None
+
+
+def generate_summary(
+    text: str,
+    role: str,
+    skills: List[str],
+    experience_level: Optional[str] = None,
+    sections: Optional[Dict[str, List[str]]] = None,
+    context: Optional["AnalysisContext"] = None
+) -> str:
+    """Generate a comprehensive job description summary."""
+    context = context or AnalysisContext(text)
+    try:
+        prompt = build_summary_prompt(text, role, experience_level or context.experience_level, sections)
+
+        with span(ANALYSIS_STAGE_SECONDS, stage="summary_model"):
+            if summary_batcher is not None:
+                generated_summary = summary_batcher.submit(prompt)
+            else:
+                generated_summary = run_summarizer([prompt])[0]
         
-        generated_summary = clean_summary(generated_summary, text)
-        return generated_summary
+        return finalize_summary(generated_summary, text, context)
 
     except Exception as e:
         logger.error(f"Error in generate_summary: {e}")
-        return extractive_summary(text)
+        SUMMARY_FALLBACKS.inc(reason="error")
+        return context.extractive_summary
+
+
+EXPERIENCE_LEVEL_KEYWORDS = {
+    'Intern': ['intern', 'internship', 'trainee', 'student'],
+    'Junior (0-2 years)': ['junior', 'entry', 'fresher', 'graduate', 'new grad'],
+    'Mid-level (3-5 years)': ['mid-level', 'intermediate', 'regular', 'experienced'],
+    'Senior (6-8 years)': ['senior', 'sr.', 'lead', 'experienced'],
+    'Principal/Lead (8+ years)': ['principal', 'staff', 'architect', 'director', 'head of', 'vp', 'chief']
+}
+EXPERIENCE_LEVEL_RULES = KeywordRules(keyword for keywords in EXPERIENCE_LEVEL_KEYWORDS.values() for keyword in keywords)
+
+
+def experience_signals(text: str) -> Tuple[List[int], Set[str]]:
+    """Return the years of experience and the seniority keywords mentioned in the text."""
+    return years_mentioned(text), EXPERIENCE_LEVEL_RULES.found(text)
 
 
 def detect_experience_level(text: str) -> str:
     """Detect experience level from job description."""
-    years_patterns = [
-        r'(\d+)\+?\s*years?',
-        r'(\d+)\+?\s*yrs?',
-        r'(\d+)\s*to\s*(\d+)\s*years?',
-        r'(\d+)\+?\s*years?\s*of\s*experience'
-    ]
-    
-    years_found = []
-    for pattern in years_patterns:
-        matches = re.findall(pattern, text, flags=re.IGNORECASE)
-        for match in matches:
-            if isinstance(match, tuple):
-                for x in match:
-                    if x.isdigit():
-                        years_found.append(int(x))
-            elif match.isdigit():
-                years_found.append(int(match))
+    return experience_level_from_signals(*experience_signals(text))
+
 
+def experience_level_from_signals(years_found: List[int], found: Set[str]) -> str:
+    """Map years of experience, or failing that seniority keywords, to an experience level."""
     if years_found:
         max_years = max(years_found)
         if max_years <= 2:
@@ -515,44 +747,285 @@ def detect_experience_level(text: str) -> str:
         else:
             return 'Principal/Lead (8+ years)'
 
-    level_keywords = {
-        'Intern': ['intern', 'internship', 'trainee', 'student'],
-        'Junior (0-2 years)': ['junior', 'entry', 'fresher', 'graduate', 'new grad'],
-        'Mid-level (3-5 years)': ['mid-level', 'intermediate', 'regular', 'experienced'],
-        'Senior (6-8 years)': ['senior', 'sr.', 'lead', 'experienced'],
-        'Principal/Lead (8+ years)': ['principal', 'staff', 'architect', 'director', 'head of', 'vp', 'chief']
-    }
-    
-    for level, keywords in level_keywords.items():
-        if any(keyword in text.lower() for keyword in keywords):
+    for level, keywords in EXPERIENCE_LEVEL_KEYWORDS.items():
+        if any(keyword in found for keyword in keywords):
             return level
             
     return 'Mid-level (3-5 years)'
 
 
-def analyze_job_description(text: str) -> Dict[str, any]:
-    """Main function to analyze job description and return comprehensive insights."""
+def validate_job_description(text: str) -> None:
+    """Reject job descriptions too short to analyze or over the input limit."""
+    if not text or len(text.strip()) < 50:
+        raise ValueError("Job description text is too short or empty")
+    if len(text) > ANALYSIS_MAX_INPUT_CHARS:
+        raise ValueError(f"Job description exceeds the {ANALYSIS_MAX_INPUT_CHARS} character limit")
+
+
+def resolve_profile(profile: Optional[str] = None) -> str:
+    """Return the profile name to use, defaulting to the deployment-wide profile."""
+    name = profile or DEFAULT_ANALYSIS_PROFILE
+    if name not in ANALYSIS_PROFILES:
+        raise ValueError(f"Unknown analysis profile: {name}")
+    return name
+
+
+def profile_components(profile: str) -> List[str]:
+    """Return the loaded spaCy components a profile runs, in pipeline order."""
+    load_models()
+    wanted = ANALYSIS_PROFILES[profile]["components"]
+    return [name for name in nlp.pipe_names if name in wanted]
+
+
+def profile_disabled_components(profile: str) -> List[str]:
+    """Return the loaded spaCy components a profile skips."""
+    components = profile_components(profile)
+    return [name for name in nlp.pipe_names if name not in components]
+
+
+def parse_chunks(chunks: Iterable[str], profile: str) -> Iterator:
+    """Parse windows of text one at a time, so only one window's doc is held in memory."""
+    load_models()
+    if not profile_components(profile):
+        return (nlp.make_doc(chunk) for chunk in chunks)
+    return nlp.pipe(chunks, disable=profile_disabled_components(profile), batch_size=1)
+
+
+def parse_text(text: str, profile: str):
+    """Parse text with only the spaCy components the profile needs."""
+    load_models()
+    if not profile_components(profile):
+        return nlp.make_doc(text)
+    return nlp(text, disable=profile_disabled_components(profile))
+
+
+def summarize_for_profile(
+    text: str,
+    insights: Dict[str, any],
+    profile: str,
+    context: Optional["AnalysisContext"] = None
+) -> str:
+    """Summarize with the tier the profile selects."""
+    context = context or AnalysisContext(text)
+    if ANALYSIS_PROFILES[profile]["summary"] == "model":
+        return generate_summary(
+            text, insights['role_type'], insights['skills'], insights['experience_level'], insights['sections'],
+            context
+        )
+    return clean_summary(context.extractive_summary, text)
+
+
+def profile_metadata(profile: str, chunks: int = 1) -> Dict[str, any]:
+    """Describe the profile a result was produced with."""
+    return {
+        'profile': profile,
+        'components': profile_components(profile),
+        'summary_tier': ANALYSIS_PROFILES[profile]["summary"],
+        'chunks': chunks
+    }
+
+
+class AnalysisContext:
+    """What the analysis stages derive from one text, each computed at most once.
+
+    Stages read the keyword scan, sentences, token features, experience
+    signals, role phrase and extractive summary from the context instead of
+    passing over the text again. ``timer`` accumulates the time spent per
+    stage.
+    """
+
+    def __init__(self, text: str, doc=None, timer: Optional[StageTimer] = None):
+        self.text = text
+        self.doc = doc
+        self.timer = timer or StageTimer()
+
+    def stage(self, name: str):
+        """Time a stage of the analysis this context belongs to."""
+        return self.timer.stage(name)
+
+    @cached_property
+    def scan(self) -> KeywordScan:
+        """Every taxonomy keyword occurrence, for the skill, role and section stages."""
+        return get_keyword_index().scan(self.text)
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        """Whitespace-normalized sentences, from spaCy when the profile's pipeline sets sentence boundaries."""
+        if self.doc is not None and self.doc.has_annotation("SENT_START"):
+            sentences = (re.sub(r'\s+', ' ', sentence.text).strip() for sentence in self.doc.sents)
+            return [sentence for sentence in sentences if sentence]
+        return split_sentences(self.text)
+
+    @cached_property
+    def keyword_candidates(self) -> Counter:
+        """Token counts for the skill fallback; needs the parsed doc."""
+        return fallback_keywords(self.doc)
+
+    @cached_property
+    def experience_signals(self) -> Tuple[List[int], Set[str]]:
+        return experience_signals(self.text)
+
+    @cached_property
+    def experience_level(self) -> str:
+        return experience_level_from_signals(*self.experience_signals)
+
+    @cached_property
+    def role_phrase(self) -> Optional[str]:
+        # The role rules ignore case, so the text is not lowercased first
+        return find_role_phrase(self.text)
+
+    @cached_property
+    def extractive_summary(self) -> str:
+        return extractive_summary(self.text, sentences=self.sentences)
+
+    @cached_property
+    def document_vector(self) -> Optional[bytes]:
+        """The normalized mean word vector of the text as float16 bytes, for the similar analyses index."""
+        from embedding_index import encode_vector
+        from textrank import word_vector_sums
+
+        sums, _ = word_vector_sums(nlp, self.sentences)
+        return encode_vector(sums.sum(axis=0)) if len(sums) else None
+
+
+def analyze_doc(doc, context: Optional[AnalysisContext] = None) -> Dict[str, any]:
+    """Run every analysis stage except summarization on a parsed job description."""
+    context = context or AnalysisContext(doc.text, doc)
+    # One keyword scan serves the skill, role and section stages; taken here so its time is its own
+    with context.stage("keyword_scan"):
+        context.scan
+    with context.stage("extract_skills"):
+        skills = extract_skills(doc, context)
+    with context.stage("detect_job_role"):
+        role = detect_job_role(doc, skills, context)
+    with context.stage("experience_level"):
+        experience_level = context.experience_level
+    with context.stage("extract_sections"):
+        sections = extract_sections(context.text, context)
+
+    return {
+        'skills': skills,
+        'role_type': role,
+        'experience_level': experience_level,
+        'sections': sections
+    }
+
+
+def analyze_chunked(text: str, profile: str, timer: Optional[StageTimer] = None) -> Tuple[Dict[str, any], int]:
+    """Run every analysis stage except summarization window by window, merging the results.
+
+    Skills and role title counts are combined across windows, sections carry
+    over window boundaries and experience signals are pooled before picking a
+    level. Returns the insights and the number of windows.
+    """
+    skills: Set[str] = set()
+    fallback_counts = Counter()
+    role_phrase = None
+    role_counts = Counter()
+    sections = defaultdict(list)
+    current_section = None
+    max_years: List[int] = []
+    level_keywords: Set[str] = set()
+    chunks = 0
+    timer = timer or StageTimer()
+    docs = parse_chunks(chunk_text(text), profile)
+
+    while True:
+        # Windows are parsed lazily, one per step
+        with timer.stage("parse"):
+            doc = next(docs, None)
+        if doc is None:
+            break
+        chunks += 1
+        window = AnalysisContext(doc.text, doc, timer)
+        with timer.stage("keyword_scan"):
+            scan = window.scan
+
+        with timer.stage("extract_skills"):
+            skills |= match_skills(doc, scan)
+            if not skills:
+                fallback_counts.update(window.keyword_candidates)
+
+        with timer.stage("detect_job_role"):
+            if role_phrase is None:
+                role_phrase = window.role_phrase
+            role_counts.update(scan.counts('role_titles'))
+
+        with timer.stage("extract_sections"):
+            chunk_sections, current_section = split_sections(doc.text, scan, current_section)
+            for name, lines in chunk_sections.items():
+                sections[name].extend(lines)
+
+        with timer.stage("experience_level"):
+            years, keywords = window.experience_signals
+            if years:
+                max_years = [max(max_years + years)]
+            level_keywords |= keywords
+
+    if not skills:
+        skills.update(word for word, _ in fallback_counts.most_common(5))
+    skill_list = sorted(skills)
+    sampled_debug(logger, "Extracted skills from %d windows: %s", chunks, skills)
+
+    with timer.stage("detect_job_role"):
+        role = choose_job_role(role_phrase, role_counts, skill_list)
+    return {
+        'skills': skill_list,
+        'role_type': role,
+        'experience_level': experience_level_from_signals(max_years, level_keywords),
+        'sections': sections
+    }, chunks
+
+
+def build_result(insights: Dict[str, any], summary: str, metadata: Dict[str, any]) -> Dict[str, any]:
+    """Assemble the analysis response from the stage outputs and the summary."""
+    return {
+        'skills': insights['skills'],
+        'role_type': insights['role_type'],
+        'experience_level': insights['experience_level'],
+        'summary': summary,
+        'sections': insights['sections'],
+        'metadata': metadata
+    }
+
+
+def analyze_job_description(text: str, profile: Optional[str] = None, embed: bool = False) -> Dict[str, any]:
+    """Main function to analyze job description and return comprehensive insights.
+
+    With ``embed`` the result also carries the document vector as ``embedding``
+    (see ``AnalysisContext.document_vector``), which the API stores with the
+    analysis instead of returning it.
+    """
     try:
-        if not text or len(text.strip()) < 50:
-            raise ValueError("Job description text is too short or empty")
+        validate_job_description(text)
+        profile = resolve_profile(profile)
             
-        logger.info(f"Analyzing job description of length: {len(text)}")
+        logger.info(f"Analyzing job description of length: {len(text)} with profile '{profile}'")
+        ANALYSIS_INPUT_CHARS.observe(len(text), profile=profile)
         
-        doc = nlp(text)
-        skills = extract_skills(doc)
-        role = detect_job_role(doc, skills)
-        experience_level = detect_experience_level(text)
-        summary = generate_summary(text, role, skills)
-
-        result = {
-            'skills': skills,
-            'role_type': role,
-            'experience_level': experience_level,
-            'summary': summary,
-            'sections': extract_sections(text)
-        }
+        timer = StageTimer()
+        with timer.stage("total"):
+            if len(text) > ANALYSIS_CHUNK_CHARS:
+                # Bounded memory: one window's doc at a time, summary built from window summaries
+                insights, chunks = analyze_chunked(text, profile, timer)
+                with timer.stage("condense"):
+                    context = AnalysisContext(condense_text(text), timer=timer)
+            else:
+                with timer.stage("parse"):
+                    context = AnalysisContext(text, parse_text(text, profile), timer)
+                insights, chunks = analyze_doc(context.doc, context), 1
+            with timer.stage("summarize"):
+                summary = summarize_for_profile(context.text, insights, profile, context)
+            result = build_result(insights, summary, profile_metadata(profile, chunks))
+            if embed:
+                with timer.stage("embed"):
+                    embedding = context.document_vector
+                if embedding is not None:
+                    result['embedding'] = embedding
+        timer.observe()
+        ANALYSIS_CHUNKS.inc(chunks, profile=profile)
         
-        logger.info(f"Analysis completed successfully. Role: {role}, Skills: {len(skills)}")
+        logger.info(f"Analysis completed successfully. Role: {result['role_type']}, Skills: {len(result['skills'])}")
         return result
         
     except Exception as e:
@@ -0,0 +1,668 @@
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import cmp_to_key
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+from analysis_queries import (
+    ANALYSES_PAGE_SIZE, LIST_PROJECTION, SORT_OPTIONS, build_page, decode_cursor, page_filters,
+    parse_analysis_id, project_summary, serialize_detail, sort_values
+)
+from job_descriptions import decompress_description, description_document, description_hash, description_upserts
+from trend_rollups import (
+    DIMENSIONS, TREND_HOURLY_RETENTION_DAYS, TREND_TOP_VALUES, bucket_id, bucket_start, rollup_increments,
+    rollup_update, trend_response
+)
+from user_stats import STATS_TOP_SKILLS, stats_increments, stats_response
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "mongo" or "memory"; the in-memory backend keeps users and analyses in the process
+DATA_BACKEND = os.getenv("DATA_BACKEND", "mongo").lower()
+# Connections opened concurrently at startup so the first requests find a warm pool
+MONGODB_WARMUP_CONNECTIONS = int(os.getenv("MONGODB_WARMUP_CONNECTIONS", "4"))
+
+# The counters every stored analysis feeds: its user's statistics and its hourly and daily trend buckets
+COUNTERS = ["user_stats", "hour", "day"]
+# Analyses still marked uncounted after this long were left so by a failed write and are counted at startup
+UNCOUNTED_GRACE_SECONDS = 300
+COUNT_PROJECTION = {
+    "username": 1, "created_at": 1, "pending_counts": 1,
+    "analysis.role_type": 1, "analysis.experience_level": 1, "analysis.skills": 1
+}
+
+
+class ChangeMarker(NamedTuple):
+    """How many analyses a user has stored and when the latest one was stored."""
+    count: int
+    updated_at: Optional[datetime]
+
+
+def new_analysis_document(
+    username: str, job_description: str, analysis: Dict[str, Any], embedding: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """Build a new analysis document; the id is assigned up front so retried inserts are idempotent.
+
+    ``job_description`` travels with the document until it is stored; the
+    repositories keep the body in the description store, referenced by
+    ``description_hash``. ``embedding`` is the document vector of the
+    similar analyses search, see embedding_index.
+    """
+    created_at = datetime.now(timezone.utc)
+    document = {
+        "_id": ObjectId(),
+        "username": username,
+        "job_description": job_description,
+        "description_hash": description_hash(job_description),
+        "analysis": analysis,
+        # BSON dates, and so cursors, have millisecond precision
+        "created_at": created_at.replace(microsecond=created_at.microsecond // 1000 * 1000)
+    }
+    if embedding is not None:
+        document["embedding"] = embedding
+    return document
+
+
+def _without_body(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in document.items() if key != "job_description"}
+
+
+def _apply_increments(document: Dict[str, Any], increments: Dict[str, int]) -> None:
+    """Apply ``$inc`` fields, one level of nesting deep, to a document kept in memory."""
+    for field, amount in increments.items():
+        distribution, _, key = field.partition(".")
+        if key:
+            counts = document.setdefault(distribution, {})
+            counts[key] = counts.get(key, 0) + amount
+        else:
+            document[field] = document.get(field, 0) + amount
+
+
+def _merge_increments(documents: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Sum the statistics increments of new analyses per user."""
+    merged: Dict[str, Dict[str, int]] = {}
+    for document in documents:
+        increments = merged.setdefault(document["username"], {})
+        for field, amount in stats_increments(document["analysis"]).items():
+            increments[field] = increments.get(field, 0) + amount
+    return merged
+
+
+def _counter_updates(
+    counter: str, documents: List[Dict[str, Any]], retention_days: int, now: datetime
+) -> List[Tuple[UpdateOne, List[Any]]]:
+    """Return the upserts that count documents in one counter, each with the ids of the documents it counts."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for document in documents:
+        key = document["username"] if counter == "user_stats" else bucket_id(
+            counter, bucket_start(document["created_at"], counter)
+        )
+        groups.setdefault(key, []).append(document)
+
+    updates = []
+    for key, group in groups.items():
+        ids = [document["_id"] for document in group]
+        if counter == "user_stats":
+            update = {"$inc": _merge_increments(group)[key], "$set": {"updated_at": now}}
+            updates.append((UpdateOne({"_id": key}, update, upsert=True), ids))
+        else:
+            # Empty for hours already past the retention
+            for bucket in rollup_increments(group, retention_days, now, [counter]).values():
+                updates.append((UpdateOne({"_id": key}, rollup_update(bucket, retention_days), upsert=True), ids))
+    return updates
+
+
+class UserRepository(ABC):
+    """Storage of user accounts."""
+
+    @abstractmethod
+    async def get(self, username: str) -> Optional[Dict[str, Any]]:
+        """Return the user's document, including the password hash, or None."""
+
+    @abstractmethod
+    async def create(self, user: Dict[str, Any]) -> bool:
+        """Store a new user; return False when the username is taken."""
+
+
+class AnalysisRepository(ABC):
+    """Storage of analyses and the per-user statistics and trend buckets derived from them."""
+
+    async def start(self) -> None:
+        """Start any background work of the repository."""
+
+    async def stop(self) -> None:
+        """Finish background work, e.g. pending writes."""
+
+    async def add(
+        self, username: str, job_description: str, analysis: Dict[str, Any], embedding: Optional[bytes] = None
+    ) -> str:
+        """Store an analysis, count it in the user's statistics and return its id."""
+        document = new_analysis_document(username, job_description, analysis, embedding)
+        await self.insert_many([document])
+        return str(document["_id"])
+
+    @abstractmethod
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        """Store new analysis documents, count them in their users' statistics and return how many were new.
+
+        Documents whose id is already stored are skipped, so a failed call can
+        be retried with the same documents.
+        """
+
+    @abstractmethod
+    async def recent(self, username: str, limit: int) -> List[Dict[str, Any]]:
+        """Return the user's latest analyses, newest first, without their description bodies."""
+
+    @abstractmethod
+    async def page(
+        self,
+        username: str,
+        limit: int = ANALYSES_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "newest",
+        role_type: Optional[str] = None,
+        experience_level: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Return one page of the user's analyses; see analysis_queries.build_page."""
+
+    @abstractmethod
+    async def get(self, username: str, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Return one of the user's analyses with its description, or None."""
+
+    @abstractmethod
+    async def embedding(self, username: str, analysis_id: str) -> Optional[bytes]:
+        """Return the document vector stored with one of the user's analyses, or None."""
+
+    @abstractmethod
+    async def summaries(self, username: str, analysis_ids: List[str]) -> List[Dict[str, Any]]:
+        """Return the list items of those of the ids that are the user's analyses, in no particular order."""
+
+    @abstractmethod
+    async def stats(self, username: str) -> Dict[str, Any]:
+        """Return the user's statistics; see user_stats.stats_response."""
+
+    @abstractmethod
+    async def latest_change(self, username: str) -> ChangeMarker:
+        """Return a cheap marker that changes whenever the user stores an analysis."""
+
+    @abstractmethod
+    async def trend(
+        self, dimension: str, granularity: str, starts: List[datetime], top: int = TREND_TOP_VALUES
+    ) -> Dict[str, Any]:
+        """Return the trend of a dimension across all users over the buckets starting at ``starts``.
+
+        Reads only the buckets of the window; see trend_rollups.trend_response.
+        """
+
+
+class Repositories:
+    """The repositories of one data backend, with its connection lifecycle."""
+
+    def __init__(
+        self,
+        users: UserRepository,
+        analyses: AnalysisRepository,
+        persistent: bool,
+        client=None,
+        writer=None
+    ):
+        self.users = users
+        self.analyses = analyses
+        # Whether data survives a restart and MongoDB is available to the other components
+        self.persistent = persistent
+        self.client = client
+        # The write-behind buffer in front of the analyses, when enabled
+        self.writer = writer
+
+    async def warm_up(self, connections: int = MONGODB_WARMUP_CONNECTIONS) -> bool:
+        """Open pool connections before the first request; return whether the server answered."""
+        if self.client is None:
+            return True
+        try:
+            # Concurrent pings each check out their own pooled connection
+            await asyncio.gather(*(self.client.admin.command("ping") for _ in range(max(1, connections))))
+        except PyMongoError as e:
+            logger.error(f"MongoDB warm-up failed, requests will retry on demand: {e}")
+            return False
+        logger.info(f"MongoDB connection pool warmed up with {connections} connections")
+        return True
+
+    async def start(self) -> None:
+        """Start background work such as the write-behind flusher."""
+        await self.analyses.start()
+
+    async def close(self) -> None:
+        """Flush pending writes and close the client's connections."""
+        await self.analyses.stop()
+        if self.client is not None:
+            self.client.close()
+
+
+class MongoUserRepository(UserRepository):
+    """Users in the ``users`` collection, accessed through the asyncio driver."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, username: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"username": username}, {"_id": 0})
+
+    async def create(self, user: Dict[str, Any]) -> bool:
+        # The unique username index settles concurrent registrations
+        try:
+            await self.collection.insert_one(dict(user))
+        except DuplicateKeyError:
+            return False
+        return True
+
+
+class MongoAnalysisRepository(AnalysisRepository):
+    """Analyses in ``analyses``, bodies in ``job_descriptions``, counters in ``user_stats`` and ``trend_rollups``.
+
+    Counters cannot be updated in the same write as the analyses, so every
+    analysis is stored with the ``pending_counts`` it has not fed yet and a
+    counter is pulled from that list once its write succeeded. A retried
+    batch counts whatever is still pending of the analyses an earlier attempt
+    stored, and analyses left pending by a process that gave up are counted
+    at the next start.
+    """
+
+    def __init__(
+        self,
+        collection,
+        stats_collection,
+        descriptions_collection,
+        rollups_collection,
+        top_skills: int = STATS_TOP_SKILLS,
+        retention_days: int = TREND_HOURLY_RETENTION_DAYS
+    ):
+        self.collection = collection
+        self.stats_collection = stats_collection
+        self.descriptions_collection = descriptions_collection
+        self.rollups_collection = rollups_collection
+        self.counter_collections = {
+            "user_stats": stats_collection, "hour": rollups_collection, "day": rollups_collection
+        }
+        self.top_skills = top_skills
+        self.retention_days = retention_days
+
+    async def start(self) -> None:
+        try:
+            counted = await self.count_uncounted()
+        except PyMongoError as e:
+            logger.error(f"Counting analyses left uncounted failed, retrying at the next start: {e}")
+            return
+        if counted:
+            logger.warning(f"Counted {counted} analyses a failed write had left out of the statistics")
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        if not documents:
+            return 0
+        # Bodies first, so a stored analysis never references a missing description
+        await self.descriptions_collection.bulk_write(
+            description_upserts(document["job_description"] for document in documents), ordered=False
+        )
+        try:
+            await self.collection.insert_many(
+                [{**_without_body(document), "pending_counts": list(COUNTERS)} for document in documents],
+                ordered=False
+            )
+            inserted = documents
+            duplicates = []
+            error = None
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed = {write_error["index"] for write_error in write_errors}
+            inserted = [document for index, document in enumerate(documents) if index not in failed]
+            duplicates = [
+                documents[write_error["index"]] for write_error in write_errors if write_error.get("code") == 11000
+            ]
+            error = e if len(duplicates) < len(write_errors) else None
+
+        counting = [{**document, "pending_counts": list(COUNTERS)} for document in inserted]
+        if duplicates:
+            # Stored by an earlier attempt, which may have failed before counting them
+            pending = {
+                document["_id"]: document["pending_counts"]
+                async for document in self.collection.find(
+                    {"_id": {"$in": [document["_id"] for document in duplicates]}, "pending_counts": {"$exists": True}},
+                    {"pending_counts": 1}
+                )
+            }
+            counting += [
+                {**document, "pending_counts": pending[document["_id"]]}
+                for document in duplicates if document["_id"] in pending
+            ]
+
+        counted, count_error = await self._count(counting)
+        await self._mark_counted(counting, counted)
+        if error is not None or count_error is not None:
+            raise error or count_error
+        return len(inserted)
+
+    async def count_uncounted(self, grace_seconds: float = UNCOUNTED_GRACE_SECONDS, batch_size: int = 500) -> int:
+        """Count the analyses a failed write left out of some counters and return how many were counted.
+
+        Each analysis is claimed by clearing its ``pending_counts`` atomically,
+        so concurrent API processes never count it twice; counters whose write
+        fails are put back for the next attempt. Recent analyses are left to
+        the process storing them.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+        total = 0
+        while True:
+            candidates = await self.collection.find(
+                {"pending_counts": {"$exists": True}, "created_at": {"$lt": cutoff}}, {"_id": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            claimed = []
+            for candidate in candidates:
+                document = await self.collection.find_one_and_update(
+                    {"_id": candidate["_id"], "pending_counts": {"$exists": True}},
+                    {"$unset": {"pending_counts": ""}},
+                    projection=COUNT_PROJECTION,
+                    return_document=ReturnDocument.BEFORE
+                )
+                if document is not None:
+                    document.setdefault("analysis", {})
+                    claimed.append(document)
+
+            counted, error = await self._count(claimed)
+            for counter in COUNTERS:
+                done = set(counted.get(counter, []))
+                retry = [document["_id"] for document in claimed
+                         if counter in document["pending_counts"] and document["_id"] not in done]
+                if retry:
+                    await self.collection.update_many(
+                        {"_id": {"$in": retry}}, {"$addToSet": {"pending_counts": counter}}
+                    )
+            if error is not None:
+                raise error
+            total += len(claimed)
+            if len(candidates) < batch_size:
+                return total
+
+    async def _count(self, documents: List[Dict[str, Any]]) -> Tuple[Dict[str, List[Any]], Optional[Exception]]:
+        """Apply the pending counters of documents; return the ids counted per counter and the first write error."""
+        now = datetime.now(timezone.utc)
+        counted: Dict[str, List[Any]] = {}
+        error: Optional[Exception] = None
+        for counter in COUNTERS:
+            pending = [document for document in documents if counter in document["pending_counts"]]
+            if not pending:
+                continue
+            updates = _counter_updates(counter, pending, self.retention_days, now)
+            failed = set()
+            try:
+                if updates:
+                    await self.counter_collections[counter].bulk_write([update for update, _ in updates], ordered=False)
+            except BulkWriteError as e:
+                failed = {write_error["index"] for write_error in e.details.get("writeErrors", [])}
+                error = error or e
+            except PyMongoError as e:
+                # The outcome is unknown; counting again later may count twice, but never loses an analysis
+                failed = set(range(len(updates)))
+                error = error or e
+            uncounted = {analysis_id for index in failed for analysis_id in updates[index][1]}
+            counted[counter] = [document["_id"] for document in pending if document["_id"] not in uncounted]
+        return counted, error
+
+    async def _mark_counted(self, documents: List[Dict[str, Any]], counted: Dict[str, List[Any]]) -> None:
+        """Drop the counters that were applied from the stored ``pending_counts``."""
+        done = {counter: set(ids) for counter, ids in counted.items()}
+        complete = [
+            document["_id"] for document in documents
+            if all(document["_id"] in done.get(counter, ()) for counter in document["pending_counts"])
+        ]
+        if complete:
+            await self.collection.update_many({"_id": {"$in": complete}}, {"$unset": {"pending_counts": ""}})
+        complete_ids = set(complete)
+        for counter, ids in done.items():
+            partial = [analysis_id for analysis_id in ids if analysis_id not in complete_ids]
+            if partial:
+                await self.collection.update_many({"_id": {"$in": partial}}, {"$pull": {"pending_counts": counter}})
+
+    async def recent(self, username: str, limit: int) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({"username": username}, {"job_description": 0, "embedding": 0}).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def page(
+        self,
+        username: str,
+        limit: int = ANALYSES_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "newest",
+        role_type: Optional[str] = None,
+        experience_level: Optional[str] = None
+    ) -> Dict[str, Any]:
+        query, page_query = page_filters(username, sort, cursor, role_type, experience_level)
+        documents = await self.collection.find(page_query, LIST_PROJECTION).sort(
+            SORT_OPTIONS[sort]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        total_count = None if cursor else await self.collection.count_documents(query)
+        return build_page(documents, limit, sort, total_count)
+
+    async def get(self, username: str, analysis_id: str) -> Optional[Dict[str, Any]]:
+        object_id = parse_analysis_id(analysis_id)
+        if object_id is None:
+            return None
+        document = await self.collection.find_one({"_id": object_id, "username": username})
+        if document is None:
+            return None
+        if "job_description" in document:
+            return serialize_detail(document)
+
+        description = await self.descriptions_collection.find_one({"_id": document.get("description_hash")})
+        return serialize_detail(document, decompress_description(description) if description else None)
+
+    async def embedding(self, username: str, analysis_id: str) -> Optional[bytes]:
+        object_id = parse_analysis_id(analysis_id)
+        if object_id is None:
+            return None
+        document = await self.collection.find_one({"_id": object_id, "username": username}, {"embedding": 1})
+        return document.get("embedding") if document else None
+
+    async def summaries(self, username: str, analysis_ids: List[str]) -> List[Dict[str, Any]]:
+        object_ids = [object_id for object_id in map(parse_analysis_id, analysis_ids) if object_id is not None]
+        if not object_ids:
+            return []
+        return await self.collection.find(
+            {"_id": {"$in": object_ids}, "username": username}, LIST_PROJECTION
+        ).to_list(length=len(object_ids))
+
+    async def stats(self, username: str) -> Dict[str, Any]:
+        return stats_response(await self.stats_collection.find_one({"_id": username}), self.top_skills)
+
+    async def latest_change(self, username: str) -> ChangeMarker:
+        # The statistics document is bumped with every counted analysis, but it is missing for histories from
+        # before the counters and lags behind while a counter write is retried; the newest analysis, read from
+        # the paging index alone, covers both
+        stats, newest = await asyncio.gather(
+            self.stats_collection.find_one({"_id": username}, {"total_analyses": 1, "updated_at": 1}),
+            self.collection.find_one(
+                {"username": username}, {"_id": 1, "created_at": 1}, sort=[("created_at", -1), ("_id", -1)]
+            )
+        )
+        moments = [moment for moment in ((stats or {}).get("updated_at"), (newest or {}).get("created_at")) if moment]
+        updated_at = max(
+            (moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment for moment in moments),
+            default=None
+        )
+        return ChangeMarker((stats or {}).get("total_analyses", 0), updated_at)
+
+    async def trend(
+        self, dimension: str, granularity: str, starts: List[datetime], top: int = TREND_TOP_VALUES
+    ) -> Dict[str, Any]:
+        if not starts:
+            return trend_response(dimension, granularity, starts, [], top)
+        # Ids sort by time, so the window is one range of the _id index
+        documents = await self.rollups_collection.find(
+            {"_id": {"$gte": bucket_id(granularity, starts[0]), "$lte": bucket_id(granularity, starts[-1])}},
+            {"total_analyses": 1, DIMENSIONS[dimension]: 1}
+        ).to_list(length=len(starts))
+        return trend_response(dimension, granularity, starts, documents, top)
+
+
+class InMemoryUserRepository(UserRepository):
+    """Users kept in a dict; for benchmarks and tests without a MongoDB server."""
+
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, username: str) -> Optional[Dict[str, Any]]:
+        user = self.users.get(username)
+        return dict(user) if user else None
+
+    async def create(self, user: Dict[str, Any]) -> bool:
+        if user["username"] in self.users:
+            return False
+        self.users[user["username"]] = dict(user)
+        return True
+
+
+def _compare_keys(order, left: List[Any], right: List[Any]) -> int:
+    for (_, direction), a, b in zip(order, left, right):
+        # Missing values sort first, as null does in MongoDB
+        a, b = (a is not None, a), (b is not None, b)
+        if a != b:
+            return direction if a > b else -direction
+    return 0
+
+
+class InMemoryAnalysisRepository(AnalysisRepository):
+    """Analyses and statistics kept in process memory, with the same paging and statistics as MongoDB.
+
+    Methods never await while touching the data, so they are atomic on the event loop.
+    """
+
+    def __init__(self, top_skills: int = STATS_TOP_SKILLS, retention_days: int = TREND_HOURLY_RETENTION_DAYS):
+        self.analyses: Dict[str, List[Dict[str, Any]]] = {}
+        self.user_stats: Dict[str, Dict[str, Any]] = {}
+        self.rollups: Dict[str, Dict[str, Any]] = {}
+        self.top_skills = top_skills
+        self.retention_days = retention_days
+        self.descriptions: Dict[str, Dict[str, Any]] = {}
+        self._ids = set()
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> int:
+        inserted = [document for document in documents if document["_id"] not in self._ids]
+        for document in inserted:
+            self._ids.add(document["_id"])
+            self.descriptions.setdefault(document["description_hash"], description_document(document["job_description"]))
+            self.analyses.setdefault(document["username"], []).append(_without_body(document))
+
+        for username, increments in _merge_increments(inserted).items():
+            stats = self.user_stats.setdefault(username, {})
+            stats["updated_at"] = datetime.now(timezone.utc)
+            _apply_increments(stats, increments)
+
+        for key, bucket in rollup_increments(inserted, self.retention_days).items():
+            if key not in self.rollups and bucket["granularity"] == "hour":
+                self._expire_rollups()
+            _apply_increments(self.rollups.setdefault(key, {"_id": key}), bucket["increments"])
+        return len(inserted)
+
+    async def recent(self, username: str, limit: int) -> List[Dict[str, Any]]:
+        documents = sorted(self.analyses.get(username, []), key=lambda d: (d["created_at"], d["_id"]), reverse=True)
+        return documents[:limit]
+
+    async def page(
+        self,
+        username: str,
+        limit: int = ANALYSES_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "newest",
+        role_type: Optional[str] = None,
+        experience_level: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # Validates the sort order and cursor exactly like the MongoDB backend
+        page_filters(username, sort, cursor, role_type, experience_level)
+        order = SORT_OPTIONS[sort]
+
+        documents = [
+            document for document in self.analyses.get(username, [])
+            if (not role_type or document["analysis"].get("role_type") == role_type)
+            and (not experience_level or document["analysis"].get("experience_level") == experience_level)
+        ]
+        total_count = None if cursor else len(documents)
+        if cursor:
+            after = decode_cursor(cursor, sort)
+            documents = [d for d in documents if _compare_keys(order, sort_values(sort, d), after) > 0]
+
+        documents.sort(key=cmp_to_key(lambda a, b: _compare_keys(order, sort_values(sort, a), sort_values(sort, b))))
+        return build_page([project_summary(d) for d in documents[:limit + 1]], limit, sort, total_count)
+
+    async def get(self, username: str, analysis_id: str) -> Optional[Dict[str, Any]]:
+        object_id = parse_analysis_id(analysis_id)
+        for document in self.analyses.get(username, []):
+            if document["_id"] == object_id:
+                return serialize_detail(document, decompress_description(self.descriptions[document["description_hash"]]))
+        return None
+
+    async def embedding(self, username: str, analysis_id: str) -> Optional[bytes]:
+        object_id = parse_analysis_id(analysis_id)
+        for document in self.analyses.get(username, []):
+            if document["_id"] == object_id:
+                return document.get("embedding")
+        return None
+
+    async def summaries(self, username: str, analysis_ids: List[str]) -> List[Dict[str, Any]]:
+        object_ids = {parse_analysis_id(analysis_id) for analysis_id in analysis_ids}
+        return [
+            project_summary(document) for document in self.analyses.get(username, []) if document["_id"] in object_ids
+        ]
+
+    async def stats(self, username: str) -> Dict[str, Any]:
+        return stats_response(self.user_stats.get(username), self.top_skills)
+
+    async def latest_change(self, username: str) -> ChangeMarker:
+        stats = self.user_stats.get(username, {})
+        return ChangeMarker(stats.get("total_analyses", 0), stats.get("updated_at"))
+
+    async def trend(
+        self, dimension: str, granularity: str, starts: List[datetime], top: int = TREND_TOP_VALUES
+    ) -> Dict[str, Any]:
+        keys = [bucket_id(granularity, start) for start in starts]
+        documents = [self.rollups[key] for key in keys if key in self.rollups]
+        return trend_response(dimension, granularity, starts, documents, top)
+
+    def _expire_rollups(self) -> None:
+        # What MongoDB's TTL index does for the hourly buckets, run whenever a new hour starts
+        cutoff = bucket_id("hour", datetime.now(timezone.utc) - timedelta(days=self.retention_days))
+        for key in [key for key in self.rollups if key.startswith("hour:") and key < cutoff]:
+            del self.rollups[key]
+
+
+def create_repositories(backend: str = DATA_BACKEND) -> Repositories:
+    """Create the repositories for the configured data backend."""
+    from analysis_writer import ANALYSIS_WRITE_BEHIND, WriteBehindAnalysisRepository
+
+    if backend == "memory":
+        logger.warning("Using the in-memory data backend; users and analyses are lost on restart")
+        users, analyses, client = InMemoryUserRepository(), InMemoryAnalysisRepository(), None
+    elif backend == "mongo":
+        from database import MONGODB_DATABASE, get_async_mongodb_client
+
+        client = get_async_mongodb_client()
+        db = client[MONGODB_DATABASE]
+        users = MongoUserRepository(db.users)
+        analyses = MongoAnalysisRepository(db.analyses, db.user_stats, db.job_descriptions, db.trend_rollups)
+    else:
+        raise ValueError(f"Unknown DATA_BACKEND: {backend}")
+
+    writer = WriteBehindAnalysisRepository(analyses) if ANALYSIS_WRITE_BEHIND else None
+    return Repositories(
+        users,
+        writer or analyses,
+        persistent=client is not None,
+        client=client,
+        writer=writer
+    )
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+# Responses are per user and must be revalidated, but may be kept by the browser
+CACHE_CONTROL = "private, no-cache"
+VARY = "Accept-Encoding, Authorization"
+
+
+def entity_tag(*parts: Any) -> str:
+    """Build a weak ETag from the values a response depends on.
+
+    The tag is weak because the same JSON is served with different content
+    encodings.
+    """
+    digest = hashlib.sha1("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _validator_headers(etag: Optional[str], last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Return a 304 response when the client's cached copy is still current, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = etag is not None and _etag_matches(if_none_match, etag)
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            return None
+        # HTTP dates have whole seconds
+        fresh = last_modified.replace(microsecond=0) <= since
+    else:
+        fresh = False
+    return Response(status_code=304, headers=_validator_headers(etag, last_modified)) if fresh else None
+
+
+def _choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def json_response(
+    request: Request,
+    content: Any,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+    status_code: int = 200
+) -> Response:
+    """Serialize content with orjson and compress it when large enough and the client accepts it."""
+    body = orjson.dumps(content, default=str)
+    headers = _validator_headers(etag, last_modified)
+
+    encoding = _choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding and len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+        if encoding == "br":
+            body = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
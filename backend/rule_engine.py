@@ -0,0 +1,187 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from keyword_index import implied_prefixes, keyword_pattern
+
+# Every rule below is matched without nested or unbounded backtracking: keywords
+# go through one trie-shaped regex, numeric rules use possessive quantifiers,
+# and phrases spanning several words are assembled from match positions, so
+# the work grows linearly with the input even when it has no punctuation.
+
+TITLE_WORDS = ['developer', 'engineer', 'scientist', 'manager', 'designer', 'analyst']
+
+# Phrases that introduce a role ("seeking a ...") and phrases that follow one ("... who")
+ROLE_LEADS = {
+    "seeking": re.compile(r'(?:seeking|looking for|hiring)\s++(?:(?:a|an)\s++)?', re.IGNORECASE),
+    "join_as": re.compile(r'(?:join us as|position as|role as)\s++(?:(?:a|an)\s++)?', re.IGNORECASE),
+    "we_are": re.compile(r'(?:we are|we\'re)\s++', re.IGNORECASE),
+}
+# Order in which the role rules are tried; "trailer" is the title-then-"who" rule
+ROLE_RULE_ORDER = ["seeking", "join_as", "trailer", "we_are"]
+ROLE_TRAILER = re.compile(
+    r'(' + '|'.join(TITLE_WORDS) + r')\s++(?:who|responsible|position|role)',
+    re.IGNORECASE
+)
+TITLE_WORD = re.compile('|'.join(TITLE_WORDS), re.IGNORECASE)
+# Role phrases are runs of word characters, whitespace, '/' and '-'
+PHRASE_BREAK = re.compile(r'[^\w\s/-]')
+
+# "5+ years", "3 yrs", "3 to 5 years"; the lookbehind starts each attempt at the first digit
+YEARS = re.compile(
+    r'(?<!\d)(\d++)(?:\+?\s*+(?:years?|yrs?)|\s*+to\s*+(\d++)\s*+years?)',
+    re.IGNORECASE
+)
+YEARS_RULE = r'(?<!\d)\d++\+?\s*+years?'
+
+
+class RuleHit(NamedTuple):
+    start: int
+    sentence: int
+
+
+class SentenceMatches:
+    """First occurrence of each rule in a text, located within its period-terminated sentence."""
+
+    def __init__(self, text: str, periods: List[int], first_hits: Dict[str, RuleHit]):
+        self.text = text
+        self.periods = periods
+        self.first_hits = first_hits
+
+    def sentence(self, rule: str) -> Optional[str]:
+        """Return the first sentence containing the rule, including its period."""
+        hit = self.first_hits.get(rule)
+        if hit is None:
+            return None
+        start = self.periods[hit.sentence - 1] + 1 if hit.sentence else 0
+        return self.text[start:self.periods[hit.sentence] + 1]
+
+    def clause(self, rule: str) -> Optional[str]:
+        """Return the text from the rule's first occurrence to the end of its sentence."""
+        hit = self.first_hits.get(rule)
+        if hit is None:
+            return None
+        return self.text[hit.start:self.periods[hit.sentence] + 1]
+
+
+class SentenceRules:
+    """Keyword and regex rules matched against period-terminated sentences in one pass.
+
+    Equivalent to running ``re.findall(r'[^.]*<rule>[^.]*\\.', text)`` per rule
+    and taking the first match, without the quadratic backtracking those
+    patterns show on long runs of text without periods.
+    """
+
+    def __init__(self, keywords: Iterable[str] = (), patterns: Optional[Dict[str, str]] = None):
+        keywords = {keyword.lower() for keyword in keywords}
+        self.patterns = dict(patterns or {})
+        self._groups = {f"rule{position}": rule for position, rule in enumerate(self.patterns)}
+        # Rules are tried in order at each position, so keyword and regex rules
+        # should not be able to start at the same character
+        alternatives = [f"(?P<keyword>{keyword_pattern(keywords, whole_words=False)})"]
+        alternatives += [f"(?P<{group}>{self.patterns[rule]})" for group, rule in self._groups.items()]
+        self._pattern = re.compile('(?=' + '|'.join(alternatives) + ')', re.IGNORECASE)
+        self._implied = implied_prefixes(keywords, whole_words=False)
+
+    def match(self, text: str) -> SentenceMatches:
+        """Find the first terminated sentence for every rule with a single scan."""
+        periods = [match.start() for match in re.finditer(r'\.', text)]
+        last_period = periods[-1] if periods else -1
+        first_hits: Dict[str, RuleHit] = {}
+
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            # Sentences after the last period are never terminated
+            if start > last_period:
+                break
+            if match.lastgroup == "keyword":
+                keyword = match.group("keyword").lower()
+                rules = [keyword, *self._implied.get(keyword, ())]
+            else:
+                rules = [self._groups[match.lastgroup]]
+
+            new_rules = [rule for rule in rules if rule not in first_hits]
+            if new_rules:
+                hit = RuleHit(start, bisect_left(periods, start))
+                for rule in new_rules:
+                    first_hits[rule] = hit
+
+        return SentenceMatches(text, periods, first_hits)
+
+
+class KeywordRules:
+    """Case-insensitive substring rules answered from a single scan of the text."""
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = {keyword.lower() for keyword in keywords}
+        self._pattern = re.compile('(?=(' + keyword_pattern(keywords, whole_words=False) + '))', re.IGNORECASE)
+        self._implied = implied_prefixes(keywords, whole_words=False)
+
+    def found(self, text: str) -> set:
+        """Return every keyword occurring anywhere in the text."""
+        found = set()
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1).lower()
+            found.add(keyword)
+            found.update(self._implied.get(keyword, ()))
+        return found
+
+
+def _phrase_breaks(text: str) -> List[int]:
+    return [match.start() for match in PHRASE_BREAK.finditer(text)]
+
+
+def _phrase_after_lead(
+    lead: "re.Pattern",
+    text: str,
+    titles: List["re.Match"],
+    breaks: List[int]
+) -> Optional[str]:
+    title_starts = [title.start() for title in titles]
+    for match in lead.finditer(text):
+        phrase_start = match.end()
+        position = bisect_left(title_starts, phrase_start)
+        if position == len(titles):
+            return None
+        # The phrase may not cross punctuation before reaching the title
+        next_break = bisect_left(breaks, phrase_start)
+        if next_break == len(breaks) or breaks[next_break] >= titles[position].end():
+            return text[phrase_start:titles[position].end()]
+    return None
+
+
+def _phrase_before_trailer(text: str, breaks: List[int]) -> Optional[str]:
+    for match in ROLE_TRAILER.finditer(text):
+        title_start, title_end = match.span(1)
+        previous_break = bisect_left(breaks, title_start) - 1
+        phrase_start = breaks[previous_break] + 1 if previous_break >= 0 else 0
+        if title_start > phrase_start:
+            return text[phrase_start:title_end]
+    return None
+
+
+def find_role_phrase(text: str) -> Optional[str]:
+    """Return the first role phrase directly named in the text, trying the lead rules in order.
+
+    A role phrase is a run of words ending in a title word such as 'engineer',
+    introduced by a lead like 'seeking a' or followed by a trailer like 'who'.
+    """
+    titles = list(TITLE_WORD.finditer(text))
+    breaks = _phrase_breaks(text)
+
+    for rule in ROLE_RULE_ORDER:
+        if rule == "trailer":
+            phrase = _phrase_before_trailer(text, breaks)
+        else:
+            phrase = _phrase_after_lead(ROLE_LEADS[rule], text, titles, breaks)
+        if phrase:
+            return phrase
+    return None
+
+
+def years_mentioned(text: str) -> List[int]:
+    """Return every number of years of experience mentioned in the text."""
+    years = []
+    for match in YEARS.finditer(text):
+        years.extend(int(number) for number in match.groups() if number)
+    return years
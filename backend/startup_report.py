@@ -0,0 +1,62 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "120"))
+
+
+class StartupReport:
+    """Records import time, time to readiness and first-request latency of the API process."""
+
+    def __init__(self, budget_seconds: float = STARTUP_BUDGET_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.import_seconds: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.first_request_seconds: Optional[float] = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def imports_finished(self, import_started: float) -> None:
+        """Record how long importing the application modules took."""
+        self.import_seconds = round(time.perf_counter() - import_started, 3)
+        logger.info(f"Application imported in {self.import_seconds}s")
+
+    def app_started(self) -> None:
+        """Mark the start of the lifespan; readiness is measured from here."""
+        self._started = time.perf_counter()
+
+    def mark_ready(self) -> None:
+        """Record the time from startup until the models could serve analyses."""
+        self.ready_seconds = round(time.perf_counter() - self._started, 3)
+        if self.ready_seconds > self.budget_seconds:
+            logger.warning(
+                f"Startup took {self.ready_seconds}s, over the {self.budget_seconds}s budget"
+            )
+        else:
+            logger.info(f"Ready to serve analyses after {self.ready_seconds}s")
+
+    def budget_exceeded(self) -> None:
+        """Log that the models are still loading when the budget ran out."""
+        logger.error(f"Models still loading after the {self.budget_seconds}s startup budget")
+
+    def record_request(self, seconds: float) -> None:
+        """Record the latency of the first analysis request; later calls are ignored."""
+        with self._lock:
+            if self.first_request_seconds is None:
+                self.first_request_seconds = round(seconds, 3)
+                logger.info(f"First analysis request took {self.first_request_seconds}s")
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the report for the readiness and stats endpoints."""
+        return {
+            "import_seconds": self.import_seconds,
+            "ready_seconds": self.ready_seconds,
+            "first_request_seconds": self.first_request_seconds,
+            "budget_seconds": self.budget_seconds,
+            "within_budget": self.ready_seconds is not None and self.ready_seconds <= self.budget_seconds
+        }
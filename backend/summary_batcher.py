@@ -0,0 +1,139 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, Dict, List, Tuple
+
+from analysis_executor import ANALYSIS_TIMEOUT_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_BATCHING = os.getenv("SUMMARY_BATCHING", "false").lower() == "true"
+SUMMARY_MAX_BATCH_SIZE = int(os.getenv("SUMMARY_MAX_BATCH_SIZE", "8"))
+SUMMARY_MAX_WAIT_MS = float(os.getenv("SUMMARY_MAX_WAIT_MS", "25"))
+SUMMARY_BATCH_HISTOGRAM_BUCKETS = [
+    int(bucket) for bucket in os.getenv("SUMMARY_BATCH_HISTOGRAM_BUCKETS", "1,2,4,8,16,32").split(",")
+    if bucket.strip()
+]
+
+
+class SummaryBatcher:
+    """Micro-batches concurrent summary prompts into shared generate calls."""
+
+    def __init__(
+        self,
+        generate_batch: Callable[[List[str]], List[str]],
+        max_batch_size: int = SUMMARY_MAX_BATCH_SIZE,
+        max_wait_ms: float = SUMMARY_MAX_WAIT_MS,
+        histogram_buckets: List[int] = None,
+        timeout_seconds: float = ANALYSIS_TIMEOUT_SECONDS
+    ):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000
+        self.histogram_buckets = sorted(histogram_buckets or SUMMARY_BATCH_HISTOGRAM_BUCKETS)
+        # No summary is worth waiting for longer than the analysis it belongs to may take
+        self.timeout_seconds = timeout_seconds
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._histogram = [0] * (len(self.histogram_buckets) + 1)
+        self._counters = {"batches": 0, "prompts": 0, "failed_batches": 0, "timeouts": 0}
+
+    def submit(self, prompt: str) -> str:
+        """Queue a prompt for the next batch and wait for its generated text.
+
+        Raises TimeoutError when the text is not generated within ``timeout_seconds``.
+        """
+        self._ensure_running()
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except TimeoutError:
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise TimeoutError(f"Summary not generated within {self.timeout_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch counters and the batch-size histogram."""
+        with self._lock:
+            labels = [f"<={bucket}" for bucket in self.histogram_buckets]
+            labels.append(f">{self.histogram_buckets[-1]}" if self.histogram_buckets else "all")
+            batches = self._counters["batches"]
+            return {
+                **self._counters,
+                "mean_batch_size": round(self._counters["prompts"] / batches, 2) if batches else 0.0,
+                "pending": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "timeout_seconds": self.timeout_seconds,
+                "batch_size_histogram": dict(zip(labels, self._histogram))
+            }
+
+    def _ensure_running(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="summary-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            prompts = [prompt for prompt, _ in batch]
+
+            try:
+                outputs = list(self.generate_batch(prompts))
+            except Exception as e:
+                logger.error(f"Summary batch of {len(batch)} failed: {e}")
+                self._record(len(batch), failed=True)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            failed = len(outputs) < len(batch)
+            self._record(len(batch), failed=failed)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+            if failed:
+                # Nothing will ever resolve the prompts without an output
+                error = RuntimeError(f"Summary batch of {len(batch)} returned only {len(outputs)} outputs")
+                logger.error(str(error))
+                for _, future in batch[len(outputs):]:
+                    future.set_exception(error)
+
+    def _record(self, size: int, failed: bool = False) -> None:
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters["prompts"] += size
+            if failed:
+                self._counters["failed_batches"] += 1
+
+            for index, bucket in enumerate(self.histogram_buckets):
+                if size <= bucket:
+                    self._histogram[index] += 1
+                    break
+            else:
+                self._histogram[-1] += 1
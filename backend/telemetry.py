@@ -0,0 +1,238 @@
+"""Process-local metrics in the Prometheus text format, timing spans and sampled debug logging.
+
+Analysis worker processes record into their own registry; the analysis
+executor ships each worker's observations back with the result (see
+``worker_delta``) and merges them into the API process, which serves them
+on ``/metrics``.
+"""
+import bisect
+import logging
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_LATENCY_BUCKETS = [
+    float(bucket) for bucket in
+    os.getenv("METRICS_LATENCY_BUCKETS", "0.001,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(",")
+]
+METRICS_PREFIX = "job_analyzer_"
+DEBUG_LOG_SAMPLE_RATE = float(os.getenv("DEBUG_LOG_SAMPLE_RATE", "0.01"))
+
+INPUT_CHARS_BUCKETS = [100, 500, 1000, 2500, 5000, 12000, 50000, 200000]
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric:
+    """A named metric with one series per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = METRICS_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.exposed_name = self.name
+        self._lock = threading.Lock()
+        self._series: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def drain(self) -> Dict[LabelValues, Any]:
+        """Return the recorded series and start again from zero."""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def render(self) -> List[str]:
+        """Return the metric in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.exposed_name} {self.documentation}", f"# TYPE {self.exposed_name} {self.kind}"]
+        with self._lock:
+            series = {key: self._copy(value) for key, value in self._series.items()}
+        for values, value in sorted(series.items()):
+            lines.extend(self._render_series(values, value))
+        return lines
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.exposed_name = self.name + "_total"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def merge(self, series: Dict[LabelValues, float]) -> None:
+        with self._lock:
+            for key, value in series.items():
+                self._series[key] = self._series.get(key, 0) + value
+
+    def _copy(self, value: float) -> float:
+        return value
+
+    def _render_series(self, values: LabelValues, value: float) -> List[str]:
+        return [f"{self.exposed_name}{self._label_text(values)} {_number(value)}"]
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket, with their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets or METRICS_LATENCY_BUCKETS)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def merge(self, series: Dict[LabelValues, Tuple[List[int], float]]) -> None:
+        with self._lock:
+            for key, (counts, total) in series.items():
+                current, current_total = self._series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+                self._series[key] = ([a + b for a, b in zip(current, counts)], current_total + total)
+
+    def _copy(self, value: Tuple[List[int], float]) -> Tuple[List[int], float]:
+        return list(value[0]), value[1]
+
+    def _render_series(self, values: LabelValues, value: Tuple[List[int], float]) -> List[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bucket, count in zip(self.buckets + [math.inf], counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._label_text(values, ('le', _number(bucket)))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Registry:
+    """The metrics of one process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = None
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def drain(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Return every metric's series recorded since the last drain, and reset them."""
+        return {name: series for name, metric in self._metrics.items() if (series := metric.drain())}
+
+    def merge(self, delta: Dict[str, Dict[LabelValues, Any]]) -> None:
+        """Add series drained from another process's registry."""
+        for name, series in delta.items():
+            if name in self._metrics:
+                self._metrics[name].merge(series)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ANALYSIS_STAGE_SECONDS = REGISTRY.histogram(
+    "analysis_stage_seconds", "Time spent in each stage of an analysis.", ["stage"]
+)
+ANALYSIS_INPUT_CHARS = REGISTRY.histogram(
+    "analysis_input_chars", "Length of analyzed job descriptions in characters.", ["profile"], INPUT_CHARS_BUCKETS
+)
+ANALYSIS_CHUNKS = REGISTRY.counter(
+    "analysis_chunks", "Windows analyzed; long descriptions are analyzed in several.", ["profile"]
+)
+SUMMARY_FALLBACKS = REGISTRY.counter(
+    "summary_fallbacks", "Model summaries replaced by an extractive summary.", ["reason"]
+)
+MONGO_COMMAND_SECONDS = REGISTRY.histogram(
+    "mongo_command_seconds", "Duration of MongoDB commands.", ["command", "outcome"]
+)
+
+
+@contextmanager
+def span(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Time the enclosed block into a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+
+class StageTimer:
+    """Accumulates time per analysis stage across the windows of one analysis."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def observe(self) -> None:
+        """Record one observation per stage that ran."""
+        for name, seconds in self.seconds.items():
+            ANALYSIS_STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def worker_delta() -> Optional[Dict[str, Dict[LabelValues, Any]]]:
+    """In a worker process, drain its metrics to return to the API process; None in the API process."""
+    if multiprocessing.parent_process() is None:
+        return None
+    return REGISTRY.drain()
+
+
+def sampled_debug(logger: logging.Logger, message: str, *args: Any) -> None:
+    """Log a debug message for a sample of calls; the arguments are only formatted if it is emitted."""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < DEBUG_LOG_SAMPLE_RATE:
+        logger.debug(message, *args)
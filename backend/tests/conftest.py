@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules import each other by their flat module names
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,103 @@
+"""In-memory stand-ins for the asyncio MongoDB collections the repositories use."""
+import copy
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def limit(self, count):
+        return FakeCursor(self.documents[:count])
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$exists" in condition and (field in document) != condition["$exists"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """Just enough of an asyncio MongoDB collection for the counting paths."""
+
+    def __init__(self):
+        self.documents = {}
+        self.fail_bulk_writes = 0
+
+    async def insert_many(self, documents, ordered=False):
+        errors = []
+        for index, document in enumerate(documents):
+            if document["_id"] in self.documents:
+                errors.append({"index": index, "code": 11000})
+            else:
+                self.documents[document["_id"]] = copy.deepcopy(document)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def bulk_write(self, operations, ordered=False):
+        if self.fail_bulk_writes:
+            self.fail_bulk_writes -= 1
+            raise AutoReconnect("connection reset")
+        for operation in operations:
+            key = operation._filter["_id"]
+            document = self.documents.setdefault(key, {"_id": key})
+            document.update(operation._doc.get("$set", {}))
+            for field, amount in operation._doc.get("$inc", {}).items():
+                target = document
+                *parents, leaf = field.split(".")
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = target.get(leaf, 0) + amount
+
+    def find(self, query, projection=None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents.values() if matches(d, query)])
+
+    async def find_one(self, query, projection=None, sort=None):
+        found = [d for d in self.documents.values() if matches(d, query)]
+        for field, direction in reversed(sort or []):
+            found.sort(key=lambda document: document[field], reverse=direction < 0)
+        return copy.deepcopy(found[0]) if found else None
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        found = [d for d in self.documents.values() if matches(d, query)]
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        self._update(found[0], update)
+        return before
+
+    async def update_many(self, query, update):
+        for document in self.documents.values():
+            if matches(document, query):
+                self._update(document, update)
+
+    @staticmethod
+    def _update(document, update):
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+        for field, value in update.get("$pull", {}).items():
+            if field in document:
+                document[field] = [item for item in document[field] if item != value]
+        for field, value in update.get("$addToSet", {}).items():
+            items = document.setdefault(field, [])
+            if value not in items:
+                items.append(value)
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from analysis_executor import AnalysisExecutor
+
+
+class FakePool:
+    """An executor whose tasks either all fail as after a worker died, or are held until released."""
+
+    def __init__(self, broken):
+        self.broken = broken
+        self.pending = []
+        self.shut_down = False
+
+    def submit(self, function, *args):
+        future = Future()
+        if function.__name__ == "_warm_up_worker" and not self.broken:
+            future.set_result({"pid": id(self), "load_seconds": {}})
+        else:
+            self.pending.append(future)
+        return future
+
+    def break_workers(self):
+        for future in self.pending:
+            future.set_exception(BrokenProcessPool("A worker died"))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = AnalysisExecutor(mode="process", workers=2, queue_size=8, timeout_seconds=5)
+    executor.pools = []
+
+    def start():
+        if executor._pool is None:
+            # Only the first pool breaks
+            executor._pool = FakePool(broken=not executor.pools)
+            executor.pools.append(executor._pool)
+
+    monkeypatch.setattr(executor, "start", start)
+    return executor
+
+
+def test_a_broken_pool_is_replaced_once_however_many_analyses_fail(executor):
+    async def scenario():
+        analyses = [asyncio.ensure_future(executor.analyze("text", "default")) for _ in range(6)]
+        await asyncio.sleep(0)
+        executor.pools[0].break_workers()
+        return await asyncio.gather(*analyses, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, BrokenProcessPool) for result in results)
+    assert len(executor.pools) == 2
+    assert executor.pools[0].shut_down and not executor.pools[1].shut_down
+    assert executor._pool is executor.pools[1]
+    assert executor.stats()["pool_restarts"] == 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_readiness_follows_the_warm_up_of_the_replacement_pool(executor):
+    async def scenario():
+        await executor.warm_up()
+        assert executor.ready
+
+        analysis = asyncio.ensure_future(executor.analyze("text", "default"))
+        await asyncio.sleep(0)
+        executor.pools[0].break_workers()
+        with pytest.raises(BrokenProcessPool):
+            await analysis
+        assert not executor.ready
+
+        await executor._warm_up_task
+        assert executor.ready
+
+    executor.start()
+    # The first pool loads its models, then its workers die
+    executor.pools[0].broken = False
+    asyncio.run(scenario())
+    assert [report["pid"] for report in executor.worker_reports] == [id(executor.pools[1])]
@@ -0,0 +1,150 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+from functools import cmp_to_key
+
+import pytest
+from bson import ObjectId, json_util
+
+from analysis_queries import (
+    SORT_OPTIONS, InvalidCursor, build_page, decode_cursor, encode_cursor, keyset_filter, page_filters, sort_values
+)
+from repositories import InMemoryAnalysisRepository, _compare_keys, new_analysis_document
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def make_documents():
+    """Analyses with tied timestamps, tied roles and missing roles and levels."""
+    documents = []
+    roles = ["backend", None, "data", "backend", None, "frontend", "data", "backend"]
+    levels = ["senior", "junior", None, "mid", "senior", None, "junior", "mid"]
+    for index, (role, level) in enumerate(zip(roles, levels)):
+        analysis = {"skills": ["python"], "summary": f"posting {index}"}
+        if role:
+            analysis["role_type"] = role
+        if level:
+            analysis["experience_level"] = level
+        document = new_analysis_document("alice", f"posting {index}", analysis)
+        document["created_at"] = START + timedelta(minutes=index // 3)
+        documents.append(document)
+    return documents
+
+
+def field_value(document, field):
+    value = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def matches(document, condition):
+    """Evaluate the subset of the MongoDB query language keyset_filter produces."""
+    for key, expected in condition.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in expected):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in expected):
+                return False
+        else:
+            value = field_value(document, key)
+            if isinstance(expected, dict):
+                for operator, operand in expected.items():
+                    if operator == "$ne":
+                        ok = value != operand
+                    else:
+                        # Comparison operators never match null
+                        ok = value is not None and (value > operand if operator == "$gt" else value < operand)
+                    if not ok:
+                        return False
+            elif value != expected:
+                return False
+    return True
+
+
+def ordered(documents, sort):
+    order = SORT_OPTIONS[sort]
+    compare = cmp_to_key(lambda a, b: _compare_keys(order, sort_values(sort, a), sort_values(sort, b)))
+    return sorted(documents, key=compare)
+
+
+@pytest.mark.parametrize("sort", list(SORT_OPTIONS))
+def test_keyset_filter_selects_exactly_the_documents_after_the_cursor(sort):
+    documents = ordered(make_documents(), sort)
+    for position, document in enumerate(documents):
+        condition = keyset_filter(sort, decode_cursor(encode_cursor(sort, document), sort))
+        after = [other["_id"] for other in documents if matches(other, condition)]
+        assert after == [other["_id"] for other in documents[position + 1:]]
+
+
+@pytest.mark.parametrize("sort", list(SORT_OPTIONS))
+def test_in_memory_pages_visit_every_analysis_once_in_order(sort):
+    repository = InMemoryAnalysisRepository()
+    documents = make_documents()
+    asyncio.run(repository.insert_many(documents))
+
+    seen = []
+    cursor = None
+    while True:
+        page = asyncio.run(repository.page("alice", limit=3, cursor=cursor, sort=sort))
+        seen.extend(item["analysis_id"] for item in page["analyses"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [str(document["_id"]) for document in ordered(documents, sort)]
+
+
+def test_cursor_round_trips_values():
+    document = make_documents()[1]
+
+    values = decode_cursor(encode_cursor("role", document), "role")
+
+    assert values == [None, document["created_at"], document["_id"]]
+    assert values[1].tzinfo is not None
+
+
+def cursor_of(payload):
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize("sort, cursor", [
+    ("newest", "not base64!"),
+    ("newest", cursor_of("{broken json")),
+    ("newest", cursor_of("[1, 2, 3]")),
+    ("newest", cursor_of(json_util.dumps({"sort": "newest", "values": [1]}))),
+    # Right shape, wrong types: a string timestamp and a string id
+    ("newest", cursor_of(json_util.dumps({"sort": "newest", "values": ["2024-05-01", "abc"]}))),
+    # An operator smuggled in as the role value
+    ("role", cursor_of(json_util.dumps({"sort": "role", "values": [{"$gt": ""}, START, ObjectId()]})))
+])
+def test_tampered_cursors_are_rejected(sort, cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, sort)
+
+
+def test_cursor_of_another_sort_order_is_rejected():
+    cursor = encode_cursor("newest", make_documents()[0])
+
+    with pytest.raises(InvalidCursor, match="sort order"):
+        decode_cursor(cursor, "oldest")
+
+
+def test_page_filters_combine_user_filters_and_cursor():
+    document = make_documents()[0]
+    query, page_query = page_filters("alice", "newest", encode_cursor("newest", document), role_type="backend")
+
+    assert query == {"username": "alice", "analysis.role_type": "backend"}
+    assert page_query["$and"][0] == query
+
+
+def test_build_page_uses_the_extra_document_only_to_detect_more():
+    documents = ordered(make_documents(), "newest")
+
+    page = build_page(documents[:4], 3, "newest", total_count=8)
+    last = build_page(documents[:3], 3, "newest", total_count=None)
+
+    assert len(page["analyses"]) == 3
+    assert decode_cursor(page["next_cursor"], "newest") == sort_values("newest", documents[2])
+    assert last["next_cursor"] is None
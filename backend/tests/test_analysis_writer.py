@@ -0,0 +1,112 @@
+import asyncio
+from datetime import timedelta
+
+from analysis_writer import WriteBehindAnalysisRepository, read_dead_letter, write_dead_letter
+from repositories import InMemoryAnalysisRepository, new_analysis_document
+
+
+class FlakyRepository(InMemoryAnalysisRepository):
+    """An in-memory repository whose writes fail while ``down`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.down = True
+
+    async def insert_many(self, documents):
+        if self.down:
+            raise ConnectionError("database unreachable")
+        return await super().insert_many(documents)
+
+
+def analysis():
+    return {"role_type": "backend", "experience_level": "senior", "skills": ["python"]}
+
+
+def writer(repository, tmp_path):
+    return WriteBehindAnalysisRepository(
+        repository, batch_size=2, flush_ms=10, retries=1, retry_backoff_ms=1,
+        dead_letter_path=str(tmp_path / "dead_letter.jsonl")
+    )
+
+
+def test_a_failed_batch_stays_readable_and_is_stored_later(tmp_path):
+    async def scenario():
+        repository = FlakyRepository()
+        buffered = writer(repository, tmp_path)
+        await buffered.start()
+        analysis_id = await buffered.add("alice", "Python developer", analysis())
+        await asyncio.sleep(0.1)
+
+        assert buffered.buffer_stats()["failed_flushes"] >= 1
+        assert (await buffered.get("alice", analysis_id))["analysis_id"] == analysis_id
+
+        repository.down = False
+        await asyncio.sleep(0.1)
+        await buffered.stop()
+        return repository, analysis_id
+
+    repository, analysis_id = asyncio.run(scenario())
+
+    assert asyncio.run(repository.get("alice", analysis_id)) is not None
+    assert not (tmp_path / "dead_letter.jsonl").exists()
+
+
+def test_analyses_unstored_at_shutdown_go_to_the_dead_letter_file(tmp_path):
+    async def scenario():
+        buffered = writer(FlakyRepository(), tmp_path)
+        await buffered.start()
+        ids = [await buffered.add("alice", f"posting {index}", analysis(), b"\x00\x3c") for index in range(3)]
+        await buffered.stop()
+        return buffered, ids
+
+    buffered, ids = asyncio.run(scenario())
+    documents = list(read_dead_letter(buffered.dead_letter_path))
+
+    assert sorted(str(document["_id"]) for document in documents) == sorted(ids)
+    assert buffered.buffer_stats()["dead_lettered"] == 3
+    assert buffered.buffer_stats()["pending"] == 0
+
+
+def test_dead_letter_documents_round_trip(tmp_path):
+    document = new_analysis_document("alice", "Python developer", analysis(), b"\x01\x02")
+    path = str(tmp_path / "nested" / "dead_letter.jsonl")
+
+    write_dead_letter(path, [document])
+    restored = list(read_dead_letter(path))
+
+    assert restored == [document]
+    assert asyncio.run(InMemoryAnalysisRepository().insert_many(restored)) == 1
+
+
+def test_the_first_page_lists_buffered_analyses_first(tmp_path):
+    async def scenario():
+        repository = FlakyRepository()
+        repository.down = False
+        stored = [new_analysis_document("alice", f"stored {index}", analysis()) for index in range(3)]
+        for index, document in enumerate(stored):
+            document["created_at"] -= timedelta(hours=index + 1)
+        await repository.insert_many(stored)
+        repository.down = True
+
+        buffered = writer(repository, tmp_path)
+        await buffered.start()
+        ids = [await buffered.add("alice", f"buffered {index}", analysis()) for index in range(2)]
+        other_role = await buffered.add("alice", "data posting", {**analysis(), "role_type": "data"})
+
+        first = await buffered.page("alice", limit=3, role_type="backend")
+        second = await buffered.page("alice", limit=3, cursor=first["next_cursor"], role_type="backend")
+        crowded = await buffered.page("alice", limit=2)
+        rest = await buffered.page("alice", limit=2, cursor=crowded["next_cursor"])
+        await buffered.stop()
+        return stored, ids, other_role, first, second, crowded, rest
+
+    stored, ids, other_role, first, second, crowded, rest = asyncio.run(scenario())
+    stored_ids = [str(document["_id"]) for document in stored]
+
+    assert [item["analysis_id"] for item in first["analyses"]] == ids[::-1] + stored_ids[:1]
+    assert first["total_count"] == 5 and first["limit"] == 3
+    assert [item["analysis_id"] for item in second["analyses"]] == stored_ids[1:]
+    assert second["next_cursor"] is None
+    # More buffered analyses than fit on the page: the rest follow once they are stored
+    assert [item["analysis_id"] for item in crowded["analyses"]] == [other_role, ids[1]]
+    assert [item["analysis_id"] for item in rest["analyses"]] == stored_ids[:2]
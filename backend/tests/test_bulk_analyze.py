@@ -0,0 +1,94 @@
+import json
+from itertools import islice
+
+from bulk_analyze import Checkpoint, parse_record, read_records
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def test_malformed_jsonl_records_become_errors(tmp_path):
+    path = write_lines(tmp_path / "in.jsonl", [
+        json.dumps({"id": "a", "job_description": "Python developer"}),
+        "{not json",
+        json.dumps(["a", "list"]),
+        "",
+        json.dumps({"id": "d", "job_description": 42}),
+        json.dumps({"id": "e"})
+    ])
+
+    records = list(read_records(path, "job_description", "id"))
+
+    assert [record[0] for record in records] == ["a", 1, 2, "d", "e"]
+    assert records[0] == ("a", "Python developer", None)
+    assert "not valid JSON" in records[1][2]
+    assert "list" in records[2][2]
+    assert records[3][1] == "" and "int" in records[3][2]
+    # A missing text is left to validation, like an empty one
+    assert records[4] == ("e", "", None)
+
+
+def test_csv_records_default_to_row_number_ids(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("job_description\nData engineer\nML engineer\n", encoding="utf-8")
+
+    records = list(read_records(str(path), "job_description", "id"))
+
+    assert records == [(0, "Data engineer", None), (1, "ML engineer", None)]
+
+
+def test_parse_record_accepts_csv_rows():
+    assert parse_record({"id": "7", "text": "Go"}, 3, "text", "id") == ("7", "Go", None)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"))
+    checkpoint.save(256, 1024)
+
+    restored = Checkpoint(checkpoint.path)
+    restored.load()
+
+    assert (restored.processed, restored.output_bytes) == (256, 1024)
+    assert not (tmp_path / "out.checkpoint.tmp").exists()
+
+
+def test_missing_checkpoint_starts_from_scratch(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "missing.checkpoint"))
+    checkpoint.load()
+
+    assert (checkpoint.processed, checkpoint.output_bytes) == (0, 0)
+
+
+def test_resume_partway_through_a_chunk(tmp_path):
+    records_path = write_lines(tmp_path / "in.jsonl", [
+        json.dumps({"id": index, "job_description": f"posting {index}"}) for index in range(5)
+    ])
+    output = tmp_path / "out.jsonl"
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"))
+
+    # Two records made it into a checkpoint, the next chunk was cut off mid-write
+    committed = b'{"id": 0}\n{"id": 1}\n'
+    output.write_bytes(committed + b'{"id": 2}\n{"id": ')
+    checkpoint.save(2, len(committed))
+
+    resumed = Checkpoint(checkpoint.path)
+    resumed.load()
+    with resumed.open_output(str(output)) as out:
+        out.write(b'{"id": 2}\n')
+    pending = list(islice(read_records(records_path, "job_description", "id"), resumed.processed, None))
+
+    assert output.read_bytes() == committed + b'{"id": 2}\n'
+    assert [record[0] for record in pending] == [2, 3, 4]
+
+
+def test_resume_skips_past_a_malformed_record(tmp_path):
+    path = write_lines(tmp_path / "in.jsonl", [
+        json.dumps({"id": "a", "job_description": "x"}),
+        "{broken",
+        json.dumps({"id": "c", "job_description": "y"})
+    ])
+
+    # The malformed record was written as an error row and counted
+    assert [record[0] for record in islice(read_records(path, "job_description", "id"), 2, None)] == ["c"]
@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_index import EmbeddingIndex, encode_vector
+
+DIM = 8
+
+
+def vectors(count, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.normal(size=(count, DIM))
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float16)
+
+
+def ids(start, count):
+    return [f"{row:024x}" for row in range(start, start + count)]
+
+
+def fill(index, owners, seed=0, start=0):
+    """Append one random vector per entry of ``owners``; returns the vectors."""
+    rows = vectors(len(owners), seed)
+    index.add_many(ids(start, len(owners)), owners, rows)
+    return rows
+
+
+def expected(rows, owners, username, query, k):
+    """The exact top-k by brute force over every row of the user."""
+    scores = rows.astype(np.float32) @ query
+    mine = [row for row, owner in enumerate(owners) if owner == username]
+    best = sorted(mine, key=lambda row: -scores[row])[:k]
+    return [f"{row:024x}" for row in best]
+
+
+def found(index, query, username, k):
+    return [match.analysis_id for match in index.search(encode_vector(query), username, k)]
+
+
+@pytest.fixture(params=["memory", "files"])
+def index(request, tmp_path):
+    index = EmbeddingIndex(None if request.param == "memory" else str(tmp_path / "embeddings"))
+    yield index
+    index.close()
+
+
+def test_search_ranks_only_the_users_own_rows(index):
+    owners = [["alice", "bob", "carol"][row % 3] for row in range(300)]
+    rows = fill(index, owners)
+    query = rows[4].astype(np.float32)
+
+    for username in ["alice", "bob", "carol"]:
+        assert found(index, query, username, 5) == expected(rows, owners, username, query, 5)
+    assert found(index, query, "dave", 5) == []
+
+
+def test_rows_appended_after_the_grouping_are_found(index):
+    owners = ["alice", "bob"] * 50
+    rows = fill(index, owners)
+    query = rows[0].astype(np.float32)
+    found(index, query, "alice", 1)
+
+    # Fewer than OWNER_REGROUP_FRACTION new rows are scanned, more regroup the rows
+    for added in [3, 40]:
+        new_owners = ["alice"] * added
+        new_rows = fill(index, new_owners, seed=added, start=len(owners))
+        owners, rows = owners + new_owners, np.concatenate([rows, new_rows])
+        query = new_rows[-1].astype(np.float32)
+        assert found(index, query, "alice", 10) == expected(rows, owners, "alice", query, 10)
+
+
+def test_rows_another_process_appended_are_found(tmp_path):
+    path = str(tmp_path / "embeddings")
+    reader, writer = EmbeddingIndex(path), EmbeddingIndex(path)
+    rows = fill(writer, ["alice"] * 20)
+    found(reader, rows[0].astype(np.float32), "alice", 1)
+
+    new_rows = fill(writer, ["alice"] * 2, seed=1, start=20)
+    query = new_rows[1].astype(np.float32)
+
+    assert found(reader, query, "alice", 1) == ids(21, 1)
+    reader.close()
+    writer.close()
+
+
+def test_ivf_is_chosen_by_the_users_row_count(index):
+    owners = ["alice"] * 200 + ["bob"] * 20
+    rows = fill(index, owners)
+    index.train_ivf(lists=4, sample=200)
+    index.exact_max_rows = 50
+
+    found(index, rows[0].astype(np.float32), "alice", 5)
+    found(index, rows[200].astype(np.float32), "bob", 5)
+
+    stats = index.stats()
+    assert (stats["ivf_searches"], stats["exact_searches"]) == (1, 1)
+
+
+def test_ivf_search_probes_only_the_users_rows(index):
+    owners = ["alice", "bob"] * 200
+    rows = fill(index, owners)
+    index.train_ivf(lists=4, sample=400)
+    index.exact_max_rows = 0
+    index.probes = 4
+
+    # Probing every cluster finds the exact result
+    query = rows[10].astype(np.float32)
+    assert found(index, query, "bob", 5) == expected(rows, owners, "bob", query, 5)
+
+
+def test_counters_are_exact_under_concurrent_searches():
+    index = EmbeddingIndex(None)
+    rows = fill(index, ["alice"] * 50)
+    query = encode_vector(rows[0].astype(np.float32))
+
+    def search():
+        for _ in range(200):
+            index.search(query, "alice", 3)
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert index.stats()["exact_searches"] == 1600
+
+
+def test_a_failed_add_is_counted():
+    index = EmbeddingIndex(None)
+    fill(index, ["alice"])
+
+    assert not index.add(ids(1, 1)[0], "alice", np.zeros(DIM + 1, dtype=np.float16).tobytes())
+    assert index.stats()["errors"] == 1
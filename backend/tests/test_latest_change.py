@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongo_fakes import FakeCollection
+from repositories import MongoAnalysisRepository, new_analysis_document
+
+
+def mongo_repository():
+    return MongoAnalysisRepository(FakeCollection(), FakeCollection(), FakeCollection(), FakeCollection())
+
+
+def store(repository, username, created_at):
+    """Store an analysis directly, as an older version without counters would have."""
+    document = new_analysis_document(username, "text", {"skills": []})
+    document["created_at"] = created_at
+    repository.collection.documents[document["_id"]] = document
+    return document
+
+
+def marker(repository, username="alice"):
+    return asyncio.run(repository.latest_change(username))
+
+
+def test_history_without_statistics_still_has_a_marker():
+    repository = mongo_repository()
+    created_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    store(repository, "alice", created_at)
+
+    assert marker(repository).updated_at == created_at
+    assert marker(repository, "bob").updated_at is None
+
+
+def test_marker_moves_when_the_statistics_lag_behind():
+    repository = mongo_repository()
+    stats_updated = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    repository.stats_collection.documents["alice"] = {"_id": "alice", "total_analyses": 1, "updated_at": stats_updated}
+    before = marker(repository)
+
+    # Stored, but its counter write has not gone through yet
+    store(repository, "alice", stats_updated + timedelta(seconds=5))
+
+    after = marker(repository)
+    assert after != before
+    assert after.updated_at == stats_updated + timedelta(seconds=5)
+
+
+def test_naive_datetimes_from_mongodb_are_treated_as_utc():
+    repository = mongo_repository()
+    repository.stats_collection.documents["alice"] = {
+        "_id": "alice", "total_analyses": 2, "updated_at": datetime(2024, 5, 1, 12)
+    }
+    store(repository, "alice", datetime(2024, 5, 1, 11))
+
+    assert marker(repository) == (2, datetime(2024, 5, 1, 12, tzinfo=timezone.utc))
@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from summary_batcher import SummaryBatcher
+
+
+def batcher(generate_batch, **kwargs):
+    return SummaryBatcher(generate_batch, max_batch_size=4, max_wait_ms=50, histogram_buckets=[1, 4], **kwargs)
+
+
+def test_concurrent_prompts_share_a_batch():
+    summaries = batcher(lambda prompts: [prompt.upper() for prompt in prompts])
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(summaries.submit, ["a", "b", "c", "d"]))
+
+    assert results == ["A", "B", "C", "D"]
+    assert summaries.stats()["prompts"] == 4
+
+
+def test_prompts_without_an_output_fail_instead_of_hanging():
+    # Every batch comes back one output short
+    summaries = batcher(lambda prompts: [prompt.upper() for prompt in prompts[:-1]], timeout_seconds=5)
+
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(summaries.submit, prompt) for prompt in ["a", "b", "c"]]
+        outcomes = [future.exception() or future.result() for future in futures]
+
+    failures = [outcome for outcome in outcomes if isinstance(outcome, RuntimeError)]
+    assert failures and len(failures) == summaries.stats()["batches"] == summaries.stats()["failed_batches"]
+    assert all(outcome in ("A", "B", "C") for outcome in outcomes if outcome not in failures)
+
+
+def test_waiting_for_a_summary_is_bounded():
+    release = threading.Event()
+    summaries = batcher(lambda prompts: release.wait() and prompts, timeout_seconds=0.1)
+
+    with pytest.raises(TimeoutError):
+        summaries.submit("a")
+    release.set()
+
+    assert summaries.stats()["timeouts"] == 1
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from repositories import InMemoryAnalysisRepository, new_analysis_document
+from trend_rollups import (
+    bucket_id, bucket_start, compact_rollups, rollup_increments, rollup_update, trend_response, window
+)
+
+NOW = datetime(2024, 5, 10, 15, 42, 7, tzinfo=timezone.utc)
+
+
+def analysis_at(created_at, skills=("python",), role="backend"):
+    document = new_analysis_document("alice", "posting", {"role_type": role, "skills": list(skills)})
+    document["created_at"] = created_at
+    return document
+
+
+def test_bucket_start_rounds_down_to_the_hour_and_day_in_utc():
+    local = datetime(2024, 5, 10, 1, 30, tzinfo=timezone(timedelta(hours=3)))
+
+    assert bucket_start(local, "hour") == datetime(2024, 5, 9, 22, tzinfo=timezone.utc)
+    assert bucket_start(local, "day") == datetime(2024, 5, 9, tzinfo=timezone.utc)
+    # Naive datetimes, as read back from MongoDB, are UTC
+    assert bucket_start(datetime(2024, 5, 10, 15, 42), "hour") == datetime(2024, 5, 10, 15, tzinfo=timezone.utc)
+
+
+def test_bucket_ids_sort_by_time():
+    starts = [datetime(2024, 5, day, hour, tzinfo=timezone.utc) for day in (9, 10) for hour in (3, 12, 23)]
+
+    assert bucket_id("day", starts[0]) == "day:2024-05-09T03"
+    assert sorted(bucket_id("hour", start) for start in reversed(starts)) == [bucket_id("hour", s) for s in starts]
+
+
+def test_window_ends_with_the_current_bucket():
+    assert window("hour", 3, NOW) == [datetime(2024, 5, 10, hour, tzinfo=timezone.utc) for hour in (13, 14, 15)]
+    assert window("day", 2, NOW) == [datetime(2024, 5, day, tzinfo=timezone.utc) for day in (9, 10)]
+
+
+def test_increments_are_summed_per_hour_and_day():
+    documents = [
+        analysis_at(NOW),
+        analysis_at(NOW - timedelta(minutes=30), skills=["python", "sql"]),
+        analysis_at(NOW - timedelta(hours=3), role="data")
+    ]
+
+    merged = rollup_increments(documents, retention_days=14, now=NOW)
+
+    assert set(merged) == {"hour:2024-05-10T15", "hour:2024-05-10T12", "day:2024-05-10T00"}
+    day = merged["day:2024-05-10T00"]
+    assert day["start"] == datetime(2024, 5, 10, tzinfo=timezone.utc)
+    assert day["increments"]["total_analyses"] == 3
+    assert day["increments"]["skill_distribution.python"] == 3
+    assert day["increments"]["role_distribution.data"] == 1
+    assert merged["hour:2024-05-10T15"]["increments"]["total_analyses"] == 2
+
+
+def test_analyses_past_the_hourly_retention_only_count_in_their_day():
+    merged = rollup_increments([analysis_at(NOW - timedelta(days=3))], retention_days=2, now=NOW)
+
+    assert list(merged) == ["day:2024-05-07T00"]
+
+
+def test_increments_can_be_limited_to_some_granularities():
+    merged = rollup_increments([analysis_at(NOW)], now=NOW, granularities=["day"])
+
+    assert list(merged) == ["day:2024-05-10T00"]
+
+
+def test_only_hourly_buckets_expire():
+    merged = rollup_increments([analysis_at(NOW)], retention_days=14, now=NOW)
+
+    hour = rollup_update(merged["hour:2024-05-10T15"], retention_days=14)
+    day = rollup_update(merged["day:2024-05-10T00"], retention_days=14)
+
+    assert hour["$set"]["expires_at"] == datetime(2024, 5, 24, 15, tzinfo=timezone.utc)
+    assert "expires_at" not in day["$set"]
+    assert hour["$inc"] == {"total_analyses": 1, "role_distribution.backend": 1, "skill_distribution.python": 1}
+
+
+def test_trend_fills_empty_buckets_and_computes_shares():
+    starts = window("day", 3, NOW)
+    documents = [
+        {"_id": bucket_id("day", starts[0]), "total_analyses": 3,
+         "skill_distribution": {"python": 2, "Node%2Ejs": 3, "sql": 0}},
+        {"_id": bucket_id("day", starts[2]), "total_analyses": 1, "skill_distribution": {"python": 1}}
+    ]
+
+    response = trend_response("skills", "day", starts, documents, top=5)
+
+    assert response["total_analyses"] == 4
+    assert response["top"] == [
+        {"value": "python", "count": 3, "share": 0.75},
+        {"value": "Node.js", "count": 3, "share": 0.75}
+    ]
+    assert [bucket["total_analyses"] for bucket in response["series"]] == [3, 0, 1]
+    assert response["series"][1]["counts"] == {"python": 0, "Node.js": 0}
+    assert response["end"] == datetime(2024, 5, 11, tzinfo=timezone.utc).isoformat()
+
+
+def test_trend_of_an_empty_window():
+    response = trend_response("roles", "hour", [], [])
+
+    assert response["start"] is None and response["top"] == [] and response["series"] == []
+
+
+class RollupsCollection:
+    """The delete_many of a synchronous collection, on bucket ids."""
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+
+    def delete_many(self, query):
+        bounds = query["_id"]
+        dropped = {key for key in self.keys if bounds["$gte"] <= key < bounds["$lt"]}
+        self.keys -= dropped
+        return SimpleNamespace(deleted_count=len(dropped))
+
+
+def test_compact_drops_only_hourly_buckets_past_the_retention():
+    now = bucket_start(datetime.now(timezone.utc), "hour")
+    old, recent = now - timedelta(days=3), now - timedelta(days=1)
+    collection = RollupsCollection([
+        bucket_id("hour", old), bucket_id("hour", recent), bucket_id("day", old), bucket_id("day", recent)
+    ])
+
+    assert compact_rollups(collection, retention_days=2) == 1
+    assert collection.keys == {bucket_id("hour", recent), bucket_id("day", old), bucket_id("day", recent)}
+
+
+def test_in_memory_hourly_buckets_expire_when_a_new_hour_starts():
+    repository = InMemoryAnalysisRepository(retention_days=1)
+    now = datetime.now(timezone.utc)
+    stale = bucket_id("hour", now - timedelta(days=2))
+    repository.rollups[stale] = {"_id": stale, "total_analyses": 1}
+
+    asyncio.run(repository.insert_many([analysis_at(now)]))
+
+    assert stale not in repository.rollups
+    assert repository.rollups[bucket_id("hour", bucket_start(now, "hour"))]["total_analyses"] == 1
+    assert repository.rollups[bucket_id("day", bucket_start(now, "day"))]["total_analyses"] == 1
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from mongo_fakes import FakeCollection
+from repositories import (
+    COUNTERS, InMemoryAnalysisRepository, MongoAnalysisRepository, _merge_increments, new_analysis_document
+)
+from user_stats import decode_key, encode_key, stats_increments, stats_response
+
+
+def analysis(role="backend", level="senior", skills=("python", "sql")):
+    return {"role_type": role, "experience_level": level, "skills": list(skills)}
+
+
+def test_keys_round_trip_through_the_field_name_escape():
+    for value in ["C#", "Node.js", "$money", "100%", "a.b$c%2E"]:
+        assert "." not in encode_key(value) and "$" not in encode_key(value)
+        assert decode_key(encode_key(value)) == value
+
+
+def test_increments_count_a_skill_once_per_analysis():
+    increments = stats_increments(analysis(skills=["python", "Node.js", "python", ""]))
+
+    assert increments == {
+        "total_analyses": 1,
+        "role_distribution.backend": 1,
+        "experience_distribution.senior": 1,
+        "skill_distribution.python": 1,
+        "skill_distribution.Node%2Ejs": 1
+    }
+
+
+def test_increments_skip_missing_role_and_level():
+    assert stats_increments({"skills": []}) == {"total_analyses": 1}
+
+
+def test_merge_increments_sums_per_user():
+    documents = [
+        new_analysis_document("alice", "a", analysis()),
+        new_analysis_document("alice", "b", analysis(role="data", skills=["python"])),
+        new_analysis_document("bob", "c", analysis())
+    ]
+
+    merged = _merge_increments(documents)
+
+    assert merged["alice"]["total_analyses"] == 2
+    assert merged["alice"]["skill_distribution.python"] == 2
+    assert merged["alice"]["role_distribution.data"] == 1
+    assert merged["bob"]["total_analyses"] == 1
+
+
+def test_stats_response_decodes_and_ranks_skills():
+    document = {
+        "total_analyses": 3,
+        "role_distribution": {"backend": 2, "data": 0},
+        "experience_distribution": {"senior": 3},
+        "skill_distribution": {"python": 3, "Node%2Ejs": 2, "sql": 1}
+    }
+
+    response = stats_response(document, top_skills=2)
+
+    assert response["role_distribution"] == {"backend": 2}
+    assert response["top_skills"] == {"python": 3, "Node.js": 2}
+    assert stats_response(None)["total_analyses"] == 0
+
+
+def test_in_memory_statistics_ignore_duplicate_inserts():
+    repository = InMemoryAnalysisRepository()
+    documents = [new_analysis_document("alice", "a", analysis()), new_analysis_document("alice", "b", analysis())]
+
+    asyncio.run(repository.insert_many(documents))
+    asyncio.run(repository.insert_many(documents))
+
+    stats = asyncio.run(repository.stats("alice"))
+    assert stats["total_analyses"] == 2
+    assert stats["top_skills"] == {"python": 2, "sql": 2}
+
+
+def mongo_repository():
+    return MongoAnalysisRepository(FakeCollection(), FakeCollection(), FakeCollection(), FakeCollection())
+
+
+def total(repository, username="alice"):
+    return asyncio.run(repository.stats(username))["total_analyses"]
+
+
+def test_a_retry_counts_analyses_whose_counter_write_failed():
+    repository = mongo_repository()
+    documents = [new_analysis_document("alice", "a", analysis()), new_analysis_document("alice", "b", analysis())]
+    repository.stats_collection.fail_bulk_writes = 1
+
+    with pytest.raises(AutoReconnect):
+        asyncio.run(repository.insert_many(documents))
+    assert total(repository) == 0
+    assert all(d["pending_counts"] == ["user_stats"] for d in repository.collection.documents.values())
+
+    # The write-behind retry: every id is a duplicate now
+    assert asyncio.run(repository.insert_many(documents)) == 0
+    assert total(repository) == 2
+    assert all("pending_counts" not in d for d in repository.collection.documents.values())
+
+    day = [d for key, d in repository.rollups_collection.documents.items() if key.startswith("day:")]
+    assert sum(d["total_analyses"] for d in day) == 2
+
+
+def test_a_retry_after_a_complete_write_counts_nothing_again():
+    repository = mongo_repository()
+    documents = [new_analysis_document("alice", "a", analysis())]
+
+    asyncio.run(repository.insert_many(documents))
+    asyncio.run(repository.insert_many(documents))
+
+    assert total(repository) == 1
+
+
+def test_startup_counts_analyses_a_failed_process_left_uncounted():
+    repository = mongo_repository()
+    document = new_analysis_document("alice", "a", analysis())
+    document["created_at"] -= timedelta(hours=1)
+    repository.stats_collection.fail_bulk_writes = 1
+    with pytest.raises(AutoReconnect):
+        asyncio.run(repository.insert_many([document]))
+
+    asyncio.run(repository.start())
+
+    assert total(repository) == 1
+    assert "pending_counts" not in repository.collection.documents[document["_id"]]
+    # Nothing is left to count a second time
+    assert asyncio.run(repository.count_uncounted()) == 0
+    assert total(repository) == 1
+
+
+def test_counting_that_fails_again_puts_the_counter_back():
+    repository = mongo_repository()
+    document = new_analysis_document("alice", "a", analysis())
+    document["created_at"] = datetime.now(timezone.utc) - timedelta(hours=1)
+    stored = {**document, "pending_counts": list(COUNTERS)}
+    del stored["job_description"]
+    repository.collection.documents[document["_id"]] = stored
+    repository.stats_collection.fail_bulk_writes = 1
+
+    with pytest.raises(AutoReconnect):
+        asyncio.run(repository.count_uncounted())
+
+    assert repository.collection.documents[document["_id"]]["pending_counts"] == ["user_stats"]
+    assert asyncio.run(repository.count_uncounted()) == 1
+    assert total(repository) == 1
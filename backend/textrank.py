@@ -0,0 +1,91 @@
+"""TextRank over spaCy word vectors, vectorized with NumPy.
+
+Each sentence is represented by the mean vector of its words (stop words and
+punctuation excluded), the similarity graph is one matrix product of the
+normalized sentence vectors, and sentences are scored by power iteration of
+the resulting PageRank.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_TOLERANCE = 1e-6
+TEXTRANK_MAX_ITERATIONS = 100
+
+
+def word_vector_sums(nlp, sentences: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the summed word vectors of every sentence and how many words each sum covers.
+
+    The sentences are tokenized in a single pass; stop words, punctuation
+    and words without a vector are left out.
+    """
+    from spacy.attrs import IDX, IS_PUNCT, IS_SPACE, IS_STOP, ORTH
+
+    vectors = nlp.vocab.vectors
+    width = vectors.shape[1] if vectors.shape[0] else 0
+    sums = np.zeros((len(sentences), width), dtype=np.float32)
+    counts = np.zeros(len(sentences), dtype=np.int64)
+    if not sentences or not width:
+        return sums, counts
+
+    # One tokenizer pass over every sentence, each starting at a known offset
+    starts = np.cumsum([0] + [len(sentence) + 1 for sentence in sentences[:-1]])
+    doc = nlp.make_doc("\n".join(sentences))
+    if not len(doc):
+        return sums, counts
+    tokens = doc.to_array([ORTH, IS_PUNCT, IS_STOP, IS_SPACE, IDX])
+    words = tokens[(tokens[:, 1] == 0) & (tokens[:, 2] == 0) & (tokens[:, 3] == 0)]
+
+    rows = np.asarray(vectors.find(keys=words[:, 0]))
+    known = rows >= 0
+    sentence_ids = np.searchsorted(starts, words[known, 4], side="right") - 1
+    np.add.at(sums, sentence_ids, vectors.data[rows[known]])
+    return sums, np.bincount(sentence_ids, minlength=len(sentences))
+
+
+def sentence_vectors(nlp, sentences: List[str]) -> np.ndarray:
+    """Return the mean word vector of every sentence."""
+    sums, counts = word_vector_sums(nlp, sentences)
+    return sums / np.maximum(counts, 1)[:, None]
+
+
+def rank(
+    vectors: np.ndarray,
+    damping: float = TEXTRANK_DAMPING,
+    tolerance: float = TEXTRANK_TOLERANCE,
+    max_iterations: int = TEXTRANK_MAX_ITERATIONS
+) -> np.ndarray:
+    """Score sentences by PageRank over their cosine similarity graph."""
+    count = len(vectors)
+    if count == 0:
+        return np.zeros(0)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, 0)
+    np.clip(similarity, 0, None, out=similarity)
+
+    # Sentences without similar neighbours link to every sentence equally
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums == 0, 1, row_sums), 1.0 / count)
+
+    scores = np.full(count, 1.0 / count)
+    for _ in range(max_iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def top_sentences(nlp, sentences: List[str], count: int) -> List[str]:
+    """Return the ``count`` highest ranked sentences in their original order."""
+    if len(sentences) <= count:
+        return list(sentences)
+    scores = rank(sentence_vectors(nlp, sentences))
+    # Ties go to the earlier sentence
+    chosen = np.argsort(-scores, kind="stable")[:count]
+    return [sentences[index] for index in sorted(chosen)]
@@ -0,0 +1,249 @@
+"""Time-bucketed counters of skills, role types and experience levels across all users.
+
+Every stored analysis bumps the counters of its hour and of its day with one
+atomic ``$inc`` each, so a trend over a time window reads one document per
+bucket of the window however long the history is. Hourly buckets expire
+after ``TREND_HOURLY_RETENTION_DAYS``; the daily buckets already hold their
+counts. Bucket ids sort by time ("day:2024-05-01T00"), so a window is one
+``_id`` range.
+
+Backfill the buckets from the stored analyses, e.g. after upgrading, and
+drop hourly buckets past the retention (MongoDB's TTL index does the latter
+on its own unless the retention was shortened):
+
+    python trend_rollups.py --rebuild                    # all history
+    python trend_rollups.py --rebuild --since 2024-05-01
+    python trend_rollups.py --compact
+"""
+import argparse
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from user_stats import decode_key, stats_increments
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TREND_HOURLY_RETENTION_DAYS = int(os.getenv("TREND_HOURLY_RETENTION_DAYS", "14"))
+TREND_MAX_DAYS = int(os.getenv("TREND_MAX_DAYS", "366"))
+TREND_TOP_VALUES = int(os.getenv("TREND_TOP_VALUES", "10"))
+TREND_MAX_TOP_VALUES = 50
+TREND_BACKFILL_BATCH_SIZE = int(os.getenv("TREND_BACKFILL_BATCH_SIZE", "1000"))
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Default window per granularity: the last day, the last week
+DEFAULT_PERIODS = {"hour": 24, "day": 7}
+DIMENSIONS = {
+    "skills": "skill_distribution",
+    "roles": "role_distribution",
+    "experience": "experience_distribution"
+}
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Return the UTC start of the bucket a moment falls in."""
+    if moment.tzinfo is None:
+        # Documents read back from MongoDB carry naive UTC datetimes
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if granularity == "day" else moment
+
+
+def bucket_id(granularity: str, start: datetime) -> str:
+    """Return the id of the bucket starting at ``start``; ids of one granularity sort by time."""
+    return f"{granularity}:{start:%Y-%m-%dT%H}"
+
+
+def max_periods(granularity: str, retention_days: int = TREND_HOURLY_RETENTION_DAYS) -> int:
+    """Return the longest window, in buckets, a trend may cover."""
+    return retention_days * 24 if granularity == "hour" else TREND_MAX_DAYS
+
+
+def window(granularity: str, periods: int, now: Optional[datetime] = None) -> List[datetime]:
+    """Return the starts of the last ``periods`` buckets, oldest first, the current one included."""
+    step = GRANULARITIES[granularity]
+    last = bucket_start(now or datetime.now(timezone.utc), granularity)
+    return [last - step * offset for offset in range(periods - 1, -1, -1)]
+
+
+def rollup_increments(
+    documents: Iterable[Dict[str, Any]],
+    retention_days: int = TREND_HOURLY_RETENTION_DAYS,
+    now: Optional[datetime] = None,
+    granularities: Iterable[str] = tuple(GRANULARITIES)
+) -> Dict[str, Dict[str, Any]]:
+    """Sum the bucket increments of new analyses per bucket id, for the given granularities.
+
+    Each entry has the bucket's ``granularity``, ``start`` and ``increments``
+    (``$inc`` fields as in user_stats). Analyses whose hour is already past
+    the retention only count in their day.
+    """
+    cutoff = bucket_start(now or datetime.now(timezone.utc), "hour") - timedelta(days=retention_days)
+    merged: Dict[str, Dict[str, Any]] = {}
+    for document in documents:
+        increments = stats_increments(document["analysis"])
+        for granularity in granularities:
+            start = bucket_start(document["created_at"], granularity)
+            if granularity == "hour" and start < cutoff:
+                continue
+            bucket = merged.setdefault(
+                bucket_id(granularity, start), {"granularity": granularity, "start": start, "increments": {}}
+            )
+            for field, amount in increments.items():
+                bucket["increments"][field] = bucket["increments"].get(field, 0) + amount
+    return merged
+
+
+def rollup_update(bucket: Dict[str, Any], retention_days: int = TREND_HOURLY_RETENTION_DAYS) -> Dict[str, Any]:
+    """Return the upsert update of one entry of rollup_increments."""
+    fields = {"granularity": bucket["granularity"], "start": bucket["start"]}
+    if bucket["granularity"] == "hour":
+        # Removed by the TTL index on expires_at
+        fields["expires_at"] = bucket["start"] + timedelta(days=retention_days)
+    return {"$inc": bucket["increments"], "$set": fields}
+
+
+def trend_response(
+    dimension: str,
+    granularity: str,
+    starts: List[datetime],
+    documents: Iterable[Dict[str, Any]],
+    top: int = TREND_TOP_VALUES
+) -> Dict[str, Any]:
+    """Turn the bucket documents of a window into the trend of the most frequent values of a dimension.
+
+    ``share`` is the fraction of the window's analyses a value appears in;
+    ``series`` has one entry per bucket, empty buckets included.
+    """
+    distribution = DIMENSIONS[dimension]
+    by_id = {document["_id"]: document for document in documents}
+    buckets = []
+    totals: Counter = Counter()
+    total_analyses = 0
+    for start in starts:
+        document = by_id.get(bucket_id(granularity, start), {})
+        counts = {decode_key(key): count for key, count in (document.get(distribution) or {}).items() if count > 0}
+        buckets.append((start, document.get("total_analyses", 0), counts))
+        totals.update(counts)
+        total_analyses += document.get("total_analyses", 0)
+
+    leaders = totals.most_common(top)
+    values = [value for value, _ in leaders]
+    step = GRANULARITIES[granularity]
+    return {
+        "dimension": dimension,
+        "granularity": granularity,
+        "start": starts[0].isoformat() if starts else None,
+        "end": (starts[-1] + step).isoformat() if starts else None,
+        "total_analyses": total_analyses,
+        "top": [
+            {"value": value, "count": count, "share": round(count / total_analyses, 4) if total_analyses else 0.0}
+            for value, count in leaders
+        ],
+        "series": [
+            {
+                "start": start.isoformat(),
+                "total_analyses": total,
+                "counts": {value: counts.get(value, 0) for value in values}
+            }
+            for start, total, counts in buckets
+        ]
+    }
+
+
+def _write_buckets(rollups_collection, merged: Dict[str, Dict[str, Any]], retention_days: int) -> None:
+    from pymongo import UpdateOne
+
+    if merged:
+        rollups_collection.bulk_write([
+            UpdateOne({"_id": key}, rollup_update(bucket, retention_days), upsert=True)
+            for key, bucket in merged.items()
+        ], ordered=False)
+
+
+def rebuild_rollups(
+    analyses_collection,
+    rollups_collection,
+    since: Optional[datetime] = None,
+    batch_size: int = TREND_BACKFILL_BATCH_SIZE,
+    retention_days: int = TREND_HOURLY_RETENTION_DAYS
+) -> Tuple[int, int]:
+    """Recompute the buckets from ``since`` (rounded down to its day) on; returns (analyses, batches).
+
+    The buckets of the range are dropped first, then the analyses are
+    streamed in ``created_at`` order and counted ``batch_size`` at a time,
+    so memory holds one batch of increments. Analyses stored while the
+    rebuild runs may be counted twice or missed; rerun it from their day if
+    it matters.
+    """
+    query: Dict[str, Any] = {}
+    if since is not None:
+        since = bucket_start(since, "day")
+        query["created_at"] = {"$gte": since}
+        rollups_collection.delete_many({"start": {"$gte": since}})
+    else:
+        rollups_collection.delete_many({})
+    # The rebuild counts analyses a failed write left uncounted; they must not be counted again
+    analyses_collection.update_many(
+        {**query, "pending_counts": {"$in": list(GRANULARITIES)}},
+        {"$pull": {"pending_counts": {"$in": list(GRANULARITIES)}}}
+    )
+
+    now = datetime.now(timezone.utc)
+    cursor = analyses_collection.find(
+        query,
+        {"created_at": 1, "analysis.role_type": 1, "analysis.experience_level": 1, "analysis.skills": 1}
+    ).sort("created_at", 1).batch_size(batch_size)
+
+    analyses = batches = 0
+    batch: List[Dict[str, Any]] = []
+    for document in cursor:
+        document.setdefault("analysis", {})
+        batch.append(document)
+        if len(batch) >= batch_size:
+            _write_buckets(rollups_collection, rollup_increments(batch, retention_days, now), retention_days)
+            analyses, batches, batch = analyses + len(batch), batches + 1, []
+    if batch:
+        _write_buckets(rollups_collection, rollup_increments(batch, retention_days, now), retention_days)
+        analyses, batches = analyses + len(batch), batches + 1
+    return analyses, batches
+
+
+def compact_rollups(rollups_collection, retention_days: int = TREND_HOURLY_RETENTION_DAYS) -> int:
+    """Drop hourly buckets past the retention and return how many were dropped."""
+    cutoff = bucket_start(datetime.now(timezone.utc), "hour") - timedelta(days=retention_days)
+    result = rollups_collection.delete_many({"_id": {"$gte": "hour:", "$lt": bucket_id("hour", cutoff)}})
+    return result.deleted_count
+
+
+def run(args: argparse.Namespace) -> None:
+    """Rebuild or compact the trend buckets."""
+    from database import analyses_collection, trend_rollups_collection
+
+    if not args.rebuild and not args.compact:
+        raise SystemExit("Nothing to do; pass --rebuild or --compact")
+    if args.rebuild:
+        since = datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc) if args.since else None
+        analyses, batches = rebuild_rollups(analyses_collection, trend_rollups_collection, since, args.batch_size)
+        logger.info(f"Counted {analyses} analyses into trend buckets in {batches} batch(es)")
+    if args.compact:
+        dropped = compact_rollups(trend_rollups_collection)
+        logger.info(f"Dropped {dropped} hourly trend bucket(s) older than {TREND_HOURLY_RETENTION_DAYS} days")
+
+
+def parse_args(argv: Iterable[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Maintain the time-bucketed trend counters.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the buckets from the analyses collection")
+    parser.add_argument("--since", help="Only rebuild from this UTC date (YYYY-MM-DD) on")
+    parser.add_argument("--batch-size", type=int, default=TREND_BACKFILL_BATCH_SIZE, help="Analyses per write batch")
+    parser.add_argument("--compact", action="store_true", help="Drop hourly buckets past the retention")
+    return parser.parse_args(list(argv))
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
@@ -0,0 +1,148 @@
+"""Per-user analysis statistics maintained incrementally.
+
+Every stored analysis bumps its user's counters with one atomic ``$inc``, so
+``/stats`` is a single document read however long the history is. When the
+counters drift from ``analyses`` (manual edits, deletions, a failed update),
+recompute them:
+
+    python user_stats.py --rebuild                # every user
+    python user_stats.py --rebuild --username bob # one user
+"""
+import argparse
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATS_TOP_SKILLS = int(os.getenv("STATS_TOP_SKILLS", "10"))
+
+DISTRIBUTIONS = ["role_distribution", "experience_distribution", "skill_distribution"]
+
+
+def encode_key(value: str) -> str:
+    """Escape a value for use as a MongoDB field name ('.' and '$' are reserved)."""
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def decode_key(key: str) -> str:
+    """Reverse encode_key."""
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def _analysis_counts(analysis: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Return the distribution entries one analysis contributes to."""
+    role = analysis.get("role_type")
+    level = analysis.get("experience_level")
+    return {
+        "role_distribution": [role] if role else [],
+        "experience_distribution": [level] if level else [],
+        # A skill counts once per analysis it appears in
+        "skill_distribution": [skill for skill in dict.fromkeys(analysis.get("skills") or []) if skill]
+    }
+
+
+def _decode_distribution(counts: Optional[Dict[str, int]]) -> Dict[str, int]:
+    return {decode_key(key): count for key, count in (counts or {}).items() if count > 0}
+
+
+def stats_increments(analysis: Dict[str, Any]) -> Dict[str, int]:
+    """Return the ``$inc`` fields that count one stored analysis."""
+    increments = {"total_analyses": 1}
+    for distribution, values in _analysis_counts(analysis).items():
+        for value in values:
+            increments[f"{distribution}.{encode_key(value)}"] = 1
+    return increments
+
+
+def stats_response(document: Optional[Dict[str, Any]], top_skills: int = STATS_TOP_SKILLS) -> Dict[str, Any]:
+    """Turn a user's stats document into the /stats response with the most frequent skills."""
+    document = document or {}
+    skills = Counter(_decode_distribution(document.get("skill_distribution")))
+    return {
+        "total_analyses": document.get("total_analyses", 0),
+        "role_distribution": _decode_distribution(document.get("role_distribution")),
+        "experience_distribution": _decode_distribution(document.get("experience_distribution")),
+        "top_skills": dict(skills.most_common(top_skills))
+    }
+
+
+def _stats_document(total: int, counters: Dict[str, Counter]) -> Dict[str, Any]:
+    return {
+        "total_analyses": total,
+        "updated_at": datetime.now(timezone.utc),
+        **{
+            distribution: {encode_key(value): count for value, count in counters[distribution].items()}
+            for distribution in DISTRIBUTIONS
+        }
+    }
+
+
+def rebuild_user_stats(analyses_collection, stats_collection, username: Optional[str] = None) -> int:
+    """Recompute the counters from the stored analyses and return the number of users rebuilt.
+
+    Analyses are streamed in username order, so only one user's counters are
+    held in memory. Analyses stored while a user is being rebuilt may be
+    missed; rerun the rebuild for that user if it matters.
+    """
+    query = {"username": username} if username else {}
+    # The rebuild counts analyses a failed write left uncounted; they must not be counted again
+    analyses_collection.update_many(
+        {**query, "pending_counts": "user_stats"}, {"$pull": {"pending_counts": "user_stats"}}
+    )
+    cursor = analyses_collection.find(
+        query,
+        {"username": 1, "analysis.role_type": 1, "analysis.experience_level": 1, "analysis.skills": 1}
+    ).sort("username", 1)
+
+    rebuilt: List[str] = []
+    current: Optional[str] = None
+    total = 0
+    counters: Dict[str, Counter] = {}
+    for document in cursor:
+        if document["username"] != current:
+            if current is not None:
+                stats_collection.replace_one({"_id": current}, _stats_document(total, counters), upsert=True)
+                rebuilt.append(current)
+            current, total = document["username"], 0
+            counters = {distribution: Counter() for distribution in DISTRIBUTIONS}
+        total += 1
+        for distribution, values in _analysis_counts(document.get("analysis", {})).items():
+            counters[distribution].update(values)
+    if current is not None:
+        stats_collection.replace_one({"_id": current}, _stats_document(total, counters), upsert=True)
+        rebuilt.append(current)
+
+    # Users whose analyses are all gone keep no stale counters
+    if username:
+        if not rebuilt:
+            stats_collection.delete_one({"_id": username})
+    else:
+        stats_collection.delete_many({"_id": {"$nin": rebuilt}})
+    return len(rebuilt)
+
+
+def run(args: argparse.Namespace) -> None:
+    """Rebuild the statistics of one or every user."""
+    from database import analyses_collection, user_stats_collection
+
+    if not args.rebuild:
+        raise SystemExit("Nothing to do; pass --rebuild")
+    users = rebuild_user_stats(analyses_collection, user_stats_collection, args.username)
+    logger.info(f"Rebuilt statistics for {users} user(s)")
+
+
+def parse_args(argv: Iterable[str]) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description="Maintain per-user analysis statistics.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the counters from the analyses collection")
+    parser.add_argument("--username", help="Only rebuild this user")
+    return parser.parse_args(list(argv))
+
+
+if __name__ == "__main__":
+    run(parse_args(sys.argv[1:]))
@@ -4,6 +4,8 @@ import '../styles/AnalysisCard.css';
 const AnalysisCard = ({ analysis, onDelete, formatDate }) => {
   const [expanded, setExpanded] = useState(false);
   const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
+  const [jobDescription, setJobDescription] = useState(analysis.job_description || null);
+  const [descriptionLoading, setDescriptionLoading] = useState(false);
 
   const getSkillColor = (skill) => {
     const skillLower = skill.toLowerCase();
@@ -29,6 +31,36 @@ const AnalysisCard = ({ analysis, onDelete, formatDate }) => {
     return 'other';
   };
 
+  // List pages leave out the description text; load it from the detail endpoint on first expand
+  const fetchJobDescription = async () => {
+    setDescriptionLoading(true);
+    try {
+      const token = localStorage.getItem('token');
+      const response = await fetch(`http://localhost:8000/analyses/${analysis.analysis_id}`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json'
+        }
+      });
+      if (response.ok) {
+        const data = await response.json();
+        setJobDescription(data.job_description);
+      }
+    } catch (err) {
+      console.error('Analysis fetch error:', err);
+    } finally {
+      setDescriptionLoading(false);
+    }
+  };
+
+  const handleToggleExpanded = () => {
+    if (!expanded && jobDescription === null && analysis.analysis_id) {
+      fetchJobDescription();
+    }
+    setExpanded(!expanded);
+  };
+
   const handleDelete = () => {
     onDelete(analysis.analysis_id);
     setShowDeleteConfirm(false);
@@ -40,7 +72,6 @@ const AnalysisCard = ({ analysis, onDelete, formatDate }) => {
   };
 
   const analysisData = analysis.analysis;
-  const jobDescription = analysis.job_description;
   const createdAt = analysis.created_at;
 
   return (
@@ -59,7 +90,7 @@ const AnalysisCard = ({ analysis, onDelete, formatDate }) => {
         <div className="header-actions">
           <button
             className="expand-btn"
-            onClick={() => setExpanded(!expanded)}
+            onClick={handleToggleExpanded}
           >
             <span className={`expand-icon ${expanded ? 'expanded' : ''}`}>
               ▼
@@ -127,7 +158,7 @@ const AnalysisCard = ({ analysis, onDelete, formatDate }) => {
             <div className="expanded-section">
               <h5>Original Job Description</h5>
               <div className="job-description">
-                {jobDescription}
+                {descriptionLoading ? 'Loading...' : jobDescription}
               </div>
             </div>
           </div>
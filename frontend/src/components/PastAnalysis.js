@@ -1,74 +1,37 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import AnalysisCard from './AnalysisCard';
 import Pagination from './Pagination';
 import '../styles/PastAnalysis.css';
 
+const API_URL = 'http://localhost:8000';
+
+// Builds the /analyses query for a page; filters are 'role:<role type>' or 'experience:<level>'
+const buildAnalysesQuery = (sortBy, filterBy, limit, cursor) => {
+  const params = new URLSearchParams({ sort: sortBy, limit: String(limit) });
+  if (filterBy.startsWith('role:')) params.set('role_type', filterBy.slice('role:'.length));
+  if (filterBy.startsWith('experience:')) params.set('experience_level', filterBy.slice('experience:'.length));
+  if (cursor) params.set('cursor', cursor);
+  return params.toString();
+};
+
 const PastAnalysis = () => {
-  const [allAnalyses, setAllAnalyses] = useState([]); // Store all analyses
   const [analyses, setAnalyses] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [stats, setStats] = useState(null);
   
-  // Pagination state
+  // Pagination state; the server pages by cursor, so the cursor that opens each
+  // visited page is kept to allow jumping back without refetching earlier pages
   const [currentPage, setCurrentPage] = useState(1);
   const [totalAnalyses, setTotalAnalyses] = useState(0);
   const [itemsPerPage] = useState(6);
+  const pageCursors = useRef([null]);
   
   // Sorting and filtering
   const [sortBy, setSortBy] = useState('newest');
   const [filterBy, setFilterBy] = useState('all');
   const [refreshTrigger, setRefreshTrigger] = useState(0);
 
-  const sortAnalyses = useCallback((analyses, sortType) => {
-    const sorted = [...analyses];
-    
-    switch (sortType) {
-      case 'newest':
-        return sorted.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-      case 'oldest':
-        return sorted.sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
-      case 'role':
-        return sorted.sort((a, b) => a.analysis.role_type.localeCompare(b.analysis.role_type));
-      case 'experience':
-        return sorted.sort((a, b) => a.analysis.experience_level.localeCompare(b.analysis.experience_level));
-      default:
-        return sorted;
-    }
-  }, []);
-
-  const filterAnalyses = useCallback((analyses, filterType) => {
-    if (filterType === 'all') return analyses;
-    
-    return analyses.filter(analysis => {
-      const roleType = analysis.analysis.role_type.toLowerCase();
-      const expLevel = analysis.analysis.experience_level.toLowerCase();
-      
-      switch (filterType) {
-        case 'frontend':
-          return roleType.includes('frontend') || roleType.includes('front-end') || roleType.includes('front end');
-        case 'backend':
-          return roleType.includes('backend') || roleType.includes('back-end') || roleType.includes('back end');
-        case 'fullstack':
-          return roleType.includes('fullstack') || roleType.includes('full-stack') || roleType.includes('full stack');
-        case 'data':
-          return roleType.includes('data') || roleType.includes('scientist') || roleType.includes('analyst');
-        case 'devops':
-          return roleType.includes('devops') || roleType.includes('infrastructure') || roleType.includes('sre');
-        case 'mobile':
-          return roleType.includes('mobile') || roleType.includes('ios') || roleType.includes('android');
-        case 'junior':
-          return expLevel.includes('junior') || expLevel.includes('0-2') || expLevel.includes('entry') || expLevel.includes('intern');
-        case 'mid':
-          return expLevel.includes('mid') || expLevel.includes('3-5') || expLevel.includes('intermediate');
-        case 'senior':
-          return expLevel.includes('senior') || expLevel.includes('5+') || expLevel.includes('lead') || expLevel.includes('principal');
-        default:
-          return true;
-      }
-    });
-  }, []);
-
   const fetchAnalyses = useCallback(async () => {
     try {
       setLoading(true);
@@ -79,52 +42,54 @@ const PastAnalysis = () => {
         return;
       }
 
-      const response = await fetch('http://localhost:8000/analyses', {
-        method: 'GET',
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
+      const requestPage = async (cursor) => {
+        const query = buildAnalysesQuery(sortBy, filterBy, itemsPerPage, cursor);
+        const response = await fetch(`${API_URL}/analyses?${query}`, {
+          method: 'GET',
+          headers: {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json'
+          }
+        });
+        if (!response.ok) {
+          const errorData = await response.json();
+          throw new Error(errorData.detail || 'Failed to fetch analyses');
         }
-      });
+        return response.json();
+      };
 
-      if (response.ok) {
-        const data = await response.json();
-        const fetchedAnalyses = data.analyses || [];
-        
-        // Store all analyses
-        setAllAnalyses(fetchedAnalyses);
-        
-        // Apply sorting and filtering
-        let processedAnalyses = sortAnalyses(fetchedAnalyses, sortBy);
-        processedAnalyses = filterAnalyses(processedAnalyses, filterBy);
-        
-        setTotalAnalyses(processedAnalyses.length);
-        
-        // Apply pagination
-        const startIndex = (currentPage - 1) * itemsPerPage;
-        const endIndex = startIndex + itemsPerPage;
-        const paginatedAnalyses = processedAnalyses.slice(startIndex, endIndex);
-        
-        setAnalyses(paginatedAnalyses);
-        setError(''); // Clear any previous errors
-      } else {
-        const errorData = await response.json();
-        setError(errorData.detail || 'Failed to fetch analyses');
+      // Walk forward from the last known cursor when jumping past visited pages
+      const cursors = pageCursors.current;
+      let page = Math.min(currentPage, cursors.length);
+      let data = await requestPage(cursors[page - 1]);
+      if (data.total_count !== null && data.total_count !== undefined) {
+        setTotalAnalyses(data.total_count);
+      }
+      while (page < currentPage && data.next_cursor) {
+        cursors[page] = data.next_cursor;
+        page += 1;
+        data = await requestPage(data.next_cursor);
       }
+      if (data.next_cursor) {
+        cursors[page] = data.next_cursor;
+      }
+      
+      setAnalyses(data.analyses || []);
+      setError(''); // Clear any previous errors
     } catch (err) {
       console.error('Fetch error:', err);
-      setError('Network error. Please check your connection.');
+      setError(err.message === 'Failed to fetch' ? 'Network error. Please check your connection.' : err.message);
     } finally {
       setLoading(false);
     }
-  }, [currentPage, sortBy, filterBy, itemsPerPage, sortAnalyses, filterAnalyses]);
+  }, [currentPage, sortBy, filterBy, itemsPerPage]);
 
   const fetchStats = useCallback(async () => {
     try {
       const token = localStorage.getItem('token');
       if (!token) return;
 
-      const response = await fetch('http://localhost:8000/stats', {
+      const response = await fetch(`${API_URL}/stats`, {
         method: 'GET',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -148,10 +113,16 @@ const PastAnalysis = () => {
     }
   }, [fetchAnalyses, fetchStats, refreshTrigger, currentPage]);
 
+  // Cursors belong to one sort order and filter; start over when either changes
+  const resetPages = () => {
+    pageCursors.current = [null];
+    setCurrentPage(1);
+  };
+
   const handleDeleteAnalysis = async (analysisId) => {
     try {
       const token = localStorage.getItem('token');
-      const response = await fetch(`http://localhost:8000/analyses/${analysisId}`, {
+      const response = await fetch(`${API_URL}/analyses/${analysisId}`, {
         method: 'DELETE',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -161,6 +132,7 @@ const PastAnalysis = () => {
 
       if (response.ok) {
         // Trigger refresh
+        pageCursors.current = pageCursors.current.slice(0, currentPage);
         setRefreshTrigger(prev => prev + 1);
       } else {
         console.error('Failed to delete analysis');
@@ -178,23 +150,23 @@ const PastAnalysis = () => {
 
   const handleSortChange = (newSort) => {
     setSortBy(newSort);
-    setCurrentPage(1); // Reset to first page when sorting changes
+    resetPages(); // Reset to first page when sorting changes
   };
 
   const handleFilterChange = (newFilter) => {
     setFilterBy(newFilter);
-    setCurrentPage(1); // Reset to first page when filter changes
+    resetPages(); // Reset to first page when filter changes
   };
 
   const handleClearFilters = () => {
     setFilterBy('all');
     setSortBy('newest');
-    setCurrentPage(1);
+    resetPages();
   };
 
   const handleRefresh = () => {
     setRefreshTrigger(prev => prev + 1);
-    setCurrentPage(1);
+    resetPages();
   };
 
   const formatDate = (dateString) => {
@@ -208,39 +180,18 @@ const PastAnalysis = () => {
     });
   };
 
-  // Get available filter options based on actual data
-  const getAvailableFilters = () => {
-    if (allAnalyses.length === 0) return { roles: [], experiences: [] };
-    
-    const roles = new Set();
-    const experiences = new Set();
-    
-    allAnalyses.forEach(analysis => {
-      const roleType = analysis.analysis.role_type.toLowerCase();
-      const expLevel = analysis.analysis.experience_level.toLowerCase();
-      
-      // Map roles to filter categories
-      if (roleType.includes('frontend') || roleType.includes('front-end')) roles.add('frontend');
-      if (roleType.includes('backend') || roleType.includes('back-end')) roles.add('backend');
-      if (roleType.includes('fullstack') || roleType.includes('full-stack')) roles.add('fullstack');
-      if (roleType.includes('data') || roleType.includes('scientist')) roles.add('data');
-      if (roleType.includes('devops') || roleType.includes('infrastructure')) roles.add('devops');
-      if (roleType.includes('mobile') || roleType.includes('ios') || roleType.includes('android')) roles.add('mobile');
-      
-      // Map experience to filter categories
-      if (expLevel.includes('junior') || expLevel.includes('0-2') || expLevel.includes('entry')) experiences.add('junior');
-      if (expLevel.includes('mid') || expLevel.includes('3-5') || expLevel.includes('intermediate')) experiences.add('mid');
-      if (expLevel.includes('senior') || expLevel.includes('5+') || expLevel.includes('lead')) experiences.add('senior');
-    });
-    
-    return { roles: Array.from(roles), experiences: Array.from(experiences) };
-  };
+  // Filter options are the exact role types and levels the user's stats report
+  const getAvailableFilters = () => ({
+    roles: Object.keys(stats?.role_distribution || {}).filter(Boolean).sort(),
+    experiences: Object.keys(stats?.experience_distribution || {}).filter(Boolean).sort()
+  });
 
   const availableFilters = getAvailableFilters();
+  const allCount = stats ? stats.total_analyses : totalAnalyses;
   const totalPages = Math.ceil(totalAnalyses / itemsPerPage);
   const hasActiveFilters = filterBy !== 'all' || sortBy !== 'newest';
 
-  if (loading && currentPage === 1 && allAnalyses.length === 0) {
+  if (loading && currentPage === 1 && analyses.length === 0 && !stats) {
     return (
       <div className="past-analysis">
         <div className="analysis-header">
@@ -356,7 +307,7 @@ const PastAnalysis = () => {
 
       {/* Analysis Content */}
       <div className="analysis-content">
-        {allAnalyses.length === 0 ? (
+        {allCount === 0 && !hasActiveFilters ? (
           <div className="empty-state">
             
             <h3>No analyses yet</h3>
@@ -377,7 +328,7 @@ const PastAnalysis = () => {
                   </span>
                   {hasActiveFilters && (
                     <span className="filter-indicator">
-                      (filtered from {allAnalyses.length} total)
+                      (filtered from {allCount} total)
                     </span>
                   )}
                 </div>
@@ -393,22 +344,19 @@ const PastAnalysis = () => {
                     onChange={(e) => handleFilterChange(e.target.value)}
                     className="filter-select"
                   >
-                    <option value="all">All Types ({allAnalyses.length})</option>
+                    <option value="all">All Types ({allCount})</option>
                     {availableFilters.roles.length > 0 && (
                       <optgroup label="Role Types">
-                        {availableFilters.roles.includes('frontend') && <option value="frontend">Frontend</option>}
-                        {availableFilters.roles.includes('backend') && <option value="backend">Backend</option>}
-                        {availableFilters.roles.includes('fullstack') && <option value="fullstack">Fullstack</option>}
-                        {availableFilters.roles.includes('data') && <option value="data">Data Science</option>}
-                        {availableFilters.roles.includes('devops') && <option value="devops">DevOps</option>}
-                        {availableFilters.roles.includes('mobile') && <option value="mobile">Mobile</option>}
+                        {availableFilters.roles.map(role => (
+                          <option key={role} value={`role:${role}`}>{role}</option>
+                        ))}
                       </optgroup>
                     )}
                     {availableFilters.experiences.length > 0 && (
                       <optgroup label="Experience Levels">
-                        {availableFilters.experiences.includes('junior') && <option value="junior">Junior</option>}
-                        {availableFilters.experiences.includes('mid') && <option value="mid">Mid-level</option>}
-                        {availableFilters.experiences.includes('senior') && <option value="senior">Senior</option>}
+                        {availableFilters.experiences.map(level => (
+                          <option key={level} value={`experience:${level}`}>{level}</option>
+                        ))}
                       </optgroup>
                     )}
                   </select>